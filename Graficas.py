@@ -1,4 +1,8 @@
+import os
 import sys
+import threading
+import time
+import numpy as np
 import pygame
 from pygame.locals import *
 
@@ -10,6 +14,12 @@ ROJO = 255, 0, 0
 PURPURA = 128, 0, 128
 NARANJA = 255, 165, 0
 
+# Las imágenes están junto a este archivo, no en el directorio de trabajo
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Cantidad de textos renderizados que se guardan antes de vaciar la caché
+MAX_TEXTOS = 2048
+
 
 class Construccion(object):
     def __init__(self, nombre: str, ancho, alto):
@@ -18,6 +28,9 @@ class Construccion(object):
         self.reloj = pygame.time.Clock()
         pygame.display.set_caption(nombre)
         pygame.init()
+        # Las fuentes y los textos ya renderizados se reutilizan entre cuadros
+        self.fuentes = {}
+        self.textos = {}
 
     def dibujar_viga(self, nombre: str, pos1, pos2, carga, tamaño=2):
         pygame.draw.line(self.pantalla, BLANCO, pos1, pos2, tamaño)
@@ -47,9 +60,34 @@ class Construccion(object):
         pygame.draw.circle(self.pantalla, PURPURA, (int(pos[0]), int(pos[1])), tamaño, 0)  # relleno
 
     def agregar_texto(self, pos, texto: str, clr=VERDE, tamaño=24):
-        fuente = pygame.font.Font(None, tamaño)
-        imagen_texto = fuente.render(texto, 1, clr)
-        self.pantalla.blit(imagen_texto, (int(pos[0]), int(pos[1])))
+        self.pantalla.blit(self.renderizar_texto(texto, clr, tamaño), (int(pos[0]), int(pos[1])))
+
+    def fuente(self, tamaño: int):
+        """Crea la fuente de cada tamaño una sola vez"""
+        if tamaño not in self.fuentes:
+            self.fuentes[tamaño] = pygame.font.Font(None, tamaño)
+        return self.fuentes[tamaño]
+
+    def renderizar_texto(self, texto: str, clr=VERDE, tamaño=24):
+        """Superficie del texto; los textos fijos (nombres, títulos) se renderizan una sola vez"""
+        llave = (texto, tuple(clr), tamaño)
+        imagen_texto = self.textos.get(llave)
+        if imagen_texto is None:
+            if len(self.textos) >= MAX_TEXTOS:
+                # Las fuerzas cambian en cada cuadro; se vacía de vez en cuando para no crecer sin límite
+                self.textos.clear()
+            imagen_texto = self.fuente(tamaño).render(texto, 1, clr)
+            self.textos[llave] = imagen_texto
+        return imagen_texto
+
+    def atender_eventos(self):
+        """Procesa los eventos de la ventana; devuelve falso si el usuario la cerró"""
+        for evento in pygame.event.get():
+            if evento.type == QUIT:
+                return False
+            if evento.type == KEYDOWN and evento.key == K_ESCAPE:
+                return False
+        return True
 
     def mantener(self):
         for evento in pygame.event.get():
@@ -73,6 +111,284 @@ class Construccion(object):
         self.pantalla.fill(NEGRO)
 
 
+class Instantanea(object):
+    """
+    Copia del estado de una construcción de structubridgex en un momento de la optimización. Se puede dibujar
+    desde otro hilo mientras el optimizador sigue cambiando los arreglos del modelo.
+    """
+    def __init__(self, construccion, terminado=False):
+        modelo = construccion.modelo
+        self.coordenadas = modelo.coordenadas.copy()
+        self.cargas_nodos = modelo.cargas_nodos.copy()
+        self.fuerza_interna = modelo.fuerza_interna.copy()
+        self.areas = modelo.areas.copy()
+        # La topología no cambia durante la optimización, no hace falta copiarla
+        self.nombres_nodos = modelo.nombres_nodos
+        self.nombres_vigas = modelo.nombres_vigas
+        self.nodo_a = modelo.nodo_a
+        self.nodo_b = modelo.nodo_b
+        self.restricciones = modelo.restricciones
+        self.editables = [bool(np.any(nodo.optimizar)) for nodo in construccion.nodos]
+        self.peso = construccion.peso
+        self.material = construccion.material
+        self.iteracion = construccion.iteracion
+        self.terminado = terminado
+        # El resumen final solo se arma una vez
+        self.lineas_nodos = [str(nodo) for nodo in construccion.nodos] if terminado else []
+        self.lineas_vigas = [viga.una_linea() for viga in construccion.vigas] if terminado else []
+
+    @classmethod
+    def desde_historial(cls, lector, indice: int):
+        """
+        Instantánea de la evaluación indice de un historial.LectorHistorial, sin la construcción original
+        :param lector:
+        :param indice:
+        :return instantanea:
+        """
+        registro = lector[indice]
+        instantanea = cls.__new__(cls)
+        instantanea.coordenadas = lector.coordenadas(indice)
+        instantanea.cargas_nodos = lector.cargas_nodos(indice, instantanea.coordenadas)
+        instantanea.fuerza_interna = np.abs(registro["fuerzas"].astype(float))
+        instantanea.areas = registro["areas"].astype(float)
+        instantanea.nombres_nodos = lector.nombres_nodos
+        instantanea.nombres_vigas = lector.nombres_vigas
+        instantanea.nodo_a = lector.nodo_a
+        instantanea.nodo_b = lector.nodo_b
+        instantanea.restricciones = lector.restricciones
+        instantanea.editables = np.any(lector.libres, axis=1)
+        instantanea.peso = float(registro["peso"])
+        instantanea.material = lector.materiales[int(registro["material"])]
+        instantanea.iteracion = int(registro["iteracion"])
+        instantanea.terminado = False
+        instantanea.lineas_nodos = []
+        instantanea.lineas_vigas = []
+        return instantanea
+
+
+class VisorConstruccion(object):
+    """
+    Observador que dibuja una construcción de structubridgex en una ventana de pygame. El optimizador lo notifica
+    en cada evaluación, pero solo se dibuja como máximo fps_maximo veces por segundo (o una vez cada
+    cada_iteraciones); las demás notificaciones se descartan sin copiar ni dibujar nada.
+    Con ejecutar, el optimizador corre en un hilo de trabajo y el hilo principal dibuja la última instantánea.
+    """
+    def __init__(self, nombre: str, ancho=1280, alto=720, fps_maximo=20, cada_iteraciones=None):
+        """
+        :param nombre:
+        :param ancho:
+        :param alto:
+        :param fps_maximo: cuadros por segundo como máximo
+        :param cada_iteraciones: si se da, dibuja una vez cada tantas evaluaciones en vez de limitar por tiempo
+        """
+        pygame.init()
+        self.ventana = Construccion(nombre, ancho, alto)
+        # Las imágenes se cargan y redimensionan una sola vez
+        self.fondo = pygame.image.load(os.path.join(DIRECTORIO, 'aqua3.png'))
+        self.fondo = pygame.transform.scale(self.fondo, (ancho, alto))
+        self.logo = pygame.image.load(os.path.join(DIRECTORIO, 'BSLOGO.png'))
+        self.logo = pygame.transform.scale(self.logo, (150, 150))  # Ajusta el tamaño según tus necesidades
+        self.fps_maximo = fps_maximo
+        self.cada_iteraciones = cada_iteraciones
+        self.ultimo_cuadro = -np.inf
+        # Con un hilo de trabajo las instantáneas se dejan aquí y el hilo principal las dibuja
+        self.en_segundo_plano = False
+        self.pendiente = None
+        self.candado = threading.Lock()
+
+    def toca_dibujar(self, iteracion: int, terminado=False):
+        """Decide si esta notificación produce un cuadro nuevo"""
+        if terminado:
+            return True
+        if self.cada_iteraciones is not None:
+            return iteracion % self.cada_iteraciones == 0
+        return time.perf_counter() - self.ultimo_cuadro >= 1.0 / self.fps_maximo
+
+    def actualizar(self, construccion, terminado=False):
+        if not self.toca_dibujar(construccion.iteracion, terminado):
+            return
+        self.ultimo_cuadro = time.perf_counter()
+        instantanea = Instantanea(construccion, terminado)
+        if self.en_segundo_plano:
+            with self.candado:
+                self.pendiente = instantanea
+        else:
+            self.dibujar(instantanea)
+
+    def ejecutar(self, funcion, *argumentos, **opciones):
+        """
+        Ejecuta funcion, por ejemplo construccion.optimizar, en un hilo de trabajo y dibuja desde este hilo la
+        última instantánea que haya dejado, a fps_maximo como máximo. Pygame solo se puede usar desde el hilo
+        principal, por eso el cálculo es el que se mueve a otro hilo.
+        :param funcion:
+        :return resultado: lo que devuelva funcion
+        """
+        resultado = {}
+
+        def trabajo():
+            try:
+                resultado["valor"] = funcion(*argumentos, **opciones)
+            except BaseException as error:
+                resultado["error"] = error
+
+        hilo = threading.Thread(target=trabajo, daemon=True)
+        self.en_segundo_plano = True
+        hilo.start()
+        try:
+            while hilo.is_alive() or self.pendiente is not None:
+                with self.candado:
+                    instantanea, self.pendiente = self.pendiente, None
+                if instantanea is not None:
+                    self.dibujar(instantanea)
+                elif not self.ventana.atender_eventos():
+                    self.cerrar()
+                self.ventana.reloj.tick(self.fps_maximo)
+        finally:
+            self.en_segundo_plano = False
+        hilo.join()
+        if "error" in resultado:
+            raise resultado["error"]
+        return resultado.get("valor")
+
+    def reproducir(self, lector, inicio=None):
+        """
+        Recorre las evaluaciones de un historial.LectorHistorial. Izquierda y derecha avanzan una evaluación,
+        arriba y abajo un 1 % del historial, inicio y fin van a los extremos, M a la de menor peso y espacio
+        reproduce o pausa a fps_maximo cuadros por segundo. Solo se lee del disco la evaluación que se dibuja.
+        :param lector:
+        :param inicio: evaluación inicial, por defecto la de menor peso
+        :return:
+        """
+        if len(lector) == 0:
+            return
+        indice = lector.mejor() if inicio is None else int(inicio) % len(lector)
+        reproduciendo = False
+        dibujado = None
+        while True:
+            for evento in pygame.event.get():
+                if evento.type == QUIT or (evento.type == KEYDOWN and evento.key == K_ESCAPE):
+                    self.cerrar()
+                if evento.type != KEYDOWN:
+                    continue
+                salto = max(1, len(lector) // 100)
+                if evento.key == K_SPACE:
+                    reproduciendo = not reproduciendo
+                elif evento.key == K_RIGHT:
+                    indice += 1
+                elif evento.key == K_LEFT:
+                    indice -= 1
+                elif evento.key == K_UP:
+                    indice += salto
+                elif evento.key == K_DOWN:
+                    indice -= salto
+                elif evento.key == K_HOME:
+                    indice = 0
+                elif evento.key == K_END:
+                    indice = len(lector) - 1
+                elif evento.key == K_m:
+                    indice = lector.mejor()
+            if reproduciendo:
+                indice += 1
+                if indice >= len(lector) and lector.actualizar() <= indice:
+                    # Al llegar al final se buscan registros nuevos por si la optimización sigue escribiendo;
+                    # si no hay, se pausa
+                    reproduciendo = indice < len(lector)
+            indice = min(max(indice, 0), len(lector) - 1)
+            if indice != dibujado:
+                instantanea = Instantanea.desde_historial(lector, indice)
+                instantanea.iteracion = "{0} ({1}/{2})".format(instantanea.iteracion, indice + 1, len(lector))
+                self.dibujar(instantanea)
+                dibujado = indice
+            self.ventana.reloj.tick(self.fps_maximo)
+
+    def dibujar(self, instantanea: Instantanea):
+        desplazamiento = (500, 300)
+
+        # Una armadura espacial se dibuja en elevación: el eje x y el último eje, que es el vertical
+        vertical = "yz"[instantanea.coordenadas.shape[1] - 2]
+        plano = [0, instantanea.coordenadas.shape[1] - 1]
+        # Invierte el eje y para gráficos y escala todas las posiciones a la vez
+        posiciones = instantanea.coordenadas[:, plano] * np.array([170, -170]) + desplazamiento
+        cargas_nodos = instantanea.cargas_nodos[:, plano]
+
+        # Dibujar el fondo en la ventana
+        self.ventana.pantalla.blit(self.fondo, (0, 0))
+
+        # Define los parámetros de la barra lateral y su color
+        ANCHO_BARRA_LATERAL = 330
+        COLOR_BARRA_LATERAL = (30, 30, 30)  # Un gris oscuro
+
+        # Dibujar la barra lateral
+        pygame.draw.rect(self.ventana.pantalla, COLOR_BARRA_LATERAL, (0, 0, ANCHO_BARRA_LATERAL, self.ventana.alto))
+
+        for x in range(0, len(instantanea.nombres_vigas)):
+            self.ventana.dibujar_viga(instantanea.nombres_vigas[x],
+                                      posiciones[instantanea.nodo_a[x]],
+                                      posiciones[instantanea.nodo_b[x]],
+                                      instantanea.fuerza_interna[x],
+                                      tamaño=int((instantanea.areas[x] * 1e6) ** 0.7))
+
+        for x in range(0, len(instantanea.nombres_nodos)):
+            nombre = instantanea.nombres_nodos[x]
+            self.ventana.dibujar_nodo(nombre, posiciones[x])
+            self.ventana.dibujar_fuerza(nombre, posiciones[x], cargas_nodos[x])
+            if instantanea.restricciones[x, 0] != 0:
+                self.ventana.dibujar_restriccion_x(nombre + "x", posiciones[x])
+            if instantanea.restricciones[x, -1] != 0:
+                self.ventana.dibujar_restriccion_y(nombre + vertical, posiciones[x])
+            if instantanea.editables[x]:
+                self.ventana.dibujar_editable(posiciones[x])
+
+        # Coordenadas para colocar el logo
+        x_logo = 80
+        y_logo = 50
+
+        # Dibujar el logo
+        self.ventana.pantalla.blit(self.logo, (x_logo, y_logo))
+
+        # Agregar información a la barra lateral
+        informacion = [
+            "       STRUCTUBRIDGEX",
+            "---------------------------------------",
+            "Peso: {0:.3f} kg".format(round(instantanea.peso, 3)),
+            "Material: ",
+            instantanea.material,
+            "Iteración: " + str(instantanea.iteracion),
+        ]
+
+        y_pos = 220
+        for linea in informacion:
+            self.ventana.agregar_texto((20, y_pos), linea, clr=BLANCO, tamaño=30)
+            y_pos += 40  # Incrementa la posición para la siguiente línea
+
+        titulo = "Software Simulador de Optimización para PuenteS"
+        descripcion = "Simulación y optimización estructural para minimizar el peso soportando diversas cargas."
+
+        self.ventana.agregar_texto((600, 10), titulo, clr=(0, 255, 0), tamaño=30)  # Título
+        self.ventana.agregar_texto((350, 30), descripcion, clr=(0, 255, 0), tamaño=30)  # Título
+
+        if instantanea.terminado:
+            self.ventana.agregar_texto((350, 50), "SE ENCONTRÓ LA SOLUCIÓN ÓPTIMA: ")
+            self.ventana.agregar_texto((50, 520), "NODOS: ")
+            for x in range(0, len(instantanea.lineas_nodos)):
+                b = 50 + (x // 5) * 150
+                h = (x % 5) * 30 + 550
+                self.ventana.agregar_texto((b, h), instantanea.lineas_nodos[x])
+            self.ventana.agregar_texto((400, 520), "VIGAS: ")
+            for x in range(0, len(instantanea.lineas_vigas)):
+                b = 400 + (x // 5) * 300
+                h = (x % 5) * 30 + 550
+                self.ventana.agregar_texto((b, h), instantanea.lineas_vigas[x])
+        self.ventana.mostrar()
+
+    def mantener(self):
+        self.ventana.mantener()
+
+    def cerrar(self):
+        pygame.display.quit()
+        sys.exit(0)
+
+
 if __name__ == "__main__":
     G = Construccion("Prueba", 720, 480)
     G.mostrar()
\ No newline at end of file
@@ -0,0 +1,179 @@
+from typing import List
+
+
+def _casos_carga(vigas_tablero: List, numero_vigas: int, carga: float, casos: int, dimension: int = 2):
+    """
+    Casos de carga sobre las vigas del tablero: el primero es la carga uniforme en todo el claro y los siguientes
+    cargan un tramo que recorre el puente de izquierda a derecha, como un vehículo que lo cruza. La carga va
+    hacia abajo en el último eje.
+    """
+    lista_cargas = []
+    for caso in range(0, casos):
+        cargas = [[0] * dimension for x in range(0, numero_vigas)]
+        if caso == 0:
+            cargadas = vigas_tablero
+        else:
+            # Tramo de la mitad del claro cuyo inicio avanza con el número de caso
+            ancho = max(1, len(vigas_tablero) // 2)
+            inicio = round((caso - 1) * (len(vigas_tablero) - ancho) / max(1, casos - 2))
+            cargadas = vigas_tablero[inicio:inicio + ancho]
+        for indice in cargadas:
+            cargas[indice] = [0] * (dimension - 1) + [-carga]
+        lista_cargas.append(cargas)
+    return lista_cargas
+
+
+def _nodo(nombre: str, pos, restriccion_x=0, restriccion_y=0, optimizar=None, restriccion_z=0):
+    nodo = {"nombre": nombre, "pos": list(pos), "restriccion_x": restriccion_x, "restriccion_y": restriccion_y}
+    if len(pos) == 3:
+        nodo["restriccion_z"] = restriccion_z
+    nodo["optimizar"] = [0] * len(pos) if optimizar is None else list(optimizar)
+    return nodo
+
+
+def _armadura_con_montantes(tipo: str, claro: float, paneles: int, altura: float, carga: float, casos: int):
+    """Pratt y Howe: cordón inferior, cordón superior sobre los nodos interiores, montantes y diagonales"""
+    if paneles < 2:
+        raise ValueError("Se necesitan al menos 2 paneles")
+    ancho = claro / paneles
+    nodos = []
+    for x in range(0, paneles + 1):
+        if x == 0:
+            nodos.append(_nodo("I0", (0, 0), restriccion_x=-1, restriccion_y=-1))
+        elif x == paneles:
+            nodos.append(_nodo("I" + str(x), (claro, 0), restriccion_y=-1))
+        else:
+            nodos.append(_nodo("I" + str(x), (x * ancho, 0), optimizar=(1, 0)))
+    for x in range(1, paneles):
+        nodos.append(_nodo("S" + str(x), (x * ancho, altura), optimizar=(1, 1)))
+
+    def superior(x):
+        return paneles + x
+
+    vigas = []
+    for x in range(0, paneles):
+        vigas.append(["I" + str(x) + "I" + str(x + 1), x, x + 1])
+    vigas_tablero = list(range(0, paneles))
+    for x in range(1, paneles - 1):
+        vigas.append(["S" + str(x) + "S" + str(x + 1), superior(x), superior(x + 1)])
+    vigas.append(["I0S1", 0, superior(1)])
+    vigas.append(["I" + str(paneles) + "S" + str(paneles - 1), paneles, superior(paneles - 1)])
+    for x in range(1, paneles):
+        vigas.append(["I" + str(x) + "S" + str(x), x, superior(x)])
+    for x in range(1, paneles - 1):
+        # Pratt: las diagonales bajan hacia el centro; Howe: suben hacia el centro
+        hacia_centro = x < paneles / 2
+        if (tipo == "pratt") == hacia_centro:
+            vigas.append(["S" + str(x) + "I" + str(x + 1), superior(x), x + 1])
+        else:
+            vigas.append(["I" + str(x) + "S" + str(x + 1), x, superior(x + 1)])
+    return nodos, vigas, _casos_carga(vigas_tablero, len(vigas), carga, casos)
+
+
+def pratt(claro: float, paneles: int, altura: float, carga: float = 1000, casos: int = 1):
+    """
+    Armadura Pratt isostática con la carga distribuida sobre el cordón inferior
+    :param claro: longitud total en metros
+    :param paneles: número de paneles del cordón inferior
+    :param altura: altura del cordón superior en metros
+    :param carga: carga distribuida del tablero en N/m
+    :param casos: número de casos de carga
+    :return diseno:
+    """
+    nodos, vigas, cargas = _armadura_con_montantes("pratt", claro, paneles, altura, carga, casos)
+    return {"nombre": "Pratt {0}x{1}".format(paneles, altura), "nodos": nodos, "vigas": vigas, "cargas": cargas}
+
+
+def howe(claro: float, paneles: int, altura: float, carga: float = 1000, casos: int = 1):
+    """Armadura Howe isostática, como pratt pero con las diagonales en sentido contrario"""
+    nodos, vigas, cargas = _armadura_con_montantes("howe", claro, paneles, altura, carga, casos)
+    return {"nombre": "Howe {0}x{1}".format(paneles, altura), "nodos": nodos, "vigas": vigas, "cargas": cargas}
+
+
+def warren(claro: float, paneles: int, altura: float, carga: float = 1000, casos: int = 1):
+    """Armadura Warren isostática sin montantes: los nodos superiores quedan a la mitad de cada panel"""
+    if paneles < 1:
+        raise ValueError("Se necesita al menos 1 panel")
+    ancho = claro / paneles
+    nodos = []
+    for x in range(0, paneles + 1):
+        if x == 0:
+            nodos.append(_nodo("I0", (0, 0), restriccion_x=-1, restriccion_y=-1))
+        elif x == paneles:
+            nodos.append(_nodo("I" + str(x), (claro, 0), restriccion_y=-1))
+        else:
+            nodos.append(_nodo("I" + str(x), (x * ancho, 0), optimizar=(1, 0)))
+    for x in range(0, paneles):
+        nodos.append(_nodo("S" + str(x), ((x + 0.5) * ancho, altura), optimizar=(1, 1)))
+
+    vigas = []
+    for x in range(0, paneles):
+        vigas.append(["I" + str(x) + "I" + str(x + 1), x, x + 1])
+    vigas_tablero = list(range(0, paneles))
+    for x in range(0, paneles - 1):
+        vigas.append(["S" + str(x) + "S" + str(x + 1), paneles + 1 + x, paneles + 2 + x])
+    for x in range(0, paneles):
+        vigas.append(["I" + str(x) + "S" + str(x), x, paneles + 1 + x])
+        vigas.append(["S" + str(x) + "I" + str(x + 1), paneles + 1 + x, x + 1])
+    cargas = _casos_carga(vigas_tablero, len(vigas), carga, casos)
+    return {"nombre": "Warren {0}x{1}".format(paneles, altura), "nodos": nodos, "vigas": vigas, "cargas": cargas}
+
+
+def tricordal(claro: float, paneles: int, altura: float, carga: float = 1000, casos: int = 1, ancho: float = None):
+    """
+    Pasarela espacial isostática de sección triangular: dos cordones inferiores (I y D) que llevan el tablero y
+    un cordón superior (S) a la mitad de cada panel, en coordenadas (x, y, z) con z hacia arriba. Cada nodo
+    nuevo se une con tres vigas a un triángulo ya formado, como al agregar un tetraedro, así que la armadura es
+    rígida con 3·nodos - 6 vigas. Apoyos: I0 en x, y, z; D0 en z; I al final en y, z.
+    :param claro: longitud total en metros
+    :param paneles: número de paneles de los cordones inferiores
+    :param altura: altura del cordón superior en metros
+    :param carga: carga distribuida de cada cordón inferior en N/m
+    :param casos: número de casos de carga
+    :param ancho: separación de los cordones inferiores en metros, por defecto la altura
+    :return diseno:
+    """
+    if paneles < 1:
+        raise ValueError("Se necesita al menos 1 panel")
+    ancho = altura if ancho is None else ancho
+    largo = claro / paneles
+    nodos = []
+    indices = {}
+
+    def agregar(nombre, pos, **opciones):
+        indices[nombre] = len(nodos)
+        nodos.append(_nodo(nombre, pos, **opciones))
+
+    vigas = []
+
+    def unir(*nombres):
+        for otro in nombres[1:]:
+            vigas.append([otro + nombres[0], indices[otro], indices[nombres[0]]])
+
+    agregar("I0", (0, -ancho / 2, 0), restriccion_x=-1, restriccion_y=-1, restriccion_z=-1)
+    agregar("D0", (0, ancho / 2, 0), restriccion_z=-1)
+    unir("D0", "I0")
+    vigas_tablero = []
+    for x in range(0, paneles):
+        i, d, s = "I" + str(x), "D" + str(x), "S" + str(x)
+        agregar(s, ((x + 0.5) * largo, 0, altura), optimizar=(1, 0, 1))
+        if x == 0:
+            unir(s, i, d)
+        else:
+            unir(s, "S" + str(x - 1), i, d)
+        # Los nodos intermedios del tablero se mueven a lo largo del claro; los últimos son apoyos
+        final = x == paneles - 1
+        siguiente = claro if final else (x + 1) * largo
+        i_siguiente, d_siguiente = "I" + str(x + 1), "D" + str(x + 1)
+        agregar(i_siguiente, (siguiente, -ancho / 2, 0), restriccion_y=-1 if final else 0,
+                restriccion_z=-1 if final else 0, optimizar=(0, 0, 0) if final else (1, 0, 0))
+        vigas_tablero.append(len(vigas))
+        unir(i_siguiente, i, d, s)
+        agregar(d_siguiente, (siguiente, ancho / 2, 0), optimizar=(0, 0, 0) if final else (1, 0, 0))
+        vigas_tablero.append(len(vigas))
+        unir(d_siguiente, d, s, i_siguiente)
+    cargas = _casos_carga(vigas_tablero, len(vigas), carga, casos, dimension=3)
+    return {"nombre": "Tricordal {0}x{1}".format(paneles, altura), "nodos": nodos, "vigas": vigas, "cargas": cargas}
+
+
+TIPOS = {"pratt": pratt, "howe": howe, "warren": warren, "tricordal": tricordal}
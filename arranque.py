@@ -0,0 +1,181 @@
+import contextlib
+import hashlib
+import json
+import os
+import time
+import numpy as np
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Las coordenadas y las cargas se redondean antes de calcular las huellas para que el ruido de punto flotante
+# no separe problemas iguales
+DECIMALES = 9
+
+
+def _huella(*arreglos):
+    resumen = hashlib.sha1()
+    for arreglo in arreglos:
+        arreglo = np.ascontiguousarray(arreglo)
+        resumen.update(str(arreglo.shape).encode())
+        resumen.update(arreglo.tobytes())
+    return resumen.hexdigest()
+
+
+def huella_topologia(modelo):
+    """
+    Identifica la topología de un modelo: conectividad, apoyos, posiciones variables y coordenadas fijas. Dos
+    problemas con la misma huella tienen las mismas variables y una solución de uno sirve de arranque del otro.
+    """
+    fijas = np.round(modelo.coordenadas[~modelo.libres], DECIMALES) + 0.0
+    return _huella(modelo.nodo_a, modelo.nodo_b, modelo.restricciones, modelo.libres, fijas)
+
+
+def huella_cargas(modelo):
+    """Identifica los casos de carga de un modelo"""
+    return _huella(np.round(modelo.cargas, DECIMALES) + 0.0)
+
+
+class AlmacenArranques(object):
+    """
+    Geometrías optimizadas guardadas en disco para arrancar optimizaciones de problemas parecidos. Hay un
+    archivo JSON por topología con una entrada por conjunto de casos de carga; buscar devuelve la entrada
+    cuyas cargas están más cerca de las del problema, así un cambio pequeño de una carga arranca desde la
+    solución anterior.
+    """
+    def __init__(self, ruta: str, max_entradas=64, distancia_maxima=None):
+        """
+        :param ruta: directorio del almacén, se crea si no existe
+        :param max_entradas: entradas por topología; al pasarse se descartan las guardadas hace más tiempo
+            (una entrada que se vuelve a guardar con las mismas cargas cuenta como recién guardada)
+        :param distancia_maxima: distancia relativa de cargas máxima para usar una entrada, None acepta todas
+        """
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.distancia_maxima = distancia_maxima
+        os.makedirs(ruta, exist_ok=True)
+
+    def archivo(self, topologia: str):
+        return os.path.join(self.ruta, topologia + ".json")
+
+    def leer(self, topologia: str):
+        """
+        :return entradas: lista de {"cargas", "huella_cargas", "valores", "casos", "peso", "material", "fecha"}
+        """
+        try:
+            with open(self.archivo(topologia), "r") as archivo_lectura:
+                return json.load(archivo_lectura)["entradas"]
+        except (OSError, ValueError, KeyError):
+            # Un archivo que falta o que quedó a medias es un almacén vacío
+            return []
+
+    def escribir(self, topologia: str, entradas):
+        # Se escribe aparte y se reemplaza, así otro proceso nunca lee un archivo a medias
+        temporal = self.archivo(topologia) + ".{0}.tmp".format(os.getpid())
+        with open(temporal, "w") as archivo_escritura:
+            json.dump({"version": 1, "topologia": topologia, "entradas": entradas}, archivo_escritura)
+        os.replace(temporal, self.archivo(topologia))
+
+    @contextlib.contextmanager
+    def bloqueo(self, topologia: str):
+        """
+        Bloqueo exclusivo del archivo de una topología entre procesos, para que dos optimizaciones que guardan
+        a la vez no pierdan la entrada de la otra. Leer no lo necesita, escribir reemplaza el archivo completo.
+        """
+        with open(self.archivo(topologia) + ".lock", "a+b") as archivo_bloqueo:
+            if fcntl is not None:
+                fcntl.flock(archivo_bloqueo.fileno(), fcntl.LOCK_EX)
+            else:
+                archivo_bloqueo.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK reintenta durante unos 10 segundos antes de fallar
+                        msvcrt.locking(archivo_bloqueo.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(archivo_bloqueo.fileno(), fcntl.LOCK_UN)
+                else:
+                    archivo_bloqueo.seek(0)
+                    msvcrt.locking(archivo_bloqueo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def buscar(self, modelo):
+        """
+        Entrada guardada más cercana al problema del modelo
+        :param modelo: ModeloArmadura
+        :return entrada, distancia: None, inf si no hay ninguna que sirva. La distancia es la norma de la
+            diferencia de cargas relativa a la norma de las cargas; 0 si las cargas son las mismas
+        """
+        entradas = self.leer(huella_topologia(modelo))
+        huella = huella_cargas(modelo)
+        cargas = modelo.cargas.ravel()
+        escala = max(np.linalg.norm(cargas), 1e-300)
+        numero_valores = int(np.count_nonzero(modelo.libres))
+        mejor, mejor_distancia = None, np.inf
+        for entrada in entradas:
+            if len(entrada["valores"]) != numero_valores:
+                continue
+            if entrada["huella_cargas"] == huella:
+                distancia = 0.0
+            elif len(entrada["cargas"]) == len(cargas):
+                distancia = np.linalg.norm(cargas - np.array(entrada["cargas"])) / escala
+            else:
+                # Otro número de casos de carga: no se puede medir la distancia
+                continue
+            if distancia < mejor_distancia or (distancia == mejor_distancia and entrada["peso"] < mejor["peso"]):
+                mejor, mejor_distancia = entrada, distancia
+        if mejor is None or (self.distancia_maxima is not None and mejor_distancia > self.distancia_maxima):
+            return None, np.inf
+        return mejor, mejor_distancia
+
+    def guardar(self, modelo, valores, peso: float, casos=None, material=""):
+        """
+        Guarda la solución de las cargas actuales del modelo; si ya había una para las mismas cargas solo se
+        reemplaza si la nueva es más ligera. Los óptimos por caso se combinan: los casos que faltan en la entrada
+        que queda se toman de la otra.
+        :param modelo:
+        :param valores: posiciones variables optimizadas
+        :param peso: peso de la construcción con esas posiciones (envolvente de todos los casos)
+        :param casos: óptimo de cada caso de carga por separado, el arranque de ese caso en la siguiente
+            optimización; None en los casos que no se optimizaron
+        :param material:
+        :return guardada: falso si se conservó la anterior
+        """
+        topologia = huella_topologia(modelo)
+        huella = huella_cargas(modelo)
+        if casos is None:
+            casos = [None] * len(modelo.cargas)
+        casos = [None if caso is None else np.asarray(caso, dtype=float).tolist() for caso in casos]
+        with self.bloqueo(topologia):
+            entradas = self.leer(topologia)
+            anteriores = [entrada for entrada in entradas if entrada["huella_cargas"] == huella]
+            if anteriores and anteriores[0]["peso"] <= peso:
+                entrada = anteriores[0]
+                entrada["casos"] = _combinar_casos(entrada["casos"], casos)
+                entrada["fecha"] = time.time()
+                guardada = False
+            else:
+                if anteriores:
+                    casos = _combinar_casos(casos, anteriores[0]["casos"])
+                entradas = [entrada for entrada in entradas if entrada["huella_cargas"] != huella]
+                entradas.append({"huella_cargas": huella, "cargas": modelo.cargas.ravel().tolist(),
+                                 "valores": np.asarray(valores, dtype=float).tolist(),
+                                 "casos": casos,
+                                 "peso": float(peso),
+                                 "material": material, "fecha": time.time()})
+                guardada = True
+            entradas.sort(key=lambda entrada: entrada["fecha"])
+            self.escribir(topologia, entradas[-self.max_entradas:])
+        return guardada
+
+
+def _combinar_casos(casos, otros):
+    """Óptimos por caso de casos, con los que faltan (None) tomados de otros"""
+    return [otro if caso is None else caso for caso, otro in zip(casos, otros)]
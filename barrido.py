@@ -0,0 +1,241 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+
+import armaduras
+
+
+def _leer_entradas(ruta: str):
+    """Entradas de un archivo JSON (una lista o un solo diseño) o JSONL (un diseño por línea, se lee a medida)"""
+    with open(ruta, "r") as archivo_lectura:
+        if ruta.endswith(".jsonl"):
+            for linea in archivo_lectura:
+                if linea.strip():
+                    yield json.loads(linea)
+        else:
+            entradas = json.load(archivo_lectura)
+            for entrada in (entradas if isinstance(entradas, list) else [entradas]):
+                yield entrada
+
+
+def leer_disenos(ruta: str):
+    """
+    Lee las definiciones de armaduras de un archivo JSON o JSONL en el formato de Construccion.desde_dict.
+    Un diseño paramétrico, con "tipo" en armaduras.TIPOS, se expande en todas las combinaciones de sus listas
+    "claro", "paneles", "altura", "carga" y "casos".
+    :param ruta:
+    :return: generador de diseños, cada uno con un "id" único
+    """
+    for numero, entrada in enumerate(_leer_entradas(ruta)):
+        if "tipo" in entrada:
+            for diseno in expandir_parametrico(entrada):
+                yield diseno
+        else:
+            diseno = dict(entrada)
+            diseno.setdefault("id", "diseno-" + str(numero))
+            yield diseno
+
+
+def expandir_parametrico(entrada: dict):
+    """Expande un diseño paramétrico en un diseño por cada combinación de parámetros"""
+    generador = armaduras.TIPOS[entrada["tipo"]]
+    nombres = ["claro", "paneles", "altura", "carga", "casos"]
+    valores = []
+    for nombre in nombres:
+        valor = entrada.get(nombre, [])
+        valores.append(valor if isinstance(valor, list) else [valor])
+    for combinacion in itertools.product(*[valor if valor else [None] for valor in valores]):
+        parametros = {nombre: valor for nombre, valor in zip(nombres, combinacion) if valor is not None}
+        diseno = generador(**parametros)
+        diseno["id"] = entrada["tipo"] + "-" + "-".join(
+            nombre + "=" + str(valor) for nombre, valor in sorted(parametros.items()))
+        diseno["parametros"] = dict(parametros, tipo=entrada["tipo"])
+        if "opciones" in entrada:
+            diseno["opciones"] = entrada["opciones"]
+        yield diseno
+
+
+def ids_terminados(ruta: str, reintentar_errores=False):
+    """
+    Identificadores ya escritos en el archivo de resultados. Si la última línea quedó cortada por una
+    interrupción se elimina para poder seguir escribiendo; una línea ilegible antes de otras se salta sin
+    tocar las siguientes.
+    :param ruta:
+    :param reintentar_errores: los diseños cuyo último registro es un error no cuentan como terminados
+    :return ids:
+    """
+    ids = set()
+    if not os.path.exists(ruta):
+        return ids
+    inicio_ultima, ultima_valida = 0, True
+    with open(ruta, "rb") as archivo_lectura:
+        for linea in archivo_lectura:
+            inicio_ultima = archivo_lectura.tell() - len(linea)
+            try:
+                registro = json.loads(linea)
+                identificador = registro["id"]
+            except (ValueError, KeyError, TypeError):
+                ultima_valida = False
+                continue
+            # Cada registro se escribe con su salto de línea, sin él la escritura se interrumpió
+            ultima_valida = linea.endswith(b"\n")
+            if reintentar_errores and "error" in registro:
+                ids.discard(identificador)
+            elif ultima_valida:
+                ids.add(identificador)
+    if not ultima_valida:
+        with open(ruta, "r+b") as archivo:
+            archivo.truncate(inicio_ultima)
+    return ids
+
+
+def optimizar_diseno(diseno: dict, opciones: dict):
+    """
+    Optimiza un diseño sin gráficos; se ejecuta en un proceso del grupo
+    :param diseno:
+    :param opciones: argumentos de Construccion.optimizar, los del diseño tienen prioridad; "perfil": True
+        agrega al registro los tiempos por fase y los contadores del perfilador; "arranques": directorio del
+        almacén de geometrías optimizadas con el que arranca cada diseño
+    :return registro: diccionario con el resultado o con el error
+    """
+    from structubridgex import Construccion
+    inicio = time.perf_counter()
+    registro = {"id": diseno["id"]}
+    if "parametros" in diseno:
+        registro["parametros"] = diseno["parametros"]
+    try:
+        argumentos = dict(opciones, **diseno.get("opciones", {}))
+        argumentos["grafico_interactivo"] = False
+        perfil = argumentos.pop("perfil", False)
+        arranques = argumentos.pop("arranques", None)
+        # Los mensajes de optimizar no se mezclan en la salida del barrido
+        with contextlib.redirect_stdout(io.StringIO()):
+            construccion = Construccion.desde_dict(diseno)
+            if perfil:
+                construccion.activar_perfilador(max_eventos=0)
+            if arranques is not None:
+                construccion.activar_arranques(arranques)
+            resultado = construccion.optimizar(**argumentos)
+        registro.update(construccion.resultado_dict())
+        registro["motivo"] = resultado.motivo
+        if perfil:
+            resumen = construccion.perfilador.resumen()
+            # La traza de convergencia completa haría crecer mucho cada línea
+            del resumen["convergencia"]
+            registro["perfil"] = resumen
+    except Exception as error:
+        registro["error"] = repr(error)
+    registro["segundos"] = time.perf_counter() - inicio
+    return registro
+
+
+def registro_error(diseno: dict, error: BaseException):
+    """Registro de un diseño que no llegó a devolver resultado, por ejemplo porque su proceso murió"""
+    registro = {"id": diseno["id"]}
+    if "parametros" in diseno:
+        registro["parametros"] = diseno["parametros"]
+    registro["error"] = repr(error)
+    registro["segundos"] = 0.0
+    return registro
+
+
+def ejecutar_barrido(entrada: str, salida: str, procesos=None, opciones=None, reintentar_errores=False):
+    """
+    Optimiza todos los diseños de la entrada con un grupo acotado de procesos y escribe un registro JSON por
+    línea en la salida en cuanto cada diseño termina. Los diseños que ya están en la salida se saltan, así que
+    un barrido interrumpido continúa donde se quedó. Un diseño que terminó con error también se salta, salvo
+    con reintentar_errores; entonces su nuevo registro se agrega después y el último de cada id es el vigente.
+    Si un diseño mata a su proceso (memoria agotada, una falla del resolvedor) el grupo se vuelve a crear y los
+    diseños que estaban en curso se repiten de uno en uno; el que vuelve a romper el grupo queda con error.
+    :param entrada: archivo JSON o JSONL con los diseños
+    :param salida: archivo JSONL de resultados
+    :param procesos: número de procesos, None usa todos los núcleos
+    :param opciones: argumentos para Construccion.optimizar
+    :param reintentar_errores: vuelve a optimizar los diseños cuyo último registro es un error
+    :return numero: cantidad de diseños optimizados en esta ejecución
+    """
+    opciones = opciones or {}
+    terminados = ids_terminados(salida, reintentar_errores)
+    pendientes = (diseno for diseno in leer_disenos(entrada) if diseno["id"] not in terminados)
+    procesos = procesos or os.cpu_count() or 1
+    numero = 0
+    grupo = ProcessPoolExecutor(procesos)
+    # Futuro -> diseño; un diseño sospechoso de romper el grupo se repite solo, en aislado
+    en_curso = {}
+    sospechosos: List = []
+    aislado = None
+    try:
+        with open(salida, "a") as archivo_escritura:
+            while True:
+                try:
+                    if aislado is None and sospechosos:
+                        if not en_curso:
+                            diseno = sospechosos.pop(0)
+                            aislado = grupo.submit(optimizar_diseno, diseno, opciones)
+                            en_curso[aislado] = diseno
+                    elif aislado is None:
+                        # Se mantienen como máximo dos diseños por proceso en la cola para no leer toda la entrada
+                        while len(en_curso) < 2 * procesos:
+                            diseno = next(pendientes, None)
+                            if diseno is None:
+                                break
+                            en_curso[grupo.submit(optimizar_diseno, diseno, opciones)] = diseno
+                except BrokenProcessPool:
+                    # El grupo se rompió entre la última espera y este envío
+                    sospechosos.append(diseno)
+                    grupo.shutdown(wait=False)
+                    grupo = ProcessPoolExecutor(procesos)
+                    continue
+                if not en_curso:
+                    break
+                terminados_ahora, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                if any(isinstance(futuro.exception(), BrokenProcessPool) for futuro in terminados_ahora):
+                    # Un grupo roto termina con error todos sus trabajos; no se sabe cuál lo rompió
+                    terminados_ahora, _ = wait(en_curso)
+                    grupo.shutdown(wait=False)
+                    grupo = ProcessPoolExecutor(procesos)
+                for futuro in terminados_ahora:
+                    diseno = en_curso.pop(futuro)
+                    error = futuro.exception()
+                    if isinstance(error, BrokenProcessPool) and futuro is not aislado:
+                        sospechosos.append(diseno)
+                        continue
+                    registro = futuro.result() if error is None else registro_error(diseno, error)
+                    if futuro is aislado:
+                        aislado = None
+                    archivo_escritura.write(json.dumps(registro) + "\n")
+                    archivo_escritura.flush()
+                    numero += 1
+    finally:
+        grupo.shutdown()
+    return numero
+
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Optimiza por lotes armaduras definidas en JSON o JSONL")
+    analizador.add_argument("entrada", help="archivo .json o .jsonl con los diseños")
+    analizador.add_argument("salida", help="archivo .jsonl de resultados, se continúa si ya existe")
+    analizador.add_argument("--procesos", type=int, default=None, help="número de procesos (todos los núcleos)")
+    analizador.add_argument("--metodo", default="powell", help="powell, L-BFGS-B, SLSQP, ...")
+    analizador.add_argument("--inactivo", action="store_true", help="solo evalúa la geometría inicial")
+    analizador.add_argument("--perfil", action="store_true", help="agrega los tiempos por fase a cada resultado")
+    analizador.add_argument("--limite-segundos", type=float, default=None,
+                            help="tiempo máximo por diseño; se guarda lo mejor encontrado hasta ahí")
+    analizador.add_argument("--arranques", default=None,
+                            help="directorio donde guardar las geometrías optimizadas y arrancar desde ellas")
+    analizador.add_argument("--reintentar-errores", action="store_true",
+                            help="vuelve a optimizar los diseños que terminaron con error")
+    argumentos = analizador.parse_args()
+    total = ejecutar_barrido(argumentos.entrada, argumentos.salida, procesos=argumentos.procesos,
+                             opciones={"metodo": argumentos.metodo, "activo": not argumentos.inactivo,
+                                       "perfil": argumentos.perfil, "limite_segundos": argumentos.limite_segundos,
+                                       "arranques": argumentos.arranques},
+                             reintentar_errores=argumentos.reintentar_errores)
+    print("Diseños optimizados:", total)
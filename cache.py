@@ -0,0 +1,83 @@
+import numpy as np
+from collections import OrderedDict
+
+
+class CacheSoluciones(object):
+    """
+    Caché LRU acotada de soluciones del sistema de equilibrio. La llave son las posiciones variables redondeadas
+    a una tolerancia junto con el caso de carga, así que dos geometrías que difieren menos que la tolerancia
+    comparten la misma solución.
+    """
+    def __init__(self, tolerancia=1e-9, max_entradas=4096, max_bytes=None):
+        """
+        :param tolerancia: tamaño de la cuantización de las coordenadas, en metros
+        :param max_entradas: número máximo de soluciones guardadas
+        :param max_bytes: memoria máxima de los arreglos guardados, None para no limitarla
+        """
+        self.tolerancia = tolerancia
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.entradas = OrderedDict()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def llave(self, valores, caso: int):
+        """Llave de las posiciones variables cuantizadas y el caso de carga"""
+        cuantizados = np.round(np.asarray(valores, dtype=float) / self.tolerancia).astype(np.int64)
+        return caso, cuantizados.tobytes()
+
+    def obtener(self, llave):
+        """
+        Devuelve la entrada guardada, o None, y la marca como la más reciente
+        :param llave:
+        :return entrada: diccionario de arreglos
+        """
+        entrada = self.entradas.get(llave)
+        if entrada is None:
+            self.fallos += 1
+            return None
+        self.entradas.move_to_end(llave)
+        self.aciertos += 1
+        return entrada
+
+    def guardar(self, llave, entrada: dict):
+        """Guarda una entrada y desaloja las menos usadas recientemente hasta volver a los límites"""
+        if llave in self.entradas:
+            self.bytes -= self._tamaño(self.entradas.pop(llave))
+        self.entradas[llave] = entrada
+        self.bytes += self._tamaño(entrada)
+        while len(self.entradas) > self.max_entradas or \
+                (self.max_bytes is not None and self.bytes > self.max_bytes and len(self.entradas) > 1):
+            llave_vieja, entrada_vieja = self.entradas.popitem(last=False)
+            self.bytes -= self._tamaño(entrada_vieja)
+            self.desalojos += 1
+
+    def actualizar(self, llave, nombre: str, valor):
+        """Agrega un arreglo a una entrada existente, p. ej. los pesos por material calculados después"""
+        entrada = self.entradas.get(llave)
+        if entrada is not None:
+            self.bytes -= self._tamaño(entrada)
+            entrada[nombre] = valor
+            self.bytes += self._tamaño(entrada)
+
+    def limpiar(self):
+        """Vacía la caché, necesario si cambian las cargas, los materiales o la topología"""
+        self.entradas.clear()
+        self.bytes = 0
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self.entradas),
+            "bytes": self.bytes,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+
+    @staticmethod
+    def _tamaño(entrada: dict):
+        return sum(np.asarray(valor).nbytes for valor in entrada.values())
@@ -0,0 +1,317 @@
+import math
+import statistics
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+# Distribuciones de los factores aleatorios, todas con la media y el coeficiente de variación dados
+DISTRIBUCIONES = ("normal", "lognormal", "gumbel")
+# Bytes aproximados de los arreglos de una tanda de muestras. Cada tanda tiene su propia semilla y su tamaño solo
+# depende del problema, así que el resultado no depende de cómo se agrupan las tandas en bloques ni en procesos
+MEMORIA_TANDA = 4 * 2 ** 20
+
+
+def factores_aleatorios(generador, distribucion: str, media, cov, forma):
+    """
+    Factores aleatorios con media y coeficiente de variación dados; media y cov se combinan con broadcasting,
+    p. ej. un valor por fila (filas x 1) contra forma (filas x muestras)
+    :param generador: np.random.Generator
+    :param distribucion: "normal", "lognormal" o "gumbel" (de máximos, la usual para cargas variables)
+    :param media:
+    :param cov: desviación estándar / media
+    :param forma:
+    :return factores:
+    """
+    media = np.asarray(media, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    if distribucion == "normal":
+        return media * (1 + cov * generador.standard_normal(forma))
+    if distribucion == "lognormal":
+        sigma = np.sqrt(np.log1p(cov ** 2))
+        return media * np.exp(sigma * generador.standard_normal(forma) - 0.5 * sigma ** 2)
+    if distribucion == "gumbel":
+        # Media loc + γ·escala y desviación π·escala/√6
+        escala = cov * math.sqrt(6) / math.pi
+        return media * (1 - np.euler_gamma * escala - escala * np.log(-np.log(generador.random(forma))))
+    raise ValueError("Distribución desconocida: " + str(distribucion) + ", use una de " + ", ".join(DISTRIBUCIONES))
+
+
+class AnalisisConfiabilidad(object):
+    """
+    Probabilidad de falla de un diseño ya dimensionado por Monte Carlo, con las magnitudes de las cargas y la
+    resistencia de los materiales aleatorias. Con la geometría fija las fuerzas son lineales en las cargas, así
+    que cada componente aleatoria de carga (un caso de carga completo, o la carga de una viga en un caso) se
+    resuelve una sola vez como columna de A·X = B, todas con una factorización. Las fuerzas de una tanda de
+    muestras son entonces un solo producto
+        F = X_base · ξ        (vigas x componentes) · (componentes x muestras)
+    y se comparan con las capacidades de las áreas actuales, con las mismas fórmulas del dimensionamiento:
+        tensión    F <= fy·A
+        compresión |F| <= π·E·A²/L²   (el inverso de calcular_areas)
+    o, con secciones comerciales, |F| <= fy·A y |F| <= π²·E·I/(K·L)². fy y E de cada viga son aleatorios
+    alrededor de los valores de materials.json. Como la armadura es isostática, falla si falla cualquier viga.
+    Las muestras se procesan en tandas de memoria acotada, cada una con su propia semilla, agrupadas en bloques
+    que se reparten entre los procesos; el resultado solo depende de la semilla.
+    """
+    def __init__(self, X_base, componentes_casos, areas, longitudes, modulo_E, resistencia_fluencia, inercias=None,
+                 factor_longitud=0.5, nombres_vigas=None, casos=None, distribucion_cargas="gumbel", media_cargas=1.0,
+                 cov_cargas=0.2, distribucion_material="lognormal", cov_fluencia=0.07, cov_modulo=0.03,
+                 tolerancia=1e-9):
+        """
+        :param X_base: (vigas x componentes) fuerzas de cada componente de carga con su valor nominal
+        :param componentes_casos: posición en casos del caso de cada componente
+        :param areas: área actual de cada viga
+        :param longitudes:
+        :param modulo_E: valor medio de cada viga
+        :param resistencia_fluencia: valor medio de cada viga
+        :param inercias: con secciones comerciales, la inercia de cada viga; NaN en las vigas sin sección
+        :param factor_longitud: K de la longitud efectiva de pandeo de las secciones
+        :param nombres_vigas:
+        :param casos: índices en lista_cargas de los casos de carga aleatorios
+        :param distribucion_cargas: de los factores de carga, ver factores_aleatorios
+        :param media_cargas: media de los factores de carga respecto a la carga nominal, uno o uno por caso
+        :param cov_cargas: coeficiente de variación de los factores de carga, uno o uno por caso
+        :param distribucion_material: de los factores de fy y E de cada viga
+        :param cov_fluencia:
+        :param cov_modulo:
+        :param tolerancia: fuerzas menores que tolerancia·la mayor son ruido de la solución y valen cero; sin esto
+            una viga de fuerza nula, con área casi nula, fallaría con ese ruido
+        """
+        self.X_base = np.asarray(X_base, dtype=float).copy()
+        self.X_base[np.abs(self.X_base) < tolerancia * np.max(np.abs(self.X_base), initial=0)] = 0
+        self.numero_vigas, self.numero_componentes = self.X_base.shape
+        self.componentes_casos = np.asarray(componentes_casos, dtype=int)
+        self.casos = list(casos) if casos is not None else list(range(0, int(self.componentes_casos.max()) + 1))
+        self.nombres_vigas: List = list(nombres_vigas) if nombres_vigas is not None else \
+            [str(x) for x in range(0, self.numero_vigas)]
+        self.areas = np.asarray(areas, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.modulo_E = np.broadcast_to(np.asarray(modulo_E, dtype=float), (self.numero_vigas,))
+        self.resistencia_fluencia = np.broadcast_to(np.asarray(resistencia_fluencia, dtype=float),
+                                                    (self.numero_vigas,))
+        for distribucion in (distribucion_cargas, distribucion_material):
+            if distribucion not in DISTRIBUCIONES:
+                raise ValueError("Distribución desconocida: " + str(distribucion))
+        self.distribucion_cargas = distribucion_cargas
+        self.distribucion_material = distribucion_material
+        # Parámetros de las cargas por componente, (componentes x 1) para combinarlos con las muestras
+        self.media_cargas = np.broadcast_to(np.asarray(media_cargas, dtype=float),
+                                            (len(self.casos),))[self.componentes_casos][:, None]
+        self.cov_cargas = np.broadcast_to(np.asarray(cov_cargas, dtype=float),
+                                          (len(self.casos),))[self.componentes_casos][:, None]
+        self.cov_fluencia = cov_fluencia
+        self.cov_modulo = cov_modulo
+
+        # Inversos de las capacidades nominales, para comparar F / capacidad nominal con el factor aleatorio
+        with np.errstate(divide="ignore"):
+            self.inversa_fluencia = 1 / (self.resistencia_fluencia * self.areas)
+            if inercias is None:
+                self.inversa_pandeo = self.longitudes ** 2 / (math.pi * self.modulo_E * self.areas ** 2)
+                self.fluencia_compresion = False
+            else:
+                inercias = np.asarray(inercias, dtype=float)
+                pandeo = (factor_longitud * self.longitudes) ** 2 / (math.pi ** 2 * self.modulo_E * np.nan_to_num(inercias))
+                self.inversa_pandeo = np.where(np.isnan(inercias), np.inf, pandeo)
+                self.inversa_fluencia = np.where(np.isnan(inercias), np.inf, self.inversa_fluencia)
+                self.fluencia_compresion = True
+        self.inversa_fluencia = self.inversa_fluencia[:, None]
+        self.inversa_pandeo = self.inversa_pandeo[:, None]
+
+    @classmethod
+    def desde_construccion(cls, construccion, casos=None, por_viga=False, **opciones):
+        """
+        Análisis del diseño actual de una Construccion: su geometría, sus áreas (o secciones) y el material de
+        cada viga. Las cargas móviles no entran, solo los casos de lista_cargas.
+        :param construccion:
+        :param casos: índices de los casos de carga aleatorios, que actúan juntos; por defecto el caso actual
+        :param por_viga: la carga de cada viga varía por separado en vez de todo el caso con un solo factor
+        :param opciones: los demás parámetros de AnalisisConfiabilidad
+        :return analisis:
+        """
+        modelo = construccion.modelo
+        casos = [modelo.caso] if casos is None else list(casos)
+        if por_viga:
+            # Una componente por cada viga cargada de cada caso: (componentes x vigas x dimension) con una sola
+            # viga distinta de cero
+            posicion, vigas = np.nonzero(np.any(modelo.cargas[casos] != 0, axis=2))
+            cargas = np.zeros((len(vigas), modelo.numero_vigas, modelo.dimension))
+            cargas[np.arange(len(vigas)), vigas] = modelo.cargas[np.asarray(casos)[posicion], vigas]
+        else:
+            posicion = np.arange(len(casos))
+            cargas = modelo.cargas[casos]
+        B = modelo.sistema.cargas(0.5 * cargas * modelo.longitudes[:, None])
+        X = modelo.sistema.factorizar().resolver(B)
+        inercias = None
+        if construccion.secciones is not None and construccion.secciones_vigas is not None:
+            indices = construccion.secciones_vigas
+            inercias = np.where(indices >= 0, construccion.secciones.inercias[indices], np.nan)
+            opciones.setdefault("factor_longitud", construccion.factor_longitud)
+        return cls(X[:modelo.numero_vigas], posicion, modelo.areas.copy(), modelo.longitudes.copy(),
+                   modelo.modulo_E.copy(), modelo.resistencia_fluencia.copy(), inercias,
+                   nombres_vigas=modelo.nombres_vigas, casos=casos, **opciones)
+
+    def muestras_tanda(self):
+        """Muestras por tanda para que los arreglos de una tanda ocupen unos MEMORIA_TANDA bytes"""
+        # Fuerzas y dos factores de material por viga, sus comparaciones y los factores de carga
+        return max(1, int(MEMORIA_TANDA // (8 * (4 * self.numero_vigas + self.numero_componentes))))
+
+    def simular(self, muestras: int, semilla):
+        """
+        Simula una tanda de muestras
+        :param muestras:
+        :param semilla: np.random.SeedSequence o entero
+        :return fallas_tension, fallas_compresion, fallas_sistema: número de muestras en que falla cada viga a
+            tensión y a compresión, y en que falla alguna viga
+        """
+        generador = np.random.default_rng(semilla)
+        cargas = factores_aleatorios(generador, self.distribucion_cargas, self.media_cargas, self.cov_cargas,
+                                     (self.numero_componentes, muestras))
+        fuerzas = self.X_base @ cargas
+        # Los factores de material solo se generan para las vigas que en esta tanda llegan a tener tensión o
+        # compresión; en una armadura casi todas trabajan con un solo signo
+        filas_tension = np.flatnonzero(np.any(fuerzas > 0, axis=1))
+        filas_compresion = np.flatnonzero(np.any(fuerzas < 0, axis=1))
+        filas_fluencia = np.union1d(filas_tension, filas_compresion) if self.fluencia_compresion else filas_tension
+        fluencia = factores_aleatorios(generador, self.distribucion_material, 1.0, self.cov_fluencia,
+                                       (len(filas_fluencia), muestras))
+        modulo = factores_aleatorios(generador, self.distribucion_material, 1.0, self.cov_modulo,
+                                     (len(filas_compresion), muestras))
+        # Falla cuando la fuerza entre la capacidad nominal supera el factor aleatorio de la capacidad
+        tension = np.zeros((self.numero_vigas, muestras), dtype=bool)
+        compresion = np.zeros((self.numero_vigas, muestras), dtype=bool)
+        demanda = fuerzas[filas_fluencia]
+        if self.fluencia_compresion:
+            # Con secciones la fluencia también limita la compresión
+            demanda = np.abs(demanda)
+        tension[filas_fluencia] = demanda * self.inversa_fluencia[filas_fluencia] > fluencia
+        compresion[filas_compresion] = \
+            -fuerzas[filas_compresion] * self.inversa_pandeo[filas_compresion] > modulo
+        if self.fluencia_compresion:
+            compresion |= tension & (fuerzas < 0)
+            tension &= fuerzas > 0
+        sistema = np.count_nonzero(np.any(tension | compresion, axis=0))
+        return np.count_nonzero(tension, axis=1), np.count_nonzero(compresion, axis=1), sistema
+
+    def simular_bloque(self, tamaños, semillas):
+        """Simula varias tandas, una tras otra, y suma sus fallas como simular"""
+        fallas_tension = np.zeros(self.numero_vigas, dtype=np.int64)
+        fallas_compresion = np.zeros(self.numero_vigas, dtype=np.int64)
+        fallas_sistema = 0
+        for muestras, semilla in zip(tamaños, semillas):
+            tension, compresion, sistema = self.simular(muestras, semilla)
+            fallas_tension += tension
+            fallas_compresion += compresion
+            fallas_sistema += sistema
+        return fallas_tension, fallas_compresion, fallas_sistema
+
+    def ejecutar(self, muestras=100000, semilla=None, procesos=1, memoria_bloque=32 * 2 ** 20):
+        """
+        :param muestras: número de realizaciones de cargas y materiales
+        :param semilla: para repetir el análisis; el resultado no depende de procesos ni de memoria_bloque
+        :param procesos: procesos que reparten los bloques; None usa todos los núcleos
+        :param memoria_bloque: bytes aproximados de las tandas de cada bloque, la unidad de trabajo de cada proceso;
+            un bloque tiene al menos una tanda y se simula una tanda a la vez
+        :return resultado: ResultadoConfiabilidad
+        """
+        inicio = time.perf_counter()
+        por_tanda = self.muestras_tanda()
+        tamaños = [min(por_tanda, muestras - x) for x in range(0, muestras, por_tanda)]
+        semillas = np.random.SeedSequence(semilla).spawn(len(tamaños))
+        por_bloque = max(1, int(memoria_bloque // MEMORIA_TANDA))
+        tamaños = [tamaños[x:x + por_bloque] for x in range(0, len(tamaños), por_bloque)]
+        semillas = [semillas[x:x + por_bloque] for x in range(0, len(semillas), por_bloque)]
+        fallas_tension = np.zeros(self.numero_vigas, dtype=np.int64)
+        fallas_compresion = np.zeros(self.numero_vigas, dtype=np.int64)
+        fallas_sistema = 0
+        if procesos == 1 or len(tamaños) == 1:
+            resultados = map(self.simular_bloque, tamaños, semillas)
+            grupo = None
+        else:
+            grupo = ProcessPoolExecutor(procesos, initializer=_iniciar_proceso, initargs=(self,))
+            resultados = grupo.map(_simular_en_proceso, tamaños, semillas)
+        try:
+            for tension, compresion, sistema in resultados:
+                fallas_tension += tension
+                fallas_compresion += compresion
+                fallas_sistema += sistema
+        finally:
+            if grupo is not None:
+                grupo.shutdown()
+        return ResultadoConfiabilidad(self, muestras, fallas_tension, fallas_compresion, fallas_sistema,
+                                      time.perf_counter() - inicio)
+
+
+class ResultadoConfiabilidad(object):
+    """Probabilidades de falla estimadas por AnalisisConfiabilidad.ejecutar"""
+    def __init__(self, analisis: AnalisisConfiabilidad, muestras: int, fallas_tension, fallas_compresion,
+                 fallas_sistema: int, segundos: float):
+        self.muestras = muestras
+        self.nombres_vigas = analisis.nombres_vigas
+        self.casos = analisis.casos
+        self.fallas_tension = fallas_tension
+        self.fallas_compresion = fallas_compresion
+        self.fallas_sistema = fallas_sistema
+        self.segundos = segundos
+        # Una viga que falla a tensión en una muestra no puede fallar a compresión en la misma
+        self.probabilidad_vigas = (fallas_tension + fallas_compresion) / muestras
+        self.probabilidad_sistema = fallas_sistema / muestras
+
+    @staticmethod
+    def indice_confiabilidad(probabilidad):
+        """β = -Φ⁻¹(probabilidad); infinito si no se observó ninguna falla"""
+        if probabilidad <= 0:
+            return math.inf
+        if probabilidad >= 1:
+            return -math.inf
+        return -statistics.NormalDist().inv_cdf(probabilidad)
+
+    def error_estandar(self, probabilidad):
+        """Error estándar de una probabilidad estimada con las muestras del análisis"""
+        return math.sqrt(probabilidad * (1 - probabilidad) / self.muestras)
+
+    def criticas(self, numero=5):
+        """Índices de las vigas con mayor probabilidad de falla, de mayor a menor"""
+        return np.argsort(-self.probabilidad_vigas, kind="stable")[:numero]
+
+    def a_dict(self):
+        """El resultado como diccionario serializable en JSON; β infinito, sin fallas observadas, queda en None"""
+        def beta(probabilidad):
+            valor = self.indice_confiabilidad(probabilidad)
+            return valor if math.isfinite(valor) else None
+
+        return {
+            "muestras": self.muestras,
+            "casos": self.casos,
+            "probabilidad_sistema": self.probabilidad_sistema,
+            "error_sistema": self.error_estandar(self.probabilidad_sistema),
+            "beta_sistema": beta(self.probabilidad_sistema),
+            "vigas": [{"nombre": self.nombres_vigas[x],
+                       "probabilidad": float(self.probabilidad_vigas[x]),
+                       "tension": int(self.fallas_tension[x]),
+                       "compresion": int(self.fallas_compresion[x]),
+                       "beta": beta(self.probabilidad_vigas[x])}
+                      for x in range(0, len(self.nombres_vigas))],
+            "segundos": self.segundos,
+        }
+
+    def __str__(self):
+        texto = "Probabilidad de falla del sistema: {0:.3e} ± {1:.1e} (β = {2:.2f}), {3} muestras en {4:.2f} s\n"
+        texto = texto.format(self.probabilidad_sistema, self.error_estandar(self.probabilidad_sistema),
+                             self.indice_confiabilidad(self.probabilidad_sistema), self.muestras, self.segundos)
+        for x in self.criticas():
+            texto += "\t{0}: {1:.3e} (tensión {2}, compresión {3})\n".format(
+                self.nombres_vigas[x], self.probabilidad_vigas[x], self.fallas_tension[x], self.fallas_compresion[x])
+        return texto
+
+
+# Análisis de cada proceso del grupo, se copia una sola vez al iniciarlo
+_analisis_proceso = None
+
+
+def _iniciar_proceso(analisis: AnalisisConfiabilidad):
+    global _analisis_proceso
+    _analisis_proceso = analisis
+
+
+def _simular_en_proceso(tamaños, semillas):
+    return _analisis_proceso.simular_bloque(tamaños, semillas)
@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from typing import List
+from arranque import huella_topologia, huella_cargas
+
+VERSION = 1
+CABECERA = "cabecera.json"
+
+
+def tipo_registro(numero_libres: int, numero_vigas: int, tipo_resultados="float32"):
+    """
+    Registro de ancho fijo de una evaluación. Las posiciones variables y el peso van en float64 para reproducir
+    la geometría exacta; fuerzas y áreas, que solo se muestran, en tipo_resultados.
+    """
+    return np.dtype([
+        ("iteracion", np.int64),
+        ("caso", np.int32),
+        ("material", np.int32),
+        ("peso", np.float64),
+        ("segundos", np.float64),
+        ("valores", np.float64, (numero_libres,)),
+        ("fuerzas", tipo_resultados, (numero_vigas,)),
+        ("areas", tipo_resultados, (numero_vigas,)),
+    ])
+
+
+def _archivo_bloque(ruta: str, bloque: int):
+    return os.path.join(ruta, "bloque_{0:05d}.npy".format(bloque))
+
+
+def _leer_cabecera(ruta: str):
+    with open(os.path.join(ruta, CABECERA), "r") as archivo_lectura:
+        return json.load(archivo_lectura)
+
+
+def _registros_escritos(ruta: str, cabecera: dict):
+    """
+    Registros válidos del historial. La cabecera se actualiza al llenar cada bloque y al guardar; si el proceso
+    terminó sin guardar, los registros escritos del último bloque se cuentan buscando el primero vacío, que
+    tiene iteracion 0 porque los bloques se crean en ceros.
+    """
+    registros = cabecera["registros"]
+    por_bloque = cabecera["registros_bloque"]
+    ultimo = registros // por_bloque
+    if not os.path.exists(_archivo_bloque(ruta, ultimo)):
+        return registros
+    iteraciones = np.load(_archivo_bloque(ruta, ultimo), mmap_mode="r")["iteracion"]
+    # Los registros se escriben en orden, así que los escritos son un prefijo del bloque
+    inicio, fin = registros - ultimo * por_bloque, por_bloque
+    while inicio < fin:
+        mitad = (inicio + fin) // 2
+        if iteraciones[mitad] > 0:
+            inicio = mitad + 1
+        else:
+            fin = mitad
+    return ultimo * por_bloque + inicio
+
+
+class HistorialOptimizacion(object):
+    """
+    Registro en disco de cada evaluación de una optimización: posiciones variables, caso de carga, peso, material,
+    fuerzas y áreas de las vigas. Es un directorio con una cabecera JSON pequeña (topología, coordenadas base,
+    tipo de registro y materiales), las cargas en cargas.npy y bloques .npy de registros_bloque registros de
+    ancho fijo que se escriben por memoria mapeada; solo se agregan registros, nunca se reescriben. Los bloques se
+    crean completos en ceros, que en la mayoría de los sistemas de archivos no ocupan disco hasta escribirse.
+    Ver LectorHistorial para leerlo.
+    """
+    def __init__(self, ruta: str, modelo, registros_bloque=65536, tipo_resultados="float32"):
+        """
+        Crea el historial o, si ya existe uno de la misma topología y las mismas cargas en ruta, sigue agregando a
+        él. Las cargas se guardan una sola vez, así que un historial de otras cargas da ValueError.
+        :param ruta: directorio del historial
+        :param modelo: ModeloArmadura de la construcción
+        :param registros_bloque: registros por archivo
+        :param tipo_resultados: tipo de numpy de las fuerzas y las áreas
+        """
+        self.ruta = ruta
+        self.numero_vigas = modelo.numero_vigas
+        self.tipo = tipo_registro(int(np.count_nonzero(modelo.libres)), modelo.numero_vigas, tipo_resultados)
+        os.makedirs(ruta, exist_ok=True)
+        if os.path.exists(os.path.join(ruta, CABECERA)):
+            self.cabecera = _leer_cabecera(ruta)
+            if self.cabecera["topologia"] != huella_topologia(modelo) or \
+                    np.dtype(np.lib.format.descr_to_dtype(self.cabecera["tipo"])) != self.tipo:
+                raise ValueError("El historial en " + ruta + " es de otra armadura o de otro tipo de registro")
+            if self.cabecera.get("cargas") != huella_cargas(modelo):
+                raise ValueError("El historial en " + ruta + " es de otras cargas; use otro directorio")
+            self.cabecera["registros"] = _registros_escritos(ruta, self.cabecera)
+        else:
+            self.cabecera = {
+                "version": VERSION,
+                "topologia": huella_topologia(modelo),
+                "cargas": huella_cargas(modelo),
+                "tipo": np.lib.format.dtype_to_descr(self.tipo),
+                "registros_bloque": registros_bloque,
+                "registros": 0,
+                "materiales": [],
+                "dimension": modelo.dimension,
+                "nombres_nodos": modelo.nombres_nodos,
+                "nombres_vigas": modelo.nombres_vigas,
+                "nodo_a": modelo.nodo_a.tolist(),
+                "nodo_b": modelo.nodo_b.tolist(),
+                "coordenadas": modelo.coordenadas.tolist(),
+                "libres": modelo.libres.tolist(),
+                "restricciones": modelo.restricciones.tolist(),
+                "creado": time.time(),
+            }
+            np.save(os.path.join(ruta, "cargas.npy"), modelo.cargas)
+        self.registros_bloque = self.cabecera["registros_bloque"]
+        self.registros = self.cabecera["registros"]
+        self.materiales = {nombre: x for x, nombre in enumerate(self.cabecera["materiales"])}
+        self.bloque = None
+        self.columnas = {}
+        self.numero_bloque = -1
+        # Los segundos siguen contando desde el final de lo ya guardado
+        self.inicio = time.perf_counter() - self.segundos_guardados()
+        self.guardar()
+
+    def segundos_guardados(self):
+        if self.registros == 0:
+            return 0.0
+        ultimo = self.registros - 1
+        bloque = np.load(_archivo_bloque(self.ruta, ultimo // self.registros_bloque), mmap_mode="r")
+        return float(bloque["segundos"][ultimo % self.registros_bloque])
+
+    def abrir_bloque(self, numero: int):
+        """Mapea el bloque en el que cae el siguiente registro, creándolo si no existe"""
+        if self.bloque is not None:
+            self.bloque.flush()
+        archivo = _archivo_bloque(self.ruta, numero)
+        if os.path.exists(archivo):
+            self.bloque = np.load(archivo, mmap_mode="r+")
+        else:
+            self.bloque = np.lib.format.open_memmap(archivo, mode="w+", dtype=self.tipo,
+                                                    shape=(self.registros_bloque,))
+        self.numero_bloque = numero
+        # Vistas ndarray de cada campo sobre la misma memoria; indexar np.memmap es varias veces más lento
+        registros = self.bloque.view(np.ndarray)
+        self.columnas = {nombre: registros[nombre] for nombre in self.tipo.names}
+
+    def indice_material(self, nombre: str):
+        """Índice del material en la cabecera; un material nuevo se agrega y se guarda la cabecera"""
+        indice = self.materiales.get(nombre)
+        if indice is None:
+            indice = len(self.materiales)
+            self.materiales[nombre] = indice
+            self.cabecera["materiales"].append(nombre)
+            self.guardar()
+        return indice
+
+    def registrar(self, construccion):
+        """Agrega la evaluación actual de la construcción"""
+        numero, posicion = divmod(self.registros, self.registros_bloque)
+        if numero != self.numero_bloque:
+            self.abrir_bloque(numero)
+            if posicion == 0 and self.registros > 0:
+                self.guardar()
+        modelo = construccion.modelo
+        columnas = self.columnas
+        columnas["iteracion"][posicion] = max(1, construccion.iteracion)
+        columnas["caso"][posicion] = construccion.cargas_actuales
+        columnas["material"][posicion] = self.indice_material(construccion.material)
+        columnas["peso"][posicion] = construccion.peso
+        columnas["segundos"][posicion] = time.perf_counter() - self.inicio
+        columnas["valores"][posicion] = modelo.coordenadas[modelo.libres]
+        columnas["fuerzas"][posicion] = modelo.fuerzas
+        columnas["areas"][posicion] = modelo.areas
+        self.registros += 1
+
+    def guardar(self):
+        """Escribe los bloques y la cabecera con el número de registros; se llama al terminar cada optimización"""
+        if self.bloque is not None:
+            self.bloque.flush()
+        self.cabecera["registros"] = self.registros
+        temporal = os.path.join(self.ruta, CABECERA + ".tmp")
+        with open(temporal, "w") as archivo_escritura:
+            json.dump(self.cabecera, archivo_escritura)
+        os.replace(temporal, os.path.join(self.ruta, CABECERA))
+
+    def cerrar(self):
+        self.guardar()
+        self.bloque = None
+        self.columnas = {}
+        self.numero_bloque = -1
+
+
+class LectorHistorial(object):
+    """
+    Lee un historial de HistorialOptimizacion sin cargarlo en memoria: cada bloque se abre con memoria mapeada
+    y solo se leen los registros que se piden, así que ir a cualquier evaluación de millones es inmediato. Se
+    puede leer mientras la optimización sigue escribiendo; actualizar cuenta los registros nuevos.
+    """
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.cabecera = _leer_cabecera(ruta)
+        self.tipo = np.dtype(np.lib.format.descr_to_dtype(self.cabecera["tipo"]))
+        self.registros_bloque = self.cabecera["registros_bloque"]
+        self.nombres_nodos: List = self.cabecera["nombres_nodos"]
+        self.nombres_vigas: List = self.cabecera["nombres_vigas"]
+        self.nodo_a = np.array(self.cabecera["nodo_a"], dtype=int)
+        self.nodo_b = np.array(self.cabecera["nodo_b"], dtype=int)
+        self.coordenadas_base = np.array(self.cabecera["coordenadas"], dtype=float)
+        self.libres = np.array(self.cabecera["libres"], dtype=bool)
+        self.restricciones = np.array(self.cabecera["restricciones"], dtype=float)
+        self.cargas = np.load(os.path.join(ruta, "cargas.npy"), mmap_mode="r")
+        self.bloques = {}
+        self.registros = 0
+        self.actualizar()
+
+    def actualizar(self):
+        """Vuelve a leer la cabecera y cuenta los registros escritos desde la última vez"""
+        self.cabecera = _leer_cabecera(self.ruta)
+        self.registros = _registros_escritos(self.ruta, self.cabecera)
+        # El último bloque pudo haber crecido o aparecer; los anteriores ya no cambian
+        self.bloques.pop(max(self.bloques, default=-1), None)
+        return self.registros
+
+    @property
+    def materiales(self):
+        return self.cabecera["materiales"]
+
+    def __len__(self):
+        return self.registros
+
+    def bloque(self, numero: int):
+        if numero not in self.bloques:
+            self.bloques[numero] = np.load(_archivo_bloque(self.ruta, numero), mmap_mode="r")
+        return self.bloques[numero]
+
+    def __getitem__(self, indice: int):
+        """Registro de la evaluación indice (0 es la primera, -1 la última) como np.void de solo lectura"""
+        if indice < 0:
+            indice += self.registros
+        if not 0 <= indice < self.registros:
+            raise IndexError("El historial tiene {0} registros".format(self.registros))
+        numero, posicion = divmod(indice, self.registros_bloque)
+        return self.bloque(numero)[posicion]
+
+    def campo(self, nombre: str, inicio=0, fin=None, paso=1):
+        """
+        Un campo de un rango de registros, p. ej. los pesos para graficar la convergencia; solo se leen los
+        bloques del rango
+        :return valores: arreglo nuevo (registros x ...)
+        """
+        inicio, fin, paso = slice(inicio, fin, paso).indices(self.registros)
+        partes = []
+        for numero in range(inicio // self.registros_bloque, (max(fin, inicio + 1) - 1) // self.registros_bloque + 1):
+            base = numero * self.registros_bloque
+            # Primer registro del bloque que cae en la secuencia inicio, inicio + paso, ...
+            primero = max(inicio, base + (inicio - base) % paso)
+            partes.append(self.bloque(numero)[nombre][primero - base:min(fin, base + self.registros_bloque) - base:paso])
+        if not partes:
+            return np.zeros((0,) + self.tipo[nombre].shape, dtype=self.tipo[nombre].base)
+        return np.concatenate(partes)
+
+    def mejor(self, caso=None):
+        """
+        Índice del registro de menor peso, recorriendo los pesos bloque por bloque. Cada peso es el del caso de
+        carga de su evaluación, así que para comparar geometrías conviene fijar el caso.
+        :param caso: índice del caso de carga, None para todos
+        :return indice: -1 si no hay registros del caso
+        """
+        mejor, mejor_peso = -1, np.inf
+        for numero in range(0, -(-self.registros // self.registros_bloque)):
+            base = numero * self.registros_bloque
+            registros = self.bloque(numero)[:min(self.registros - base, self.registros_bloque)]
+            pesos = registros["peso"] if caso is None else np.where(registros["caso"] == caso, registros["peso"], np.inf)
+            posicion = int(np.argmin(pesos))
+            if pesos[posicion] < mejor_peso:
+                mejor, mejor_peso = base + posicion, float(pesos[posicion])
+        return mejor
+
+    def coordenadas(self, indice: int):
+        """Coordenadas de todos los nodos en la evaluación indice"""
+        coordenadas = self.coordenadas_base.copy()
+        coordenadas[self.libres] = self[indice]["valores"]
+        return coordenadas
+
+    def cargas_nodos(self, indice: int, coordenadas=None):
+        """Carga que recibe cada nodo en la evaluación indice, como ModeloArmadura.cargas_nodos"""
+        coordenadas = self.coordenadas(indice) if coordenadas is None else coordenadas
+        deltas = coordenadas[self.nodo_a] - coordenadas[self.nodo_b]
+        mitades = 0.5 * self.cargas[int(self[indice]["caso"])] * np.sqrt(np.einsum("ij,ij->i", deltas, deltas))[:, None]
+        cargas = np.zeros(np.shape(coordenadas))
+        np.add.at(cargas, self.nodo_a, mitades)
+        np.add.at(cargas, self.nodo_b, mitades)
+        return cargas
+
+    def resumen(self):
+        """Datos generales del historial como diccionario serializable en JSON"""
+        tamaño = sum(os.path.getsize(os.path.join(self.ruta, nombre)) for nombre in os.listdir(self.ruta))
+        datos = {"registros": self.registros, "bytes_registro": self.tipo.itemsize, "bytes_disco": tamaño,
+                 "vigas": len(self.nombres_vigas), "posiciones_variables": int(np.count_nonzero(self.libres))}
+        if self.registros:
+            mejor = self.mejor()
+            registro = self[mejor]
+            datos.update({"mejor": mejor, "mejor_peso": float(registro["peso"]),
+                          "mejor_iteracion": int(registro["iteracion"]),
+                          "mejor_material": self.materiales[int(registro["material"])],
+                          "segundos": float(self[-1]["segundos"])})
+        return datos
+
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Resume o reproduce el historial de una optimización")
+    analizador.add_argument("ruta", help="directorio del historial")
+    analizador.add_argument("--reproducir", action="store_true", help="abre el visor para recorrer las evaluaciones")
+    analizador.add_argument("--inicio", type=int, default=None, help="evaluación inicial, por defecto la mejor")
+    analizador.add_argument("--fps", type=int, default=30)
+    argumentos = analizador.parse_args()
+
+    lector = LectorHistorial(argumentos.ruta)
+    print(json.dumps(lector.resumen(), indent=2))
+    if argumentos.reproducir:
+        import Graficas
+        visor = Graficas.VisorConstruccion("Structubridgex - historial", fps_maximo=argumentos.fps)
+        visor.reproducir(lector, argumentos.inicio)
@@ -0,0 +1,145 @@
+import numpy as np
+from typing import List
+
+
+class TrenCargas(object):
+    """Cargas puntuales que se mueven juntas sobre el tablero, como los ejes de un vehículo"""
+    def __init__(self, cargas, separaciones, nombre=""):
+        """
+        :param cargas: fuerza de cada eje en N, del primero al último, en la dirección de las cargas móviles
+        :param separaciones: distancia en m de cada eje al anterior, len(cargas) - 1 valores
+        :param nombre:
+        """
+        self.cargas = np.asarray(cargas, dtype=float).ravel()
+        separaciones = np.asarray(separaciones, dtype=float).ravel()
+        if len(separaciones) != len(self.cargas) - 1:
+            raise ValueError("Un tren de {0} ejes necesita {1} separaciones".format(len(self.cargas),
+                                                                                  len(self.cargas) - 1))
+        # Distancia de cada eje detrás del primero
+        self.distancias = np.concatenate(([0.0], np.cumsum(separaciones)))
+        self.nombre = nombre
+
+    @classmethod
+    def desde_dict(cls, datos: dict):
+        """:param datos: {"nombre": ..., "cargas": [N por eje], "separaciones": [m entre ejes]}"""
+        return cls(datos["cargas"], datos.get("separaciones", []), datos.get("nombre", ""))
+
+    @property
+    def longitud(self):
+        return float(self.distancias[-1])
+
+
+class LineasInfluencia(object):
+    """
+    Cargas móviles por superposición. Con la geometría fija, la fuerza de cada viga por una carga unitaria en
+    cada nodo del tablero (su línea de influencia) sale de resolver el sistema de equilibrio con una columna por
+    nodo, junto con los casos de carga y con la misma factorización. Un eje entre dos nodos del tablero se
+    reparte entre ellos por la regla de la palanca, como lo haría un larguero simplemente apoyado, así que la
+    posición del tren solo entra en una matriz Q (nodos del tablero x posiciones) y las fuerzas de todas las
+    posiciones son
+        X = X_caso + X_unitarias·Q
+    Entre nodos del tablero las líneas de influencia son rectas, así que los extremos de la envolvente están en
+    las posiciones donde algún eje pasa por un nodo; por defecto solo se evalúan esas.
+    """
+    def __init__(self, nodos_tablero, trenes: List, numero_nodos: int, dimension=2, paso=None, direccion=None,
+                 ambos_sentidos=True):
+        """
+        :param nodos_tablero: índices de los nodos del tablero en orden a lo largo del recorrido
+        :param trenes: lista de TrenCargas
+        :param numero_nodos: de la armadura
+        :param dimension:
+        :param paso: distancia entre posiciones del tren; None evalúa solo las posiciones con algún eje sobre un
+            nodo del tablero, que dan la envolvente exacta
+        :param direccion: dirección de las cargas de los ejes, se normaliza; por defecto hacia abajo en el último
+            eje, -y en el plano y -z en el espacio
+        :param ambos_sentidos: el tren cruza en los dos sentidos; solo cambia algo si no es simétrico
+        """
+        self.nodos_tablero = np.asarray(nodos_tablero, dtype=int)
+        if len(self.nodos_tablero) < 2:
+            raise ValueError("El tablero necesita al menos dos nodos")
+        self.trenes = list(trenes)
+        self.paso = paso
+        if direccion is None:
+            direccion = -np.eye(dimension)[-1]
+        direccion = np.asarray(direccion, dtype=float)
+        self.direccion = direccion / np.linalg.norm(direccion)
+        self.ambos_sentidos = ambos_sentidos
+        # Una carga unitaria en la dirección de los ejes en cada nodo del tablero, (filas x nodos del tablero)
+        self.cargas_unitarias = np.zeros((dimension * numero_nodos, len(self.nodos_tablero)))
+        for eje in range(0, dimension):
+            self.cargas_unitarias[dimension * self.nodos_tablero + eje, np.arange(len(self.nodos_tablero))] = \
+                self.direccion[eje]
+        # Ejes de cada recorrido (tren y sentido), completados con ejes sin carga hasta el tren más largo; en
+        # sentido contrario los ejes quedan delante del primero
+        recorridos = [(indice, tren.cargas, tren.distancias) for indice, tren in enumerate(self.trenes)]
+        if ambos_sentidos:
+            recorridos += [(indice, tren.cargas, -tren.distancias) for indice, tren in enumerate(self.trenes)]
+        ejes = max([len(cargas) for indice, cargas, distancias in recorridos] + [1])
+        self.trenes_recorridos = np.array([indice for indice, cargas, distancias in recorridos], dtype=int)
+        self.cargas_ejes = np.zeros((len(recorridos), ejes))
+        self.distancias_ejes = np.zeros((len(recorridos), ejes))
+        for x, (indice, cargas, distancias) in enumerate(recorridos):
+            self.cargas_ejes[x, :len(cargas)] = cargas
+            self.distancias_ejes[x, :len(distancias)] = distancias
+
+    def abscisas(self, coordenadas):
+        """Distancia de cada nodo del tablero al primero a lo largo del tablero"""
+        tramos = np.diff(coordenadas[self.nodos_tablero], axis=0)
+        return np.concatenate(([0.0], np.cumsum(np.sqrt(np.einsum("ij,ij->i", tramos, tramos)))))
+
+    def posiciones(self, abscisas):
+        """
+        Posiciones del primer eje de cada recorrido, desde que entra el primer eje hasta que sale el último
+        :return recorridos, frentes: recorrido de cada posición y posición de su primer eje
+        """
+        numero = len(self.trenes_recorridos)
+        if self.paso is None:
+            # Cada eje sobre cada nodo; los ejes de relleno repiten las posiciones del primero
+            frentes = (abscisas[None, :, None] + self.distancias_ejes[:, None, :]).ravel()
+            recorridos = np.repeat(np.arange(numero), len(abscisas) * self.distancias_ejes.shape[1])
+            orden = np.lexsort((frentes, recorridos))
+            frentes, recorridos = frentes[orden], recorridos[orden]
+            nuevas = np.r_[True, (recorridos[1:] != recorridos[:-1]) | (frentes[1:] != frentes[:-1])]
+            return recorridos[nuevas], frentes[nuevas]
+        inicios = np.minimum(0.0, self.distancias_ejes.min(axis=1))
+        fines = abscisas[-1] + np.maximum(0.0, self.distancias_ejes.max(axis=1))
+        frentes = [np.append(np.arange(inicio, fin, self.paso), fin) for inicio, fin in zip(inicios, fines)]
+        recorridos = np.repeat(np.arange(numero), [len(frente) for frente in frentes])
+        return recorridos, np.concatenate(frentes)
+
+    def matriz_posiciones(self, coordenadas):
+        """
+        Cargas en los nodos del tablero para cada posición de cada tren en la geometría dada
+        :param coordenadas: (nodos x dimension)
+        :return Q, trenes, frentes: Q (nodos del tablero x posiciones), y el índice del tren y la posición de su
+            primer eje en cada columna. La primera columna es el tablero sin tren, con tren -1.
+        """
+        abscisas = self.abscisas(coordenadas)
+        recorridos, frentes = self.posiciones(abscisas)
+        numero = len(frentes) + 1
+        nodos = len(abscisas)
+        # Posición de cada eje a lo largo del tablero, (posiciones x ejes)
+        ejes = frentes[:, None] - self.distancias_ejes[recorridos]
+        sobre = (ejes >= 0) & (ejes <= abscisas[-1])
+        tramo = np.clip(np.searchsorted(abscisas, ejes, side="right") - 1, 0, nodos - 2)
+        largo = abscisas[tramo + 1] - abscisas[tramo]
+        fraccion = np.clip((ejes - abscisas[tramo]) / np.where(largo > 0, largo, np.inf), 0, 1)
+        cargas = np.where(sobre, self.cargas_ejes[recorridos], 0.0)
+        # La columna 0 queda sin cargas
+        columnas = np.arange(1, numero)[:, None]
+        Q = np.bincount((tramo * numero + columnas).ravel(), weights=(cargas * (1 - fraccion)).ravel(),
+                        minlength=nodos * numero) + \
+            np.bincount(((tramo + 1) * numero + columnas).ravel(), weights=(cargas * fraccion).ravel(),
+                        minlength=nodos * numero)
+        return Q.reshape((nodos, numero)), np.r_[-1, self.trenes_recorridos[recorridos]], np.r_[np.nan, frentes]
+
+    def superponer(self, X_casos, X_unitarias, Q):
+        """
+        Fuerzas de cada caso con el tren en cada posición
+        :param X_casos: (incógnitas x casos)
+        :param X_unitarias: (incógnitas x nodos del tablero)
+        :param Q: de matriz_posiciones
+        :return X: (incógnitas x casos·posiciones), las posiciones de un caso seguidas
+        """
+        moviles = X_unitarias @ Q
+        return (X_casos[:, :, None] + moviles[:, None, :]).reshape((len(X_casos), -1))
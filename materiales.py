@@ -0,0 +1,85 @@
+import json
+import os
+import numpy as np
+
+# materials.json junto a este archivo, no en el directorio de trabajo
+RUTA_MATERIALES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "materials.json")
+
+# Catálogos ya leídos en este proceso, por ruta
+_catalogos = {}
+
+
+class CatalogoMateriales(object):
+    """
+    Propiedades de todos los materiales como arreglos alineados de numpy, con sus figuras de mérito.
+    El peso de una viga a tensión es ρ/fy·F·L y el de una viga a compresión (pandeo de Euler, sección circular)
+    es ρ/√E·L²·√(|F|/π), así que un material que no es mejor en ninguna de las dos razones nunca puede ser el
+    más ligero y se descarta antes de dimensionar.
+    """
+    def __init__(self, materiales: dict):
+        """
+        :param materiales: {nombre: {"modulo_E": ..., "densidad": ..., "resistencia_fluencia": ...}}
+        """
+        self.materiales = materiales
+        self.nombres = list(materiales.keys())
+        self.indices = {nombre: x for x, nombre in enumerate(self.nombres)}
+        self.modulo_E = np.array([materiales[nombre]["modulo_E"] for nombre in self.nombres], dtype=float)
+        self.densidad = np.array([materiales[nombre]["densidad"] for nombre in self.nombres], dtype=float)
+        self.resistencia_fluencia = np.array([materiales[nombre]["resistencia_fluencia"]
+                                              for nombre in self.nombres], dtype=float)
+        # Peso por unidad de F·L a tensión y por unidad de L²·√(|F|/π) a compresión
+        self.merito_tension = self.densidad / self.resistencia_fluencia
+        self.merito_pandeo = self.densidad / np.sqrt(self.modulo_E)
+        self.no_dominados = self.frente_pareto(self.merito_tension, self.merito_pandeo)
+        self.mejor_tension = int(np.argmin(self.merito_tension))
+        self.mejor_pandeo = int(np.argmin(self.merito_pandeo))
+
+    @classmethod
+    def desde_archivo(cls, ruta=None):
+        """
+        Lee el catálogo una sola vez por proceso
+        :param ruta: archivo JSON, por defecto RUTA_MATERIALES
+        :return catalogo:
+        """
+        ruta = os.path.abspath(ruta or RUTA_MATERIALES)
+        if ruta not in _catalogos:
+            with open(ruta, "r") as archivo_lectura:
+                _catalogos[ruta] = cls(json.load(archivo_lectura))
+        return _catalogos[ruta]
+
+    @staticmethod
+    def frente_pareto(merito_tension, merito_pandeo):
+        """
+        Índices, en orden, de los materiales que ningún otro supera en las dos figuras de mérito. Con méritos
+        idénticos se queda el primero, igual que np.argmin.
+        """
+        # Ordenados por tensión (y por índice en los empates), un material sobrevive si mejora el mínimo de
+        # pandeo de todos los anteriores
+        orden = np.lexsort((np.arange(len(merito_tension)), merito_pandeo, merito_tension))
+        minimos = np.minimum.accumulate(merito_pandeo[orden])
+        sobrevive = np.ones(len(orden), dtype=bool)
+        sobrevive[1:] = merito_pandeo[orden[1:]] < minimos[:-1]
+        return np.sort(orden[sobrevive])
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def indice(self, nombre: str):
+        return self.indices[nombre]
+
+    def tabla(self, indices=None):
+        """(materiales x 3) con E, densidad y resistencia a la fluencia, como la tabla de Construccion"""
+        indices = slice(None) if indices is None else indices
+        return np.column_stack((self.modulo_E[indices], self.densidad[indices], self.resistencia_fluencia[indices]))
+
+    def propiedades(self, indices):
+        """E, densidad y resistencia a la fluencia de cada índice, p. ej. un material por viga"""
+        return self.modulo_E[indices], self.densidad[indices], self.resistencia_fluencia[indices]
+
+    def material_por_viga(self, fuerzas):
+        """
+        Material más ligero de cada viga por separado: a tensión el de menor ρ/fy, a compresión el de menor ρ/√E
+        :param fuerzas: fuerza interna de cada viga (o casos de carga en la última dimensión)
+        :return indices:
+        """
+        return np.where(np.asarray(fuerzas) >= 0, self.mejor_tension, self.mejor_pandeo)
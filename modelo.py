@@ -0,0 +1,269 @@
+import numpy as np
+from typing import List
+from resolvedor import SistemaEquilibrio, ActualizacionIncremental, FactorizacionDispersa
+
+
+class ModeloArmadura(object):
+    """
+    Armadura guardada como arreglos contiguos de numpy (estructura de arreglos): coordenadas de los nodos,
+    índices de los extremos de las vigas, cargas distribuidas y los resultados por viga. La geometría se
+    recalcula para todas las vigas en una sola pasada vectorizada.
+    """
+    def __init__(self, nodos: List, lista_vigas: List, lista_cargas: List, disperso=None):
+        """
+        :param nodos: lista de Nodo
+        :param lista_vigas: lista de [nombre, nodo_a, nodo_b]
+        :param lista_cargas: (casos x vigas x dimension) carga distribuida de cada viga en cada caso
+        :param disperso: None elige la ruta densa o dispersa del resolvedor según el tamaño
+        """
+        self.nombres_nodos: List = [nodo.nombre for nodo in nodos]
+        self.coordenadas = np.array([nodo.pos for nodo in nodos], dtype=float)
+        self.numero_nodos, self.dimension = np.shape(self.coordenadas)
+        if self.dimension not in (2, 3):
+            raise ValueError("Los nodos deben tener 2 coordenadas (armadura plana) o 3 (armadura espacial)")
+        self.restricciones = np.array([nodo.restricciones(self.dimension) for nodo in nodos], dtype=float)
+        self.libres = np.zeros(np.shape(self.coordenadas), dtype=bool)
+        self.leer_libres(nodos)
+
+        self.nombres_vigas: List = [str(viga[0]) for viga in lista_vigas]
+        self.nodo_a = np.array([viga[1] for viga in lista_vigas], dtype=int)
+        self.nodo_b = np.array([viga[2] for viga in lista_vigas], dtype=int)
+        self.numero_vigas = len(self.nodo_a)
+        self.cargas = np.array(lista_cargas, dtype=float).reshape((-1, self.numero_vigas, self.dimension))
+        self.caso = 0
+
+        # Geometría, se actualiza con actualizar_geometria
+        self.longitudes = np.zeros(self.numero_vigas)
+        self.direcciones = np.zeros((self.numero_vigas, self.dimension))
+        # Cargas que recibe cada nodo en el caso actual
+        self.cargas_nodos = np.zeros((self.numero_nodos, self.dimension))
+        # Material y resultados por viga
+        self.modulo_E = np.full(self.numero_vigas, 210 * 1e+9)
+        self.densidad = np.full(self.numero_vigas, 7850.0)
+        self.resistencia_fluencia = np.full(self.numero_vigas, 250 * 1e+6)
+        self.areas = np.full(self.numero_vigas, 0.10)
+        self.fuerzas = np.zeros(self.numero_vigas)
+        self.fuerza_interna = np.zeros(self.numero_vigas)
+        self.pesos = np.zeros(self.numero_vigas)
+
+        # Cargas fijas en los nodos que se resuelven junto con los casos de carga, (filas x columnas); las usan
+        # las cargas móviles, ver lineas_influencia.py
+        self.cargas_unitarias = None
+
+        self.sistema = None
+        self.factorizacion = None
+        # Opcional, ver activar_incremental
+        self.incremental = None
+        self.establecer_sistema(disperso)
+        self.actualizar_geometria()
+
+    def __getstate__(self):
+        """La factorización dispersa no se puede copiar entre procesos; se rehace en la siguiente solución"""
+        estado = self.__dict__.copy()
+        estado["factorizacion"] = None
+        return estado
+
+    def leer_libres(self, nodos: List):
+        """Toma de Nodo.optimizar qué coordenadas se pueden optimizar"""
+        for x in range(0, len(nodos)):
+            self.libres[x] = np.asarray(nodos[x].optimizar) != 0
+
+    def establecer_sistema(self, disperso=None):
+        """Prepara el sistema de equilibrio para la topología y las restricciones actuales"""
+        restricciones = []
+        for x in range(0, self.numero_nodos):
+            for eje in range(0, self.dimension):
+                if self.restricciones[x, eje] != 0:
+                    restricciones.append((x, eje, self.restricciones[x, eje]))
+        self.sistema = SistemaEquilibrio(self.numero_nodos, self.nodo_a, self.nodo_b, restricciones,
+                                         dimension=self.dimension, disperso=disperso)
+        if self.incremental is not None:
+            incremental = self.incremental
+            self.activar_incremental(incremental.periodo, incremental.max_vigas, incremental.max_nodos,
+                                     incremental.tolerancia)
+
+    def activar_incremental(self, periodo=50, max_vigas=32, max_nodos=256, tolerancia=1e-8):
+        """
+        Resuelve con actualizaciones de rango bajo sobre una factorización de referencia en vez de factorizar
+        en cada evaluación; conviene en armaduras grandes cuando cada paso mueve pocos nodos, como en Powell.
+        Los parámetros son los de ActualizacionIncremental.
+        :return incremental:
+        """
+        self.incremental = ActualizacionIncremental(self.sistema, periodo, max_vigas, max_nodos, tolerancia)
+        return self.incremental
+
+    def valores_libres(self):
+        """Coordenadas optimizables, nodo por nodo y eje por eje"""
+        return self.coordenadas[self.libres]
+
+    def establecer_libres(self, valores):
+        """Escribe las coordenadas optimizables en el mismo orden que valores_libres"""
+        self.coordenadas[self.libres] = valores
+
+    def actualizar_geometria(self):
+        """
+        Longitudes y vectores unitarios (del nodo b hacia el nodo a) de todas las vigas. Una viga de longitud
+        cero toma la dirección del eje x, como daba atan2(0, 0).
+        :return:
+        """
+        deltas = self.coordenadas[self.nodo_a] - self.coordenadas[self.nodo_b]
+        self.longitudes[:] = np.sqrt(np.einsum("ij,ij->i", deltas, deltas))
+        nulas = self.longitudes == 0
+        if np.any(nulas):
+            deltas[nulas] = 0
+            deltas[nulas, 0] = 1
+        np.divide(deltas, np.where(nulas, 1, self.longitudes)[:, None], out=self.direcciones)
+        self.sistema.actualizar(self.direcciones)
+
+    def vector_cargas(self, casos=None):
+        """
+        Lado derecho B: cada viga reparte la mitad de su carga distribuida por su longitud a cada nodo
+        :param casos: None para el caso actual, o índices (lista o slice) de los casos
+        :return B: (filas,) o (filas x casos)
+        """
+        cargas = self.cargas[self.caso] if casos is None else self.cargas[casos]
+        return self.sistema.cargas(0.5 * cargas * self.longitudes[:, None])
+
+    def vector_cargas_referencia(self):
+        """Lado derecho de todos los casos seguido de las cargas unitarias, las columnas de resolver_unitarias"""
+        B = self.vector_cargas(slice(None))
+        if self.cargas_unitarias is None:
+            return B
+        return np.hstack((B, self.cargas_unitarias))
+
+    def resolver_unitarias(self, casos):
+        """
+        Resuelve los casos de carga dados y las cargas unitarias con una sola factorización
+        :param casos: índices de los casos
+        :return B, X, X_unitarias: lado derecho de los casos (filas x casos) y las soluciones
+        """
+        casos = np.asarray(casos, dtype=int)
+        B = self.vector_cargas(casos)
+        columnas = np.concatenate((casos, len(self.cargas) + np.arange(self.cargas_unitarias.shape[1])))
+        X = self.resolver(np.hstack((B, self.cargas_unitarias)), columnas)
+        return B, X[:, :len(casos)], X[:, len(casos):]
+
+    def resolver(self, B, casos=None):
+        """
+        Resuelve A·X = B con la geometría actual; B puede tener una columna por caso de carga
+        :param B:
+        :param casos: casos de carga de las columnas de B (índice, lista o slice) en las columnas de
+            vector_cargas_referencia, None para el caso actual; solo lo usa la actualización incremental
+        :return X:
+        """
+        if self.incremental is None:
+            self.factorizacion = self.sistema.factorizar()
+            return self.factorizacion.resolver(B)
+        casos = self.caso if casos is None else casos
+        X = self.incremental.resolver(self.direcciones, B, casos)
+        if X is None:
+            self.incremental.reiniciar(self.direcciones, self.vector_cargas_referencia())
+            X = self.incremental.resolver(self.direcciones, B, casos)
+        self.factorizacion = self.incremental
+        return X
+
+    def fuerzas_lote(self, valores, caso=None):
+        """
+        Fuerzas internas de muchas geometrías candidatas a la vez sin modificar el modelo: la geometría y las
+        matrices se arman apiladas (candidatos x filas x filas) y se resuelven con un solo np.linalg.solve. Con
+        el sistema disperso las matrices densas no caben; cada candidata se factoriza por separado con el patrón
+        CSC del sistema.
+        :param valores: (candidatos x coordenadas libres) en el orden de valores_libres
+        :param caso: índice del caso de carga, None para el actual
+        :return fuerzas, longitudes: ambas (candidatos x vigas)
+        """
+        valores = np.atleast_2d(np.asarray(valores, dtype=float))
+        numero = len(valores)
+        coordenadas = np.repeat(self.coordenadas[None], numero, axis=0)
+        coordenadas[:, self.libres] = valores
+        deltas = coordenadas[:, self.nodo_a] - coordenadas[:, self.nodo_b]
+        longitudes = np.sqrt(np.einsum("kij,kij->ki", deltas, deltas))
+        nulas = longitudes == 0
+        if np.any(nulas):
+            deltas[nulas] = 0
+            deltas[nulas, 0] = 1
+        direcciones = deltas / np.where(nulas, 1, longitudes)[:, :, None]
+
+        sistema = self.sistema
+        if not sistema.cuadrada:
+            return np.full((numero, self.numero_vigas), 1e20), longitudes
+        # Mismo patrón COO que el sistema, con los valores de cada candidato
+        entradas = self.numero_vigas * self.dimension
+        valores_coo = np.empty((numero, len(sistema.valores)))
+        valores_coo[:, :entradas] = direcciones.reshape((numero, -1))
+        valores_coo[:, entradas:2 * entradas] = -valores_coo[:, :entradas]
+        valores_coo[:, 2 * entradas:] = sistema.valores[2 * entradas:]
+
+        cargas = self.cargas[self.caso if caso is None else caso]
+        B = sistema.cargas(0.5 * cargas[None] * longitudes[:, :, None]).T
+        if sistema.disperso:
+            return self.resolver_lote_disperso(valores_coo, B), longitudes
+        matrices = np.zeros((numero, sistema.numero_filas, sistema.numero_filas))
+        matrices[:, sistema.filas, sistema.columnas] = valores_coo
+        try:
+            X = np.linalg.solve(matrices, B[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            # Alguna candidata es singular; se resuelven una por una para marcar solo esas
+            X = np.full(np.shape(B), 1e20)
+            for k in range(0, numero):
+                try:
+                    X[k] = np.linalg.solve(matrices[k], B[k])
+                except np.linalg.LinAlgError:
+                    pass
+        return X[:, :self.numero_vigas], longitudes
+
+    def resolver_lote_disperso(self, valores_coo, B):
+        """
+        Fuerzas de las vigas de cada candidata de fuerzas_lote con factorizaciones dispersas
+        :param valores_coo: (candidatos x entradas) valores de la matriz en el orden COO del sistema
+        :param B: (candidatos x filas)
+        :return fuerzas: (candidatos x vigas), 1e20 en las candidatas singulares
+        """
+        fuerzas = np.full((len(B), self.numero_vigas), 1e20)
+        for k in range(0, len(B)):
+            try:
+                matriz = self.sistema.matriz_dispersa_con(valores_coo[k])
+                fuerzas[k] = FactorizacionDispersa(matriz).resolver(B[k])[:self.numero_vigas]
+            except np.linalg.LinAlgError:
+                pass
+        return fuerzas
+
+    def gradiente(self, X, derivada_fuerzas, derivada_longitudes):
+        """
+        Gradiente de una función de las fuerzas y longitudes de las vigas, f(X, L), respecto a todas las
+        coordenadas de los nodos, por el método adjunto: A^T·λ = ∂f/∂X y df/dp = ∂f/∂p + λ^T (∂B/∂p - ∂A/∂p X).
+        Usa la factorización de la última llamada a resolver, que debe ser la que produjo X.
+        :param X: solución del caso actual
+        :param derivada_fuerzas: ∂f/∂X de cada viga
+        :param derivada_longitudes: ∂f/∂L explícita de cada viga
+        :return gradiente: (nodos x dimension)
+        """
+        g = np.zeros(self.sistema.numero_filas)
+        g[:self.numero_vigas] = derivada_fuerzas
+        lambdas = self.factorizacion.resolver_transpuesta(g).reshape((self.numero_nodos, self.dimension))
+        lambda_a = lambdas[self.nodo_a]
+        lambda_b = lambdas[self.nodo_b]
+
+        # Las cargas nodales valen 0.5·q·L en cada extremo, solo dependen de la posición a través de L
+        carga = self.cargas[self.caso]
+        por_longitud = derivada_longitudes + 0.5 * np.einsum("ij,ij->i", carga, lambda_a + lambda_b)
+        # La columna de la viga es (d, -d) con d unitario; ∂d/∂p_a = (I - d·d^T) / L
+        diferencia = lambda_a - lambda_b
+        proyeccion = diferencia - self.direcciones * np.einsum("ij,ij->i", self.direcciones, diferencia)[:, None]
+        longitudes = np.where(self.longitudes == 0, 1, self.longitudes)
+        por_nodo_a = por_longitud[:, None] * self.direcciones - \
+            (X[:self.numero_vigas] / longitudes)[:, None] * proyeccion
+
+        gradiente = np.zeros((self.numero_nodos, self.dimension))
+        for eje in range(0, self.dimension):
+            gradiente[:, eje] = np.bincount(self.nodo_a, weights=por_nodo_a[:, eje], minlength=self.numero_nodos) - \
+                np.bincount(self.nodo_b, weights=por_nodo_a[:, eje], minlength=self.numero_nodos)
+        return gradiente
+
+    def matriz_conexiones(self):
+        """Matriz densa (vigas x grados de libertad) con las conexiones de cada viga, solo para mostrarla"""
+        conexiones = np.zeros((self.numero_vigas, self.numero_nodos, self.dimension))
+        indices = np.arange(self.numero_vigas)
+        conexiones[indices, self.nodo_a] = self.direcciones
+        conexiones[indices, self.nodo_b] = -self.direcciones
+        return conexiones.reshape((self.numero_vigas, -1))
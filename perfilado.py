@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Contexto vacío compartido, así medir con el perfilador desactivado casi no cuesta
+_SIN_MEDICION = nullcontext()
+
+
+class _Intervalo(object):
+    """Contexto que mide un bloque; una clase en vez de contextmanager porque se usa en cada evaluación"""
+    __slots__ = ("perfilador", "nombre", "inicio")
+
+    def __init__(self, perfilador, nombre: str):
+        self.perfilador = perfilador
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, tipo, valor, traza):
+        self.perfilador.registrar_fase(self.nombre, self.inicio, time.perf_counter() - self.inicio)
+
+
+class Perfilador(object):
+    """
+    Instrumentación de una optimización: tiempo acumulado por fase (geometría, ensamblaje, solución, materiales,
+    gráficos...), contadores, evaluaciones por caso de carga, estadísticas de la caché y del resolvedor, y la
+    traza de convergencia (peso contra iteración). Se exporta como diccionario, JSON o traza de Chrome
+    (chrome://tracing o https://ui.perfetto.dev).
+    """
+    activo = True
+
+    def __init__(self, max_eventos=200000):
+        """
+        :param max_eventos: número máximo de intervalos guardados para la traza de Chrome; los tiempos por fase
+            se siguen acumulando aunque se llegue al límite
+        """
+        self.max_eventos = max_eventos
+        self.inicio = time.perf_counter()
+        # nombre -> [llamadas, segundos, mínimo, máximo]
+        self.fases = {}
+        self.contadores = {}
+        self.evaluaciones_caso = {}
+        self.estadisticas = {}
+        # (iteracion, caso, peso, segundos desde el inicio)
+        self.convergencia = []
+        # (nombre, inicio, duración, proceso, hilo) en segundos de perf_counter
+        self.eventos = []
+        self.eventos_descartados = 0
+
+    def fase(self, nombre: str):
+        """Mide el bloque con with perfilador.fase("solucion"): ..."""
+        return _Intervalo(self, nombre)
+
+    def registrar_fase(self, nombre: str, inicio: float, duracion: float):
+        fase = self.fases.get(nombre)
+        if fase is None:
+            self.fases[nombre] = [1, duracion, duracion, duracion]
+        else:
+            fase[0] += 1
+            fase[1] += duracion
+            fase[2] = min(fase[2], duracion)
+            fase[3] = max(fase[3], duracion)
+        if len(self.eventos) < self.max_eventos:
+            self.eventos.append((nombre, inicio, duracion, os.getpid(), threading.get_ident()))
+        else:
+            self.eventos_descartados += 1
+
+    def contar(self, nombre: str, cantidad=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def registrar_evaluacion(self, iteracion: int, caso: int, peso: float):
+        """Una evaluación de la función objetivo: cuenta por caso y agrega un punto a la convergencia"""
+        self.evaluaciones_caso[caso] = self.evaluaciones_caso.get(caso, 0) + 1
+        self.convergencia.append((iteracion, caso, float(peso), time.perf_counter() - self.inicio))
+
+    def agregar_estadisticas(self, nombre: str, datos: dict):
+        self.estadisticas[nombre] = dict(datos)
+
+    def combinar(self, otro):
+        """
+        Suma los datos de otro perfilador, por ejemplo el de un proceso del grupo
+        :param otro:
+        :return:
+        """
+        for nombre, (llamadas, segundos, minimo, maximo) in otro.fases.items():
+            fase = self.fases.get(nombre)
+            if fase is None:
+                self.fases[nombre] = [llamadas, segundos, minimo, maximo]
+            else:
+                fase[0] += llamadas
+                fase[1] += segundos
+                fase[2] = min(fase[2], minimo)
+                fase[3] = max(fase[3], maximo)
+        for nombre, cantidad in otro.contadores.items():
+            self.contar(nombre, cantidad)
+        for caso, cantidad in otro.evaluaciones_caso.items():
+            self.evaluaciones_caso[caso] = self.evaluaciones_caso.get(caso, 0) + cantidad
+        # perf_counter usa el mismo reloj monotónico en todos los procesos de la máquina
+        desfase = otro.inicio - self.inicio
+        self.convergencia.extend((iteracion, caso, peso, segundos + desfase)
+                                 for iteracion, caso, peso, segundos in otro.convergencia)
+        espacio = max(0, self.max_eventos - len(self.eventos))
+        self.eventos.extend(otro.eventos[:espacio])
+        self.eventos_descartados += otro.eventos_descartados + max(0, len(otro.eventos) - espacio)
+
+    def resumen(self):
+        """
+        Todos los datos como diccionario serializable en JSON
+        :return resumen:
+        """
+        fases = {}
+        for nombre, (llamadas, segundos, minimo, maximo) in sorted(self.fases.items(), key=lambda f: -f[1][1]):
+            fases[nombre] = {"llamadas": llamadas, "segundos": segundos, "promedio": segundos / llamadas,
+                             "minimo": minimo, "maximo": maximo}
+        return {
+            "segundos": time.perf_counter() - self.inicio,
+            "fases": fases,
+            "contadores": dict(self.contadores),
+            "evaluaciones_caso": {str(caso): cantidad for caso, cantidad in sorted(self.evaluaciones_caso.items())},
+            "estadisticas": self.estadisticas,
+            "convergencia": [list(punto) for punto in self.convergencia],
+        }
+
+    def a_json(self, ruta=None):
+        """
+        :param ruta: si se da, escribe el resumen en ese archivo
+        :return texto:
+        """
+        texto = json.dumps(self.resumen(), indent=2)
+        if ruta is not None:
+            with open(ruta, "w") as archivo_escritura:
+                archivo_escritura.write(texto)
+        return texto
+
+    def a_chrome(self, ruta=None):
+        """
+        Traza en el formato de eventos de Chrome: un intervalo por fase medida y un contador con el peso
+        :param ruta: si se da, escribe la traza en ese archivo
+        :return traza: diccionario con "traceEvents"
+        """
+        eventos = []
+        for nombre, inicio, duracion, proceso, hilo in self.eventos:
+            eventos.append({"name": nombre, "ph": "X", "ts": (inicio - self.inicio) * 1e6, "dur": duracion * 1e6,
+                            "pid": proceso, "tid": hilo})
+        proceso = os.getpid()
+        for iteracion, caso, peso, segundos in self.convergencia:
+            eventos.append({"name": "peso", "ph": "C", "ts": segundos * 1e6, "pid": proceso,
+                            "args": {"caso " + str(caso): peso}})
+        traza = {"traceEvents": eventos, "displayTimeUnit": "ms"}
+        if ruta is not None:
+            with open(ruta, "w") as archivo_escritura:
+                json.dump(traza, archivo_escritura)
+        return traza
+
+
+class PerfiladorNulo(object):
+    """Perfilador que no registra nada; es el que usa una construcción mientras no se active uno real"""
+    activo = False
+
+    def fase(self, nombre: str):
+        return _SIN_MEDICION
+
+    def registrar_fase(self, nombre: str, inicio: float, duracion: float):
+        pass
+
+    def contar(self, nombre: str, cantidad=1):
+        pass
+
+    def registrar_evaluacion(self, iteracion: int, caso: int, peso: float):
+        pass
+
+    def agregar_estadisticas(self, nombre: str, datos: dict):
+        pass
+
+    def combinar(self, otro):
+        pass
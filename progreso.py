@@ -0,0 +1,168 @@
+import threading
+import time
+import numpy as np
+
+
+class OptimizacionDetenida(Exception):
+    """Se lanza dentro de la función objetivo para cortar el optimizador de scipy; optimizar_caso la atrapa"""
+    pass
+
+
+class Progreso(object):
+    """Registro ligero de una evaluación de la optimización, para mostrar o enviar el avance"""
+    __slots__ = ("iteracion", "caso", "peso", "mejor_peso", "material", "valores", "coordenadas", "segundos")
+
+    def __init__(self, iteracion: int, caso: int, peso: float, mejor_peso: float, material: str, valores,
+                 coordenadas, segundos: float):
+        """
+        :param iteracion: número de evaluaciones de la construcción hasta ahora
+        :param caso: caso de carga que se está optimizando
+        :param peso: peso de esta evaluación
+        :param mejor_peso: mejor peso de la tarea actual
+        :param material:
+        :param valores: posiciones variables de esta evaluación
+        :param coordenadas: (nodos x 2) coordenadas de todos los nodos
+        :param segundos: desde el inicio de la optimización
+        """
+        self.iteracion = iteracion
+        self.caso = caso
+        self.peso = peso
+        self.mejor_peso = mejor_peso
+        self.material = material
+        self.valores = valores
+        self.coordenadas = coordenadas
+        self.segundos = segundos
+
+    def a_dict(self):
+        """El registro como diccionario serializable en JSON"""
+        return {
+            "iteracion": self.iteracion,
+            "caso": self.caso,
+            "peso": self.peso,
+            "mejor_peso": self.mejor_peso,
+            "material": self.material,
+            "valores": self.valores.tolist(),
+            "coordenadas": self.coordenadas.tolist(),
+            "segundos": self.segundos,
+        }
+
+
+class ResultadoOptimizacion(object):
+    """Lo que devuelve Construccion.optimizar: el diseño elegido y por qué terminó la optimización"""
+    # Motivos de terminación
+    CONVERGENCIA = "convergencia"
+    CANCELADA = "cancelada"
+    LIMITE_SEGUNDOS = "limite_segundos"
+    LIMITE_EVALUACIONES = "limite_evaluaciones"
+
+    def __init__(self, construccion, motivo: str, segundos: float, tareas: int, tareas_totales: int):
+        """
+        :param construccion: ya establecida en el diseño elegido
+        :param motivo: uno de los motivos de terminación
+        :param segundos:
+        :param tareas: tareas (caso de carga y arranque) que llegaron a optimizarse, aunque sea en parte
+        :param tareas_totales:
+        """
+        self.peso = float(construccion.peso)
+        self.material = construccion.material
+        self.indice_carga = construccion.indice_carga
+        self.iteraciones = construccion.iteracion
+        self.valores = construccion.modelo.valores_libres()
+        self.coordenadas = construccion.modelo.coordenadas.copy()
+        self.motivo = motivo
+        self.segundos = segundos
+        self.tareas = tareas
+        self.tareas_totales = tareas_totales
+        self.datos = construccion.resultado_dict()
+
+    @property
+    def completa(self):
+        """Falso si la optimización se cortó por cancelación o por un límite"""
+        return self.motivo == self.CONVERGENCIA
+
+    def a_dict(self):
+        datos = dict(self.datos)
+        datos.update({"motivo": self.motivo, "segundos": self.segundos, "tareas": self.tareas,
+                      "tareas_totales": self.tareas_totales})
+        return datos
+
+    def __repr__(self):
+        return "ResultadoOptimizacion(peso={0:.6g}, material={1!r}, caso={2}, motivo={3})".format(
+            self.peso, self.material, self.indice_carga, self.motivo)
+
+
+class ControlOptimizacion(object):
+    """
+    Presupuesto, cancelación y avance de una optimización. La construcción lo consulta en cada evaluación: si se
+    pidió cancelar o se acabó el tiempo o las evaluaciones lanza OptimizacionDetenida, y cada cada_iteraciones
+    evaluaciones arma un Progreso y se lo pasa a al_progresar. Lleva además la mejor evaluación de la tarea
+    actual, que es el resultado de una tarea cortada a la mitad.
+    """
+    def __init__(self, limite_segundos=None, limite_evaluaciones=None, al_progresar=None, cada_iteraciones=1,
+                 cancelacion=None):
+        """
+        :param limite_segundos: tiempo máximo de la optimización
+        :param limite_evaluaciones: evaluaciones máximas de la función objetivo
+        :param al_progresar: función que recibe cada Progreso; si devuelve False se cancela la optimización
+        :param cada_iteraciones: un Progreso cada tantas evaluaciones
+        :param cancelacion: threading.Event compartido; por defecto uno nuevo, ver cancelar
+        """
+        self.limite_segundos = limite_segundos
+        self.limite_evaluaciones = limite_evaluaciones
+        self.al_progresar = al_progresar
+        self.cada_iteraciones = max(1, cada_iteraciones)
+        self.cancelacion = cancelacion or threading.Event()
+        self.inicio = time.perf_counter()
+        self.evaluaciones = 0
+        self.motivo = None
+        self.mejor_peso = np.inf
+        self.mejor_valores = None
+
+    def cancelar(self):
+        """Pide terminar; la optimización se detiene en la siguiente evaluación. Se puede llamar desde otro hilo"""
+        self.cancelacion.set()
+
+    @property
+    def detenido(self):
+        return self.motivo is not None
+
+    def nueva_tarea(self, suposicion_inicial):
+        """Empieza una tarea: si se corta antes de evaluar nada, su resultado es la suposición inicial"""
+        self.mejor_peso = np.inf
+        self.mejor_valores = np.array(suposicion_inicial, dtype=float)
+
+    def revisar(self):
+        """Se llama antes de cada evaluación y lanza OptimizacionDetenida si hay que terminar"""
+        if self.motivo is None:
+            if self.cancelacion.is_set():
+                self.motivo = ResultadoOptimizacion.CANCELADA
+            elif self.limite_evaluaciones is not None and self.evaluaciones >= self.limite_evaluaciones:
+                self.motivo = ResultadoOptimizacion.LIMITE_EVALUACIONES
+            elif self.limite_segundos is not None and time.perf_counter() - self.inicio >= self.limite_segundos:
+                self.motivo = ResultadoOptimizacion.LIMITE_SEGUNDOS
+        if self.motivo is not None:
+            raise OptimizacionDetenida(self.motivo)
+
+    def registrar(self, construccion, valores):
+        """Se llama después de cada evaluación con las posiciones variables evaluadas"""
+        self.evaluaciones += 1
+        peso = float(construccion.peso)
+        if peso < self.mejor_peso:
+            self.mejor_peso = peso
+            self.mejor_valores = np.array(valores, dtype=float)
+        if self.al_progresar is not None and self.evaluaciones % self.cada_iteraciones == 0:
+            self.notificar(self.progreso(construccion, valores, peso))
+
+    def progreso(self, construccion, valores, peso: float):
+        """Arma el Progreso del estado actual de la construcción"""
+        return Progreso(construccion.iteracion, construccion.cargas_actuales, peso, self.mejor_peso,
+                        construccion.material, np.array(valores, dtype=float),
+                        construccion.modelo.coordenadas.copy(), self.segundos())
+
+    def notificar(self, progreso: Progreso):
+        """Pasa el progreso a al_progresar y cancela si devuelve False"""
+        if self.al_progresar is not None and self.al_progresar(progreso) is False:
+            self.cancelar()
+
+    def segundos(self):
+        return time.perf_counter() - self.inicio
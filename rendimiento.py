@@ -0,0 +1,273 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import armaduras
+
+# Cuadrícula completa: armaduras de 10 a 10 000 vigas con 1 a 100 casos de carga
+TIPOS = ["pratt", "howe", "warren", "tricordal"]
+VIGAS = [10, 100, 1000, 10000]
+CASOS = [1, 10, 100]
+# La optimización completa solo se mide en los problemas pequeños: Powell escala con el número de variables
+# y optimizar resuelve cada caso de carga por separado
+LIMITE_OPTIMIZAR = 1000
+
+
+def paneles_para(tipo: str, vigas: int):
+    """Número de paneles con el que la armadura del tipo dado tiene aproximadamente ese número de vigas"""
+    if tipo == "warren":
+        # paneles + (paneles - 1) + 2·paneles
+        return max(1, int(round((vigas + 1) / 4)))
+    if tipo == "tricordal":
+        # 9·paneles
+        return max(1, int(round(vigas / 9)))
+    # paneles + (paneles - 2) + 2 + (paneles - 1) + (paneles - 2)
+    return max(2, int(round((vigas + 3) / 4)))
+
+
+def generar(tipo: str, vigas: int, casos: int):
+    """Armadura paramétrica con paneles de 1 m y 1 m de altura, como el puente de ejemplo de structubridgex"""
+    paneles = paneles_para(tipo, vigas)
+    return armaduras.TIPOS[tipo](claro=float(paneles), paneles=paneles, altura=1.0, casos=casos)
+
+
+def cronometrar(funcion, min_segundos=0.2, max_llamadas=10000, rondas=3):
+    """
+    Tiempo por llamada de funcion: en cada ronda se llama hasta juntar min_segundos (o max_llamadas) y se
+    toma la ronda más rápida, que es la menos afectada por otros procesos
+    :return segundos_por_llamada, llamadas: llamadas de la ronda más rápida
+    """
+    # La primera llamada arma las matrices y las cachés, no representa el estado estable
+    funcion()
+    mejor = np.inf
+    llamadas_mejor = 0
+    for ronda in range(0, rondas):
+        llamadas = 0
+        inicio = time.perf_counter()
+        transcurrido = 0.0
+        while transcurrido < min_segundos and llamadas < max_llamadas:
+            funcion()
+            llamadas += 1
+            transcurrido = time.perf_counter() - inicio
+        if transcurrido / llamadas < mejor:
+            mejor = transcurrido / llamadas
+            llamadas_mejor = llamadas
+    return mejor, llamadas_mejor
+
+
+def memoria_pico(funcion):
+    """Memoria máxima asignada durante una llamada, en bytes; se mide aparte porque tracemalloc la hace lenta"""
+    tracemalloc.start()
+    try:
+        funcion()
+        actual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+
+def medir(funcion, min_segundos=0.2, rondas=3):
+    """Tiempo por llamada, llamadas por segundo y memoria pico de funcion"""
+    segundos, llamadas = cronometrar(funcion, min_segundos=min_segundos, rondas=rondas)
+    return {
+        "segundos_por_llamada": segundos,
+        "llamadas_por_segundo": 1.0 / segundos,
+        "llamadas": llamadas,
+        "memoria_pico": memoria_pico(funcion),
+    }
+
+
+def medir_armadura(tipo: str, vigas: int, casos: int, min_segundos=0.2, rondas=3, metodo="powell",
+                   limite_optimizar=LIMITE_OPTIMIZAR):
+    """
+    Mide las funciones principales de Construccion en una armadura generada, sin gráficos
+    :return resultado: diccionario con el tamaño del problema y una entrada por función medida
+    """
+    from structubridgex import Construccion
+    diseno = generar(tipo, vigas, casos)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        construccion = Construccion.desde_dict(diseno)
+        construir = time.perf_counter() - inicio
+        memoria_construir = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        construccion.grafico_interactivo = False
+        valores = construccion.modelo.valores_libres()
+
+        medidas = {"construir": {"segundos_por_llamada": construir, "llamadas_por_segundo": 1.0 / construir,
+                                 "llamadas": 1, "memoria_pico": memoria_construir}}
+        medidas["calcular_peso"] = medir(construccion.calcular_peso, min_segundos, rondas)
+        medidas["obtener_peso"] = medir(construccion.obtener_peso, min_segundos, rondas)
+        medidas["establecer_y_calcular"] = medir(
+            lambda: construccion.establecer_y_calcular(valores), min_segundos, rondas)
+        medidas["obtener_vigas_maximas"] = medir(
+            construccion.obtener_vigas_maximas, min_segundos, rondas)
+
+        if construccion.modelo.numero_vigas * casos <= limite_optimizar:
+            construccion = Construccion.desde_dict(diseno)
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            construccion.optimizar(grafico_interactivo=False, metodo=metodo)
+            segundos = time.perf_counter() - inicio
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            # tracemalloc hace más lenta la optimización, así que el tiempo se toma de otra ejecución
+            construccion = Construccion.desde_dict(diseno)
+            inicio = time.perf_counter()
+            construccion.optimizar(grafico_interactivo=False, metodo=metodo)
+            segundos = min(segundos, time.perf_counter() - inicio)
+            medidas["optimizar"] = {
+                "segundos_por_llamada": segundos,
+                "llamadas_por_segundo": 1.0 / segundos,
+                "llamadas": 1,
+                "memoria_pico": pico,
+                "evaluaciones": construccion.iteracion,
+                "segundos_por_evaluacion": segundos / max(1, construccion.iteracion),
+                "peso": float(construccion.peso),
+            }
+
+    return {
+        "id": "{0}-vigas={1}-casos={2}".format(tipo, construccion.modelo.numero_vigas, casos),
+        "tipo": tipo,
+        "paneles": paneles_para(tipo, vigas),
+        "vigas": construccion.modelo.numero_vigas,
+        "nodos": construccion.modelo.numero_nodos,
+        "casos": casos,
+        "incognitas": construccion.sistema.numero_filas,
+        "variables": int(np.count_nonzero(construccion.modelo.libres)),
+        "disperso": bool(construccion.sistema.disperso),
+        "metodo": metodo,
+        "medidas": medidas,
+    }
+
+
+def entorno():
+    """Datos de la máquina y las bibliotecas, para no comparar líneas base de entornos distintos sin saberlo"""
+    datos = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(),
+    }
+    try:
+        import scipy
+        datos["scipy"] = scipy.__version__
+    except ImportError:
+        datos["scipy"] = None
+    return datos
+
+
+def ejecutar(tipos=None, vigas=None, casos=None, min_segundos=0.2, rondas=3, metodo="powell",
+             limite_optimizar=LIMITE_OPTIMIZAR, salida=None):
+    """
+    Ejecuta la cuadrícula de mediciones
+    :param tipos: tipos de armadura, por defecto TIPOS
+    :param vigas: números de vigas aproximados, por defecto VIGAS
+    :param casos: números de casos de carga, por defecto CASOS
+    :param min_segundos: tiempo mínimo de cada ronda de llamadas
+    :param rondas:
+    :param metodo: método de optimizar para la medición completa
+    :param limite_optimizar: vigas x casos máximo para medir optimizar
+    :param salida: archivo JSON donde guardar la línea base
+    :return linea_base: diccionario con el entorno y los resultados
+    """
+    resultados = []
+    for tipo in tipos or TIPOS:
+        for numero_vigas in vigas or VIGAS:
+            for numero_casos in casos or CASOS:
+                resultado = medir_armadura(tipo, numero_vigas, numero_casos, min_segundos, rondas, metodo,
+                                           limite_optimizar)
+                resultados.append(resultado)
+                print(resultado["id"], " ".join(
+                    "{0}={1:.3g}s".format(nombre, medida["segundos_por_llamada"])
+                    for nombre, medida in resultado["medidas"].items()), file=sys.stderr)
+    linea_base = {"version": 1, "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"), "entorno": entorno(),
+                  "resultados": resultados}
+    if salida is not None:
+        with open(salida, "w") as archivo_escritura:
+            json.dump(linea_base, archivo_escritura, indent=2)
+    return linea_base
+
+
+def comparar(base: dict, nueva: dict, tolerancia=0.10):
+    """
+    Compara dos líneas base medida por medida. No compara optimizar entre líneas base medidas con métodos
+    distintos, porque cada método se detiene en otro punto y el tiempo no sería comparable.
+    :param base:
+    :param nueva:
+    :param tolerancia: fracción de tiempo extra a partir de la cual una medida cuenta como regresión
+    :return filas, regresiones: una fila (id, función, segundos base, segundos nuevos, razón) por medida en común
+        y las filas que empeoraron más que la tolerancia
+    """
+    anteriores = {resultado["id"]: resultado for resultado in base["resultados"]}
+    filas = []
+    for resultado in nueva["resultados"]:
+        anterior = anteriores.get(resultado["id"])
+        if anterior is None:
+            continue
+        if "optimizar" in resultado["medidas"] and "optimizar" in anterior["medidas"] and \
+                resultado.get("metodo") != anterior.get("metodo"):
+            raise ValueError("{0}: optimizar se midió con {1} en la base y con {2} en la nueva".format(
+                resultado["id"], anterior.get("metodo"), resultado.get("metodo")))
+        for nombre, medida in resultado["medidas"].items():
+            if nombre not in anterior["medidas"]:
+                continue
+            antes = anterior["medidas"][nombre]["segundos_por_llamada"]
+            despues = medida["segundos_por_llamada"]
+            filas.append((resultado["id"], nombre, antes, despues, despues / antes))
+    regresiones = [fila for fila in filas if fila[4] > 1 + tolerancia]
+    return filas, regresiones
+
+
+def _leer(ruta: str):
+    with open(ruta, "r") as archivo_lectura:
+        return json.load(archivo_lectura)
+
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Mide el rendimiento del resolvedor y del optimizador")
+    subcomandos = analizador.add_subparsers(dest="comando", required=True)
+    medicion = subcomandos.add_parser("ejecutar", help="mide y guarda una línea base en JSON")
+    medicion.add_argument("salida", help="archivo .json de la línea base")
+    medicion.add_argument("--tipos", nargs="+", choices=TIPOS, default=TIPOS)
+    medicion.add_argument("--vigas", nargs="+", type=int, default=VIGAS)
+    medicion.add_argument("--casos", nargs="+", type=int, default=CASOS)
+    medicion.add_argument("--min-segundos", type=float, default=0.2, help="tiempo mínimo de cada ronda")
+    medicion.add_argument("--rondas", type=int, default=3)
+    medicion.add_argument("--metodo", default="powell", help="método de optimizar para la medición completa")
+    medicion.add_argument("--limite-optimizar", type=int, default=LIMITE_OPTIMIZAR,
+                          help="vigas x casos máximo para medir optimizar")
+    medicion.add_argument("--rapido", action="store_true", help="solo pratt, 10 y 100 vigas, 1 y 10 casos")
+    comparacion = subcomandos.add_parser("comparar", help="compara una línea base nueva contra otra")
+    comparacion.add_argument("base")
+    comparacion.add_argument("nueva")
+    comparacion.add_argument("--tolerancia", type=float, default=0.10,
+                             help="fracción de tiempo extra que cuenta como regresión")
+    argumentos = analizador.parse_args()
+
+    if argumentos.comando == "ejecutar":
+        if argumentos.rapido:
+            argumentos.tipos, argumentos.vigas, argumentos.casos = ["pratt"], [10, 100], [1, 10]
+        ejecutar(argumentos.tipos, argumentos.vigas, argumentos.casos, argumentos.min_segundos, argumentos.rondas,
+                 argumentos.metodo, argumentos.limite_optimizar, salida=argumentos.salida)
+    else:
+        try:
+            filas, regresiones = comparar(_leer(argumentos.base), _leer(argumentos.nueva), argumentos.tolerancia)
+        except ValueError as error:
+            analizador.error(str(error))
+        for id_resultado, nombre, antes, despues, razon in filas:
+            marca = "  REGRESIÓN" if razon > 1 + argumentos.tolerancia else ""
+            print("{0:<32} {1:<22} {2:>10.3g}s {3:>10.3g}s {4:>6.2f}x{5}".format(
+                id_resultado, nombre, antes, despues, razon, marca))
+        print("Regresiones:", len(regresiones), "de", len(filas))
+        sys.exit(1 if regresiones else 0)
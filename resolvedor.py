@@ -0,0 +1,319 @@
+import numpy as np
+from typing import List
+
+# Número de incógnitas a partir del cual se usa la factorización dispersa en vez de la densa
+UMBRAL_DISPERSO = 150
+
+
+class SistemaEquilibrio(object):
+    """
+    Sistema de equilibrio A·X = B de una armadura. Las columnas de A son las vigas seguidas por las reacciones,
+    las filas son los grados de libertad de los nodos. El patrón de A solo depende de la topología, así que se
+    ensambla una vez en forma COO y en cada evaluación solo se reemplazan los valores.
+    """
+    def __init__(self, numero_nodos: int, nodo_a, nodo_b, restricciones: List, dimension=2, disperso=None):
+        """
+        :param numero_nodos:
+        :param nodo_a: índice del primer nodo de cada viga
+        :param nodo_b: índice del segundo nodo de cada viga
+        :param restricciones: lista de (nodo, eje, valor) en el orden de las columnas de reacción
+        :param dimension: grados de libertad por nodo
+        :param disperso: fuerza la ruta dispersa (True) o densa (False); None la elige según el tamaño
+        """
+        self.numero_nodos = numero_nodos
+        self.dimension = dimension
+        self.nodo_a = np.asarray(nodo_a, dtype=int)
+        self.nodo_b = np.asarray(nodo_b, dtype=int)
+        self.numero_vigas = len(self.nodo_a)
+        self.numero_reacciones = len(restricciones)
+        self.numero_filas = dimension * numero_nodos
+        # Si faltan columnas se completan con ceros, igual que antes, y la matriz resulta singular;
+        # si sobran la matriz no es cuadrada y no se puede resolver
+        self.cuadrada = self.numero_vigas + self.numero_reacciones <= self.numero_filas
+        if disperso is None:
+            disperso = self.numero_filas >= UMBRAL_DISPERSO
+        self.disperso = disperso
+
+        # Patrón COO: 2·dimension entradas por viga y una por reacción
+        ejes = np.arange(dimension)
+        columnas_vigas = np.repeat(np.arange(self.numero_vigas), dimension)
+        filas_a = (dimension * self.nodo_a[:, None] + ejes).ravel()
+        filas_b = (dimension * self.nodo_b[:, None] + ejes).ravel()
+        filas_reacciones = np.array([dimension * nodo + eje for nodo, eje, valor in restricciones], dtype=int)
+        columnas_reacciones = self.numero_vigas + np.arange(len(restricciones))
+        self.filas = np.concatenate((filas_a, filas_b, filas_reacciones))
+        self.columnas = np.concatenate((columnas_vigas, columnas_vigas, columnas_reacciones))
+        self.valores = np.zeros(len(self.filas))
+        self.valores[2 * dimension * self.numero_vigas:] = [valor for nodo, eje, valor in restricciones]
+
+        self._densa = None
+        self._dispersa = None
+        self._permutacion = None
+
+    def actualizar(self, direcciones):
+        """
+        Reemplaza los valores de las columnas de las vigas
+        :param direcciones: (vigas x dimension) vector unitario del nodo b hacia el nodo a de cada viga
+        :return:
+        """
+        direcciones = np.asarray(direcciones, dtype=float).ravel()
+        n = len(direcciones)
+        self.valores[:n] = direcciones
+        self.valores[n:2 * n] = -direcciones
+        self._densa = None
+        if self._dispersa is not None:
+            self._dispersa.data[:] = self.valores[self._permutacion]
+
+    def cargas(self, cargas_nodos):
+        """
+        Ensambla el lado derecho B. Cada viga reparte su carga por igual entre sus dos nodos.
+        :param cargas_nodos: (vigas x dimension) o (casos x vigas x dimension), carga que recibe cada nodo
+        :return B: (filas,) o (filas x casos)
+        """
+        cargas_nodos = np.asarray(cargas_nodos, dtype=float)
+        casos = cargas_nodos.shape[:-2]
+        cargas_nodos = cargas_nodos.reshape((-1, self.numero_vigas, self.dimension))
+        numero_casos = len(cargas_nodos)
+        # Índice plano (caso, nodo, eje) de cada entrada para sumar con bincount
+        base = self.numero_nodos * self.dimension * np.arange(numero_casos)[:, None, None]
+        ejes = np.arange(self.dimension)
+        indices_a = (base + self.dimension * self.nodo_a[:, None] + ejes).ravel()
+        indices_b = (base + self.dimension * self.nodo_b[:, None] + ejes).ravel()
+        tamaño = numero_casos * self.numero_filas
+        por_nodo = np.bincount(indices_a, weights=cargas_nodos.ravel(), minlength=tamaño) + \
+            np.bincount(indices_b, weights=cargas_nodos.ravel(), minlength=tamaño)
+        B = por_nodo.reshape((numero_casos, self.numero_filas))
+        if len(casos) == 0:
+            return B[0]
+        return B.T
+
+    @property
+    def matriz(self):
+        """La matriz A en la forma que usa el resolvedor: arreglo de numpy o matriz dispersa CSC"""
+        if not self.cuadrada:
+            return np.zeros((self.numero_filas, 0))
+        if self.disperso:
+            return self.matriz_dispersa()
+        return self.matriz_densa()
+
+    def matriz_densa(self):
+        if self._densa is None:
+            self._densa = np.zeros((self.numero_filas, self.numero_filas))
+            self._densa[self.filas, self.columnas] = self.valores
+        return self._densa
+
+    def matriz_dispersa(self):
+        if self._dispersa is None:
+            import scipy.sparse
+            # El orden de CSC difiere del de COO; se guarda la permutación para actualizar solo los datos
+            indices = np.arange(1, len(self.filas) + 1, dtype=float)
+            forma = (self.numero_filas, self.numero_filas)
+            patron = scipy.sparse.coo_matrix((indices, (self.filas, self.columnas)), shape=forma).tocsc()
+            self._permutacion = patron.data.astype(int) - 1
+            patron.data = self.valores[self._permutacion]
+            self._dispersa = patron
+        return self._dispersa
+
+    def matriz_vigas(self):
+        """Solo las columnas de las vigas, (filas x vigas) en CSC; también cuando A no es cuadrada"""
+        import scipy.sparse
+        entradas = 2 * self.dimension * self.numero_vigas
+        return scipy.sparse.csc_matrix((self.valores[:entradas], (self.filas[:entradas], self.columnas[:entradas])),
+                                       shape=(self.numero_filas, self.numero_vigas))
+
+    def matriz_dispersa_con(self, valores):
+        """
+        Matriz CSC con el patrón del sistema y otros valores, sin tocar la del sistema
+        :param valores: en el orden COO de filas y columnas
+        :return matriz:
+        """
+        import scipy.sparse
+        patron = self.matriz_dispersa()
+        return scipy.sparse.csc_matrix((np.asarray(valores, dtype=float)[self._permutacion], patron.indices,
+                                        patron.indptr), shape=patron.shape)
+
+    def factorizar(self):
+        """
+        Factoriza la matriz actual con el método adecuado a su tamaño
+        :return factorizacion:
+        """
+        if not self.cuadrada:
+            raise np.linalg.LinAlgError("La matriz de equilibrio no es cuadrada")
+        if self.disperso:
+            return FactorizacionDispersa(self.matriz_dispersa())
+        return FactorizacionDensa(self.matriz_densa())
+
+
+class FactorizacionDensa(object):
+    """Para armaduras pequeñas: np.linalg.solve factoriza y resuelve todas las columnas de B en una llamada"""
+    def __init__(self, matriz):
+        self.matriz = matriz
+
+    def resolver(self, B):
+        return np.linalg.solve(self.matriz, B)
+
+    def resolver_transpuesta(self, B):
+        return np.linalg.solve(self.matriz.T, B)
+
+
+class FactorizacionDispersa(object):
+    """Para armaduras grandes: factorización LU dispersa de scipy.sparse.linalg, reutilizable para varios B"""
+    def __init__(self, matriz):
+        import scipy.sparse.linalg
+        try:
+            self.lu = scipy.sparse.linalg.splu(matriz)
+        except RuntimeError as error:
+            raise np.linalg.LinAlgError(str(error))
+
+    def resolver(self, B, trans="N"):
+        X = self.lu.solve(np.asarray(B, dtype=float), trans=trans)
+        if not np.all(np.isfinite(X)):
+            raise np.linalg.LinAlgError("Matriz singular")
+        return X
+
+    def resolver_transpuesta(self, B):
+        return self.resolver(B, trans="T")
+
+
+class ActualizacionIncremental(object):
+    """
+    Resuelve A·X = B cuando solo se movieron algunos nodos desde la última factorización completa (la de
+    referencia, A0). Las columnas de A que cambiaron son las de las vigas cuya dirección cambió, A = A0 + ΔC·E^T,
+    y por Sherman–Morrison–Woodbury:
+        X = Y - Z·(I + Z[J])⁻¹·Y[J],   Y = A0⁻¹·B,   Z = A0⁻¹·ΔC
+    ΔC y B - B0 solo tienen valores en las filas de los nodos tocados, así que Y y Z salen de las columnas de
+    A0⁻¹ de esos nodos, que se calculan una vez por nodo y se guardan hasta la siguiente refactorización.
+    Mover un nodo cuesta unos productos pequeños en vez de una factorización. Se refactoriza cada periodo
+    actualizaciones, cuando cambian demasiadas vigas o cuando el residuo crece.
+    """
+    def __init__(self, sistema: SistemaEquilibrio, periodo=50, max_vigas=32, max_nodos=256, tolerancia=1e-8):
+        """
+        :param sistema:
+        :param periodo: actualizaciones entre factorizaciones completas
+        :param max_vigas: vigas cambiadas respecto a la referencia a partir de las cuales se refactoriza
+        :param max_nodos: nodos con columnas de A0⁻¹ guardadas a partir de los cuales se refactoriza
+        :param tolerancia: residuo relativo máximo aceptado antes de refactorizar
+        """
+        self.sistema = sistema
+        self.periodo = periodo
+        self.max_vigas = max_vigas
+        self.max_nodos = max_nodos
+        self.tolerancia = tolerancia
+        self.factorizacion = None
+        self.direcciones = None
+        self.B = None
+        self.Y = None
+        self.columnas_inversa = {}
+        self.actualizaciones = 0
+        self.refactorizaciones = 0
+        self.soluciones_incrementales = 0
+        self.rechazos = 0
+        self._factorizacion_actual = None
+
+    def __getstate__(self):
+        """Las factorizaciones no se copian entre procesos; la copia empieza sin referencia"""
+        estado = self.__dict__.copy()
+        estado.update(factorizacion=None, direcciones=None, B=None, Y=None, columnas_inversa={},
+                      _factorizacion_actual=None)
+        return estado
+
+    def reiniciar(self, direcciones, B):
+        """
+        Factoriza la geometría actual y la toma como referencia
+        :param direcciones: (vigas x dimension) direcciones de las vigas con las que se armó el sistema
+        :param B: (filas x casos) lado derecho de todos los casos de carga en esta geometría
+        :return:
+        """
+        self.factorizacion = self.sistema.factorizar()
+        self.direcciones = np.array(direcciones, dtype=float)
+        self.B = np.array(B, dtype=float)
+        self.Y = self.factorizacion.resolver(self.B)
+        self.columnas_inversa = {}
+        self.actualizaciones = 0
+        self.refactorizaciones += 1
+        self._factorizacion_actual = None
+
+    def resolver(self, direcciones, B, casos):
+        """
+        Solución incremental respecto a la referencia
+        :param direcciones: direcciones actuales de las vigas
+        :param B: lado derecho de los casos dados, (filas,) o (filas x casos)
+        :param casos: índice o slice de los casos de B en las columnas de la referencia
+        :return X: o None si hay que refactorizar antes
+        """
+        if self.factorizacion is None or self.actualizaciones >= self.periodo:
+            return None
+        self._factorizacion_actual = None
+        dimension = self.sistema.dimension
+        cambiadas = np.flatnonzero(np.any(direcciones != self.direcciones, axis=1))
+        if len(cambiadas) > self.max_vigas:
+            return None
+
+        # Nodos tocados: los de las vigas cambiadas y los que recibieron otra carga
+        delta_B = B - self.B[:, casos]
+        filas_B = np.flatnonzero(delta_B if delta_B.ndim == 1 else np.any(delta_B != 0, axis=1))
+        nodos = np.unique(np.concatenate((self.sistema.nodo_a[cambiadas], self.sistema.nodo_b[cambiadas],
+                                          filas_B // dimension)))
+        if len(nodos) == 0:
+            return self.Y[:, casos].copy()
+        nuevos = [nodo for nodo in nodos if nodo not in self.columnas_inversa]
+        if len(self.columnas_inversa) + len(nuevos) > self.max_nodos:
+            return None
+        if nuevos:
+            # Columnas de A0⁻¹ de los grados de libertad de los nodos nuevos, con una sola llamada
+            filas = (dimension * np.asarray(nuevos)[:, None] + np.arange(dimension)).ravel()
+            identidad = np.zeros((self.sistema.numero_filas, len(filas)))
+            identidad[filas, np.arange(len(filas))] = 1
+            columnas = self.factorizacion.resolver(identidad)
+            for x in range(0, len(nuevos)):
+                self.columnas_inversa[nuevos[x]] = columnas[:, dimension * x:dimension * (x + 1)]
+        inversa = np.hstack([self.columnas_inversa[nodo] for nodo in nodos])
+        filas = (dimension * nodos[:, None] + np.arange(dimension)).ravel()
+
+        # Y = A0⁻¹·B a partir de la solución de referencia
+        Y = self.Y[:, casos] + inversa @ delta_B[filas]
+        if len(cambiadas) > 0:
+            # ΔC en las filas de los nodos tocados: +Δd en el nodo a y -Δd en el nodo b de cada viga
+            posicion = np.full(self.sistema.numero_nodos, -1)
+            posicion[nodos] = np.arange(len(nodos))
+            delta_d = direcciones[cambiadas] - self.direcciones[cambiadas]
+            delta_C = np.zeros((len(filas), len(cambiadas)))
+            indices = np.arange(len(cambiadas))
+            for eje in range(0, dimension):
+                delta_C[dimension * posicion[self.sistema.nodo_a[cambiadas]] + eje, indices] += delta_d[:, eje]
+                delta_C[dimension * posicion[self.sistema.nodo_b[cambiadas]] + eje, indices] -= delta_d[:, eje]
+            Z = inversa @ delta_C
+            capacitancia = np.eye(len(cambiadas)) + Z[cambiadas]
+            try:
+                X = Y - Z @ np.linalg.solve(capacitancia, Y[cambiadas])
+            except np.linalg.LinAlgError:
+                self.rechazos += 1
+                return None
+        else:
+            X = Y
+
+        # El residuo con la matriz actual decide si la actualización sigue siendo confiable
+        residuo = self.sistema.matriz @ X - B
+        escala = max(np.max(np.abs(B)), np.max(np.abs(X)), 1e-300)
+        if not np.all(np.isfinite(X)) or np.max(np.abs(residuo)) > self.tolerancia * escala:
+            self.rechazos += 1
+            return None
+        self.actualizaciones += 1
+        self.soluciones_incrementales += 1
+        return X
+
+    def resolver_transpuesta(self, B):
+        """Para el gradiente adjunto; se factoriza la matriz actual una sola vez por geometría"""
+        if self.actualizaciones == 0 and self.factorizacion is not None:
+            return self.factorizacion.resolver_transpuesta(B)
+        if self._factorizacion_actual is None:
+            self._factorizacion_actual = self.sistema.factorizar()
+        return self._factorizacion_actual.resolver_transpuesta(B)
+
+    def estadisticas(self):
+        return {
+            "refactorizaciones": self.refactorizaciones,
+            "soluciones_incrementales": self.soluciones_incrementales,
+            "rechazos": self.rechazos,
+            "nodos_guardados": len(self.columnas_inversa),
+        }
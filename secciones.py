@@ -0,0 +1,149 @@
+import json
+import math
+import numpy as np
+from typing import List
+
+from materiales import CatalogoMateriales
+
+
+class TablaMaterial(object):
+    """
+    Secciones de un solo material ordenadas por área. Con el material fijo el peso por metro es proporcional al
+    área, así que la sección más ligera que cumple es la primera, en este orden, con área e inercia suficientes.
+    Una tabla dispersa con el máximo de la inercia en bloques de 2^j secciones permite encontrarla con una
+    búsqueda binaria del área seguida de saltos binarios, vectorizado para todas las vigas a la vez.
+    """
+    def __init__(self, indices, areas, inercias):
+        orden = np.argsort(areas, kind="stable")
+        self.indices = np.asarray(indices)[orden]
+        self.areas = np.asarray(areas)[orden]
+        self.inercias = np.asarray(inercias)[orden]
+        # maximos[j][i] = máximo de inercias[i:i + 2^j]
+        self.maximos = [self.inercias]
+        paso = 1
+        while 2 * paso <= len(self.inercias):
+            anterior = self.maximos[-1]
+            self.maximos.append(np.maximum(anterior[:-paso], anterior[paso:]))
+            paso *= 2
+
+    def primera(self, areas_requeridas, inercias_requeridas):
+        """
+        :return posiciones: posición en esta tabla de la sección más ligera que cumple, len(tabla) si ninguna
+        """
+        numero = len(self.areas)
+        posiciones = np.searchsorted(self.areas, areas_requeridas, side="left")
+        # Se saltan los bloques cuya inercia máxima no alcanza, de mayor a menor
+        for j in range(len(self.maximos) - 1, -1, -1):
+            maximos = self.maximos[j]
+            dentro = posiciones < len(maximos)
+            salta = dentro & (maximos[np.minimum(posiciones, len(maximos) - 1)] < inercias_requeridas)
+            posiciones = np.where(salta, posiciones + 2 ** j, posiciones)
+        # Tras los saltos solo puede faltar que la sección encontrada no cumpla por estar al final
+        falla = (posiciones >= numero) | (self.inercias[np.minimum(posiciones, numero - 1)] < inercias_requeridas)
+        return np.where(falla, numero, posiciones)
+
+
+class CatalogoSecciones(object):
+    """
+    Tabla de secciones comerciales (material, perfil, área A e inercia I) para el dimensionamiento discreto.
+    Una viga con tensión máxima T y compresión máxima C en la envolvente necesita
+        A·fy >= max(T, C)                     (fluencia)
+        E·I >= C·(K·L)² / π²                  (pandeo de Euler, K = 0.5 como en calcular_areas)
+    y se elige la sección de menor densidad·A que cumpla ambas. Las secciones se agrupan por material (ver
+    TablaMaterial) y cada consulta cuesta O(materiales · log(secciones)) sin recorrer la tabla.
+    """
+    def __init__(self, nombres: List, materiales, areas, inercias, catalogo_materiales: CatalogoMateriales):
+        """
+        :param nombres: nombre de cada sección
+        :param materiales: índice en catalogo_materiales del material de cada sección
+        :param areas: en m²
+        :param inercias: momento de inercia mínimo en m⁴
+        :param catalogo_materiales:
+        """
+        self.nombres = list(nombres)
+        self.catalogo_materiales = catalogo_materiales
+        self.materiales = np.asarray(materiales, dtype=int)
+        self.areas = np.asarray(areas, dtype=float)
+        self.inercias = np.asarray(inercias, dtype=float)
+        modulo_E, densidad, resistencia_fluencia = catalogo_materiales.propiedades(self.materiales)
+        self.pesos_metro = densidad * self.areas
+        self.capacidad_fluencia = self.areas * resistencia_fluencia
+        self.rigidez = modulo_E * self.inercias
+        self.tablas = {}
+        for material in np.unique(self.materiales):
+            indices = np.flatnonzero(self.materiales == material)
+            self.tablas[int(material)] = TablaMaterial(indices, self.areas[indices], self.inercias[indices])
+
+    @classmethod
+    def desde_lista(cls, secciones: List, catalogo_materiales=None):
+        """
+        :param secciones: [{"nombre": ..., "material": nombre en el catálogo, "area": m², "inercia": m⁴}, ...]
+        :param catalogo_materiales: por defecto el de materials.json
+        :return catalogo:
+        """
+        catalogo_materiales = catalogo_materiales or CatalogoMateriales.desde_archivo()
+        return cls([seccion["nombre"] for seccion in secciones],
+                   [catalogo_materiales.indice(seccion["material"]) for seccion in secciones],
+                   [seccion["area"] for seccion in secciones],
+                   [seccion["inercia"] for seccion in secciones], catalogo_materiales)
+
+    @classmethod
+    def desde_archivo(cls, ruta: str, catalogo_materiales=None):
+        """Lee la tabla de un archivo JSON con la lista de secciones de desde_lista"""
+        with open(ruta, "r") as archivo_lectura:
+            return cls.desde_lista(json.load(archivo_lectura), catalogo_materiales)
+
+    @classmethod
+    def tubos_circulares(cls, diametros, espesores, materiales=None, catalogo_materiales=None):
+        """
+        Tabla de tubos circulares con todas las combinaciones de diámetro exterior, espesor y material
+        :param diametros: en m
+        :param espesores: en m, se omiten los que no caben en el diámetro
+        :param materiales: nombres de los materiales, por defecto todos los del catálogo
+        :param catalogo_materiales:
+        :return catalogo:
+        """
+        catalogo_materiales = catalogo_materiales or CatalogoMateriales.desde_archivo()
+        materiales = materiales or catalogo_materiales.nombres
+        secciones = []
+        for material in materiales:
+            for diametro in diametros:
+                for espesor in espesores:
+                    if 2 * espesor > diametro:
+                        continue
+                    interior = diametro - 2 * espesor
+                    secciones.append({
+                        "nombre": "{0} Ø{1:g}x{2:g} mm".format(material, diametro * 1e3, espesor * 1e3),
+                        "material": material,
+                        "area": math.pi * (diametro ** 2 - interior ** 2) / 4,
+                        "inercia": math.pi * (diametro ** 4 - interior ** 4) / 64,
+                    })
+        return cls.desde_lista(secciones, catalogo_materiales)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def seleccionar(self, tension, compresion, longitudes, factor_longitud=0.5):
+        """
+        Sección más ligera de cada viga para su envolvente de fuerzas
+        :param tension: tensión máxima de cada viga (>= 0)
+        :param compresion: compresión máxima de cada viga, en valor absoluto
+        :param longitudes:
+        :param factor_longitud: K de la longitud efectiva de pandeo
+        :return secciones: índice de la sección de cada viga, -1 si ninguna de la tabla alcanza
+        """
+        fluencia = np.maximum(tension, compresion)
+        pandeo = compresion * (factor_longitud * longitudes) ** 2 / math.pi ** 2
+        secciones = np.full(len(fluencia), -1)
+        mejores = np.full(len(fluencia), np.inf)
+        catalogo = self.catalogo_materiales
+        for material, tabla in self.tablas.items():
+            posiciones = tabla.primera(fluencia / catalogo.resistencia_fluencia[material],
+                                       pandeo / catalogo.modulo_E[material])
+            encontradas = posiciones < len(tabla.areas)
+            pesos = np.full(len(fluencia), np.inf)
+            pesos[encontradas] = catalogo.densidad[material] * tabla.areas[posiciones[encontradas]]
+            mejora = pesos < mejores
+            mejores[mejora] = pesos[mejora]
+            secciones[mejora] = tabla.indices[posiciones[mejora]]
+        return secciones
@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from barrido import expandir_parametrico
+
+# Opciones de Construccion.optimizar que se aceptan en un trabajo; los gráficos y los procesos los decide el
+# servidor
+OPCIONES = ["metodo", "activo", "multiarranque", "dispersion", "semilla", "limite_segundos",
+            "limite_evaluaciones", "continuacion"]
+# Banderas de cancelación compartidas con los procesos; cada trabajo sin terminar ocupa una posición propia que
+# se libera al terminar, así que un trabajo nuevo nunca toca la bandera de otro en curso
+CANCELACIONES = 65536
+# Cachés de soluciones que conserva cada proceso, una por diseño
+CACHES_POR_PROCESO = 32
+
+ESTADOS_TERMINADOS = ("terminado", "cancelado", "error")
+TEXTOS_ESTADO = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 413: "Payload Too Large", 503: "Service Unavailable"}
+
+# Estado de cada proceso del grupo, se crea una sola vez al iniciarlo
+_cola_progreso = None
+_cancelados = None
+_arranques = None
+_caches = OrderedDict()
+
+
+def _iniciar_trabajador(cola_progreso, cancelados, arranques):
+    """Deja importado y cargado todo lo que usan los trabajos para que el primero no pague el arranque"""
+    global _cola_progreso, _cancelados, _arranques
+    _cola_progreso = cola_progreso
+    _cancelados = cancelados
+    _arranques = arranques
+    # Solo se importan para que queden cargados en el proceso
+    import scipy.optimize
+    import structubridgex
+    from materiales import CatalogoMateriales
+    CatalogoMateriales.desde_archivo()
+
+
+def revisar_opciones(opciones: dict):
+    """Opciones de un trabajo, las de la petición con las del diseño encima; solo se aceptan las de OPCIONES"""
+    desconocidas = sorted(set(opciones) - set(OPCIONES))
+    if desconocidas:
+        raise ValueError("opciones desconocidas: " + ", ".join(desconocidas))
+    return opciones
+
+
+def huella_diseno(diseno: dict):
+    """Identifica la geometría, las cargas y los materiales de un diseño, sin su id ni sus opciones"""
+    datos = {nombre: valor for nombre, valor in diseno.items() if nombre not in ("id", "opciones", "parametros")}
+    return hashlib.sha1(json.dumps(datos, sort_keys=True).encode()).hexdigest()
+
+
+def _cache_diseno(diseno: dict):
+    """Caché de soluciones del diseño en este proceso; la misma armadura enviada otra vez la reutiliza"""
+    from cache import CacheSoluciones
+    huella = huella_diseno(diseno)
+    cache = _caches.pop(huella, None) or CacheSoluciones()
+    _caches[huella] = cache
+    while len(_caches) > CACHES_POR_PROCESO:
+        _caches.popitem(last=False)
+    return cache
+
+
+def _ejecutar_trabajo(numero: int, posicion: int, diseno: dict, opciones: dict, cada_iteraciones: int):
+    """
+    Optimiza un diseño en un proceso del grupo y envía el avance por la cola de progreso
+    :param posicion: bandera de cancelación del trabajo
+    :return resultado: ResultadoOptimizacion.a_dict()
+    """
+    from structubridgex import Construccion
+    _cola_progreso.put((numero, "inicio", None))
+
+    def al_progresar(progreso):
+        _cola_progreso.put((numero, "progreso", progreso.a_dict()))
+        return not _cancelados[posicion]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        construccion = Construccion.desde_dict(diseno)
+        construccion.cache = _cache_diseno(diseno)
+        if _arranques is not None:
+            construccion.activar_arranques(_arranques)
+        resultado = construccion.optimizar(grafico_interactivo=False, verboso=False, procesos=1,
+                                           al_progresar=al_progresar, cada_iteraciones=cada_iteraciones,
+                                           **opciones)
+    return resultado.a_dict()
+
+
+class Trabajo(object):
+    """Un diseño enviado al servidor, su estado y quienes siguen su avance"""
+    def __init__(self, numero: int, posicion: int, diseno: dict, opciones: dict):
+        self.numero = numero
+        self.posicion = posicion
+        self.id = str(numero)
+        self.diseno = diseno
+        self.opciones = opciones
+        self.estado = "en_cola"
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.progreso = None
+        self.resultado = None
+        self.error = None
+        # concurrent.futures.Future del grupo de procesos
+        self.futuro = None
+        # Una cola de asyncio por conexión de eventos
+        self.suscriptores: List = []
+
+    def resumen(self, completo=False):
+        datos = {"id": self.id, "nombre": self.diseno.get("nombre", self.diseno.get("id", "")),
+                 "estado": self.estado, "creado": self.creado, "iniciado": self.iniciado,
+                 "terminado": self.terminado, "progreso": self.progreso, "error": self.error}
+        if self.resultado is not None:
+            datos["peso"] = self.resultado["peso"]
+            datos["motivo"] = self.resultado["motivo"]
+            if completo:
+                datos["resultado"] = self.resultado
+        return datos
+
+    def publicar(self, evento: str, datos):
+        """Envía un evento a todas las conexiones; a una conexión atrasada se le descarta el avance más viejo"""
+        for cola in self.suscriptores:
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait((evento, datos))
+
+
+class ServidorOptimizacion(object):
+    """
+    Servidor de trabajos de optimización con una interfaz HTTP/JSON local. Los diseños se encolan y se optimizan
+    en un grupo acotado de procesos que se mantienen vivos entre trabajos, con las bibliotecas, el catálogo de
+    materiales y las cachés de soluciones ya cargados. El avance se sigue con server-sent events.
+        POST   /trabajos               {"diseno": {...}, "opciones": {...}} -> {"trabajos": [id, ...]}
+        GET    /trabajos               estado de todos los trabajos
+        GET    /trabajos/<id>          estado y resultado (nodos, áreas, pesos, peso, material)
+        GET    /trabajos/<id>/eventos  text/event-stream con eventos "progreso" y uno final "resultado"
+        DELETE /trabajos/<id>          cancela; uno en curso termina con lo mejor encontrado
+        GET    /salud
+    """
+    def __init__(self, procesos=None, max_en_cola=1000, max_terminados=1000, cada_iteraciones=25, arranques=None,
+                 max_cuerpo=16 * 1024 * 1024):
+        """
+        :param procesos: tamaño del grupo de procesos, None usa todos los núcleos
+        :param max_en_cola: trabajos sin terminar como máximo; después se responde 503
+        :param max_terminados: trabajos terminados que se conservan para consultarlos
+        :param cada_iteraciones: un evento de avance cada tantas evaluaciones
+        :param arranques: directorio del almacén de geometrías optimizadas, ver Construccion.activar_arranques
+        :param max_cuerpo: tamaño máximo de una petición, en bytes
+        """
+        # Los procesos se crean a medida que llegan trabajos, con una conexión abierta; con fork heredarían su
+        # socket y la conexión no se cerraría hasta que terminara el proceso
+        contexto = multiprocessing.get_context("spawn")
+        self.cola_progreso = contexto.Queue()
+        self.cancelados = contexto.Array("b", CANCELACIONES, lock=False)
+        self.posiciones_libres = deque(range(CANCELACIONES))
+        self.procesos = procesos or os.cpu_count() or 1
+        self.grupo = ProcessPoolExecutor(self.procesos, mp_context=contexto, initializer=_iniciar_trabajador,
+                                         initargs=(self.cola_progreso, self.cancelados, arranques))
+        self.max_en_cola = max_en_cola
+        self.max_terminados = max_terminados
+        self.cada_iteraciones = cada_iteraciones
+        self.max_cuerpo = max_cuerpo
+        self.trabajos = OrderedDict()
+        self.numero = 0
+        self.bucle = None
+        self.lector = None
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765):
+        """Empieza a escuchar; devuelve el asyncio.Server"""
+        self.bucle = asyncio.get_running_loop()
+        self.lector = threading.Thread(target=self.leer_progreso, daemon=True)
+        self.lector.start()
+        return await asyncio.start_server(self.atender, host, puerto)
+
+    def cerrar(self):
+        for trabajo in self.trabajos.values():
+            if trabajo.estado not in ESTADOS_TERMINADOS:
+                self.cancelados[trabajo.posicion] = 1
+        self.grupo.shutdown(wait=True, cancel_futures=True)
+        self.cola_progreso.put(None)
+
+    def leer_progreso(self):
+        """Hilo que pasa al bucle de eventos los mensajes que dejan los procesos en la cola de progreso"""
+        while True:
+            mensaje = self.cola_progreso.get()
+            if mensaje is None:
+                return
+            self.bucle.call_soon_threadsafe(self.despachar, *mensaje)
+
+    def despachar(self, numero: int, evento: str, datos):
+        trabajo = self.trabajos.get(str(numero))
+        if trabajo is None or trabajo.estado in ESTADOS_TERMINADOS:
+            return
+        if evento == "inicio":
+            trabajo.estado = "ejecutando"
+            trabajo.iniciado = time.time()
+        else:
+            trabajo.progreso = datos
+        trabajo.publicar(evento, datos)
+
+    def pendientes(self):
+        return sum(1 for trabajo in self.trabajos.values() if trabajo.estado not in ESTADOS_TERMINADOS)
+
+    def crear_trabajos(self, peticion: dict):
+        """
+        :param peticion: {"diseno": diseño de Construccion.desde_dict o paramétrico, "opciones": {...}}
+        :return trabajos:
+        """
+        if not isinstance(peticion, dict):
+            raise ValueError("la petición debe ser un objeto JSON")
+        diseno = peticion.get("diseno")
+        if not isinstance(diseno, dict):
+            raise ValueError("falta el diseño")
+        opciones_peticion = peticion.get("opciones", {})
+        if not isinstance(opciones_peticion, dict):
+            raise ValueError("las opciones deben ser un objeto JSON")
+        disenos = list(expandir_parametrico(diseno)) if "tipo" in diseno else [diseno]
+        # Las opciones de cada diseño se revisan junto con las de la petición antes de encolar cualquiera
+        opciones_disenos = []
+        for diseno in disenos:
+            opciones_diseno = diseno.get("opciones", {})
+            if not isinstance(opciones_diseno, dict):
+                raise ValueError("las opciones del diseño deben ser un objeto JSON")
+            opciones_disenos.append(revisar_opciones(dict(opciones_peticion, **opciones_diseno)))
+        if self.pendientes() + len(disenos) > self.max_en_cola or len(disenos) > len(self.posiciones_libres):
+            raise OverflowError("la cola está llena")
+        trabajos = []
+        for diseno, opciones in zip(disenos, opciones_disenos):
+            self.numero += 1
+            trabajo = Trabajo(self.numero, self.posiciones_libres.popleft(), diseno, opciones)
+            self.cancelados[trabajo.posicion] = 0
+            self.trabajos[trabajo.id] = trabajo
+            trabajo.futuro = self.grupo.submit(_ejecutar_trabajo, trabajo.numero, trabajo.posicion,
+                                               trabajo.diseno, trabajo.opciones, self.cada_iteraciones)
+            trabajo.futuro.add_done_callback(lambda futuro, trabajo=trabajo: self.al_terminar(trabajo, futuro))
+            trabajos.append(trabajo)
+        self.descartar_terminados()
+        return trabajos
+
+    def al_terminar(self, trabajo: Trabajo, futuro):
+        """Se llama desde el hilo del grupo de procesos; el trabajo se cierra en el bucle de eventos"""
+        if not self.bucle.is_closed():
+            self.bucle.call_soon_threadsafe(self.terminar, trabajo, futuro)
+
+    def terminar(self, trabajo: Trabajo, futuro):
+        # Un trabajo quitado de la cola ya se cerró en cancelar
+        if trabajo.estado in ESTADOS_TERMINADOS:
+            return
+        trabajo.terminado = time.time()
+        self.posiciones_libres.append(trabajo.posicion)
+        if futuro.cancelled():
+            trabajo.estado = "cancelado"
+        elif futuro.exception() is not None:
+            trabajo.estado = "error"
+            trabajo.error = repr(futuro.exception())
+        else:
+            trabajo.resultado = futuro.result()
+            trabajo.estado = "cancelado" if trabajo.resultado["motivo"] == "cancelada" else "terminado"
+        trabajo.publicar("resultado", trabajo.resumen(completo=True))
+        trabajo.publicar(None, None)
+
+    def cancelar(self, trabajo: Trabajo):
+        if trabajo.estado in ESTADOS_TERMINADOS:
+            return
+        # Uno que el grupo no ha tomado se quita de la cola y queda cancelado; el futuro del grupo se niega a
+        # cancelarse en cuanto un proceso lo toma, y entonces el trabajo ve la bandera en su siguiente evento de
+        # avance y termina con lo mejor que haya encontrado
+        if trabajo.futuro.cancel():
+            self.terminar(trabajo, trabajo.futuro)
+        else:
+            self.cancelados[trabajo.posicion] = 1
+
+    def descartar_terminados(self):
+        terminados = [id_trabajo for id_trabajo, trabajo in self.trabajos.items()
+                      if trabajo.estado in ESTADOS_TERMINADOS]
+        for id_trabajo in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self.trabajos[id_trabajo]
+
+    async def atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        """Atiende una conexión HTTP/1.1 con una sola petición"""
+        try:
+            linea = await lector.readline()
+            partes = linea.decode("latin-1").split()
+            if len(partes) < 2:
+                return
+            metodo, ruta = partes[0].upper(), partes[1].split("?")[0]
+            encabezados = {}
+            while True:
+                linea = await lector.readline()
+                if linea in (b"\r\n", b"\n", b""):
+                    break
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                encabezados[nombre.strip().lower()] = valor.strip()
+            try:
+                longitud = int(encabezados.get("content-length", 0))
+            except ValueError:
+                longitud = -1
+            if longitud < 0:
+                await self.responder(escritor, 400, {"error": "Content-Length inválido"})
+                return
+            if longitud > self.max_cuerpo:
+                await self.responder(escritor, 413, {"error": "petición demasiado grande"})
+                return
+            cuerpo = await lector.readexactly(longitud) if longitud else b""
+            await self.enrutar(escritor, metodo, [parte for parte in ruta.split("/") if parte], cuerpo)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def enrutar(self, escritor: asyncio.StreamWriter, metodo: str, partes: List, cuerpo: bytes):
+        if partes == ["salud"]:
+            await self.responder(escritor, 200, {"estado": "ok", "procesos": self.procesos,
+                                                 "pendientes": self.pendientes()})
+        elif partes == ["trabajos"] and metodo == "GET":
+            await self.responder(escritor, 200, [trabajo.resumen() for trabajo in self.trabajos.values()])
+        elif partes == ["trabajos"] and metodo == "POST":
+            try:
+                trabajos = self.crear_trabajos(json.loads(cuerpo or b"{}"))
+            except OverflowError as error:
+                await self.responder(escritor, 503, {"error": str(error)})
+                return
+            except (ValueError, KeyError, TypeError) as error:
+                await self.responder(escritor, 400, {"error": str(error)})
+                return
+            await self.responder(escritor, 202, {"trabajos": [trabajo.id for trabajo in trabajos]})
+        elif len(partes) in (2, 3) and partes[0] == "trabajos":
+            trabajo = self.trabajos.get(partes[1])
+            if trabajo is None:
+                await self.responder(escritor, 404, {"error": "no existe el trabajo " + partes[1]})
+            elif len(partes) == 3 and partes[2] == "eventos" and metodo == "GET":
+                await self.eventos(escritor, trabajo)
+            elif len(partes) == 2 and metodo == "GET":
+                await self.responder(escritor, 200, trabajo.resumen(completo=True))
+            elif len(partes) == 2 and metodo == "DELETE":
+                self.cancelar(trabajo)
+                await self.responder(escritor, 202, trabajo.resumen())
+            else:
+                await self.responder(escritor, 405, {"error": "método no permitido"})
+        else:
+            await self.responder(escritor, 404, {"error": "ruta desconocida"})
+
+    async def responder(self, escritor: asyncio.StreamWriter, codigo: int, datos):
+        contenido = json.dumps(datos).encode()
+        escritor.write("HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\n"
+                       "Connection: close\r\n\r\n".format(codigo, TEXTOS_ESTADO[codigo], len(contenido)).encode())
+        escritor.write(contenido)
+        await escritor.drain()
+
+    async def eventos(self, escritor: asyncio.StreamWriter, trabajo: Trabajo):
+        """Server-sent events: el último avance conocido, los siguientes y al final el resultado"""
+        escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                       b"Connection: close\r\n\r\n")
+        if trabajo.estado in ESTADOS_TERMINADOS:
+            self.escribir_evento(escritor, "resultado", trabajo.resumen(completo=True))
+            await escritor.drain()
+            return
+        cola = asyncio.Queue(maxsize=256)
+        trabajo.suscriptores.append(cola)
+        try:
+            if trabajo.progreso is not None:
+                self.escribir_evento(escritor, "progreso", trabajo.progreso)
+            while True:
+                evento, datos = await cola.get()
+                if evento is None:
+                    break
+                self.escribir_evento(escritor, evento, datos)
+                await escritor.drain()
+        finally:
+            trabajo.suscriptores.remove(cola)
+
+    @staticmethod
+    def escribir_evento(escritor: asyncio.StreamWriter, evento: str, datos):
+        escritor.write("event: {0}\ndata: {1}\n\n".format(evento, json.dumps(datos)).encode())
+
+
+async def servir(host="127.0.0.1", puerto=8765, **opciones):
+    """Ejecuta el servidor hasta que se interrumpa; opciones son las de ServidorOptimizacion"""
+    servidor = ServidorOptimizacion(**opciones)
+    escucha = await servidor.iniciar(host, puerto)
+    print("Servidor de optimización en http://{0}:{1} con {2} procesos".format(host, puerto, servidor.procesos))
+    try:
+        async with escucha:
+            await escucha.serve_forever()
+    finally:
+        servidor.cerrar()
+
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Servidor HTTP/JSON local de optimización de armaduras")
+    analizador.add_argument("--host", default="127.0.0.1")
+    analizador.add_argument("--puerto", type=int, default=8765)
+    analizador.add_argument("--procesos", type=int, default=None, help="número de procesos (todos los núcleos)")
+    analizador.add_argument("--max-en-cola", type=int, default=1000, help="trabajos sin terminar como máximo")
+    analizador.add_argument("--cada-iteraciones", type=int, default=25, help="evaluaciones entre eventos de avance")
+    analizador.add_argument("--arranques", default=None, help="directorio del almacén de geometrías optimizadas")
+    argumentos = analizador.parse_args()
+    try:
+        asyncio.run(servir(argumentos.host, argumentos.puerto, procesos=argumentos.procesos,
+                           max_en_cola=argumentos.max_en_cola, cada_iteraciones=argumentos.cada_iteraciones,
+                           arranques=argumentos.arranques))
+    except KeyboardInterrupt:
+        pass
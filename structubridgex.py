@@ -1,34 +1,40 @@
 import numpy as np
 import math
-import Graficas
-import pygame
 from typing import List
-import json
-from scipy.optimize import fmin_powell
 Vector = List[float]
 import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from modelo import ModeloArmadura
+from cache import CacheSoluciones
+from perfilado import Perfilador, PerfiladorNulo
+from materiales import CatalogoMateriales
+from arranque import AlmacenArranques
+from historial import HistorialOptimizacion
+from lineas_influencia import LineasInfluencia, TrenCargas
+from progreso import ControlOptimizacion, OptimizacionDetenida, ResultadoOptimizacion
+
+# Métodos de scipy.optimize.minimize que no usan el gradiente, en minúsculas
+METODOS_SIN_GRADIENTE = ("nelder-mead", "cobyla", "cobyqa")
 
 
-# Inicializa Pygame
-pygame.init()
-
-# Cargar la imagen de fondo
-fondo = pygame.image.load('aqua3.png')
-
-# Opcional: Redimensionar la imagen de fondo si no coincide con el tamaño de la ventana
-fondo = pygame.transform.scale(fondo, (1280, 720))  # Ajusta las dimensiones según tus necesidades
-
 class Nodo(object):
     """Un objeto que define una posición"""
-    def __init__(self, nombre: str, pos, restriccion_x=0, restriccion_y=0):
-        """Nodo: tiene un nombre, posición y restricciones. Las cargas se añaden cuando se coloca el peso distribuido en la viga. Un valor opcional es optimizar, para cada dimensión la posición del nodo se puede optimizar para optimizar la construcción."""
+    def __init__(self, nombre: str, pos, restriccion_x=0, restriccion_y=0, restriccion_z=0):
+        """Nodo: tiene un nombre, posición y restricciones. Las cargas se añaden cuando se coloca el peso distribuido en la viga. Un valor opcional es optimizar, para cada dimensión la posición del nodo se puede optimizar para optimizar la construcción. Con tres coordenadas en pos el nodo es de una armadura espacial y restriccion_z apoya el eje z."""
         self.nombre: str = nombre
         self.pos = np.array(pos)
-        self.carga: Vector = np.array([0, 0])
+        self.carga: Vector = np.zeros(len(self.pos))
         self.lista_cargas = np.array([0])
         self.restriccion_x = restriccion_x
         self.restriccion_y = restriccion_y
-        self.optimizar: List = np.array([0, 0])
+        self.restriccion_z = restriccion_z
+        self.optimizar: List = np.zeros(len(self.pos), dtype=int)
+
+    def restricciones(self, dimension: int):
+        """Valor de la restricción en cada eje, x, y y, en el espacio, z"""
+        return [self.restriccion_x, self.restriccion_y, self.restriccion_z][:dimension]
 
     def __str__(self):
         texto: str = self.nombre
@@ -51,17 +57,20 @@ class Viga(object):
         self.delta_1: Vector = nodos[b].pos - nodos[a].pos
         self.angulo_0: float = math.atan2(self.delta_0[1], self.delta_0[0])
         self.angulo_1: float = math.atan2(self.delta_1[1], self.delta_1[0])
+        # Cosenos directores del nodo b hacia el nodo a; en el plano valen (cos, sen) de angulo_0 y una viga de
+        # longitud cero toma la dirección del eje x, como daba atan2(0, 0)
+        self.cosenos: Vector = self.delta_0 / self.longitud if self.longitud > 0 else \
+            np.eye(len(self.delta_0))[0]
         self.area = 0.10
         self.modulo_E = 210 * 1e+9
         self.densidad = 7850
         self.resistencia_fluencia = 250 * 1e+6
         self.fuerza_interna = 0
         self.peso = 0.0
-        self.conexiones = np.zeros(len(2 * nodos))
-        self.conexiones[2 * a] = math.cos(self.angulo_0)
-        self.conexiones[2 * a + 1] = math.sin(self.angulo_0)
-        self.conexiones[2 * b] = math.cos(self.angulo_1)
-        self.conexiones[2 * b + 1] = math.sin(self.angulo_1)
+        dimension = len(self.cosenos)
+        self.conexiones = np.zeros(dimension * len(nodos))
+        self.conexiones[dimension * a:dimension * (a + 1)] = self.cosenos
+        self.conexiones[dimension * b:dimension * (b + 1)] = -self.cosenos
 
     @staticmethod
     def absoluto(arr):
@@ -104,6 +113,144 @@ class Viga(object):
         return texto
 
 
+def _arreglo_modelo(nombre: str):
+    """Propiedad que lee y escribe la entrada de la viga en el arreglo del modelo con ese nombre"""
+    def leer(self):
+        return getattr(self.modelo, nombre)[self.indice]
+
+    def escribir(self, valor):
+        getattr(self.modelo, nombre)[self.indice] = valor
+    return property(leer, escribir)
+
+
+class VistaViga(Viga):
+    """Viga sin datos propios: es una vista de la viga número indice en los arreglos de un ModeloArmadura"""
+    longitud = _arreglo_modelo("longitudes")
+    area = _arreglo_modelo("areas")
+    peso = _arreglo_modelo("pesos")
+    fuerza_interna = _arreglo_modelo("fuerza_interna")
+    modulo_E = _arreglo_modelo("modulo_E")
+    densidad = _arreglo_modelo("densidad")
+    resistencia_fluencia = _arreglo_modelo("resistencia_fluencia")
+
+    def __init__(self, modelo: ModeloArmadura, indice: int):
+        self.modelo = modelo
+        self.indice = indice
+        self.nombre: str = modelo.nombres_vigas[indice]
+        self.nodo_a = int(modelo.nodo_a[indice])
+        self.nodo_b = int(modelo.nodo_b[indice])
+
+    @property
+    def pos1(self):
+        return self.modelo.coordenadas[self.nodo_a]
+
+    @property
+    def pos2(self):
+        return self.modelo.coordenadas[self.nodo_b]
+
+    @property
+    def carga(self):
+        return self.modelo.cargas[self.modelo.caso, self.indice]
+
+    @property
+    def carga_nodos(self):
+        return 0.5 * self.carga * self.longitud
+
+    @property
+    def delta_0(self):
+        return self.pos1 - self.pos2
+
+    @property
+    def delta_1(self):
+        return self.pos2 - self.pos1
+
+    @property
+    def angulo_0(self):
+        return math.atan2(self.delta_0[1], self.delta_0[0])
+
+    @property
+    def angulo_1(self):
+        return math.atan2(self.delta_1[1], self.delta_1[0])
+
+    @property
+    def cosenos(self):
+        return self.modelo.direcciones[self.indice]
+
+    @property
+    def conexiones(self):
+        dimension = self.modelo.dimension
+        conexiones = np.zeros(self.modelo.numero_nodos * dimension)
+        direccion = self.cosenos
+        conexiones[dimension * self.nodo_a:dimension * (self.nodo_a + 1)] = direccion
+        conexiones[dimension * self.nodo_b:dimension * (self.nodo_b + 1)] = -direccion
+        return conexiones
+
+
+def calcular_areas(fuerzas, longitudes, modulo_E, resistencia_fluencia):
+    """
+    Versión vectorizada de Viga.calcular_peso_viga: calcula el área de cada viga a partir de su fuerza interna.
+    Los argumentos se combinan con broadcasting de numpy, p. ej. propiedades de materiales en columnas
+    (materiales x 1) contra fuerzas y longitudes de vigas en filas (1 x vigas).
+    :param fuerzas: positivas a tensión, negativas a compresión
+    :param longitudes:
+    :param modulo_E:
+    :param resistencia_fluencia:
+    :return areas:
+    """
+    fuerzas = np.asarray(fuerzas, dtype=float)
+    fuerza_interna = np.abs(fuerzas)
+    # La fuerza está estirando la viga
+    area_tension = fuerza_interna / resistencia_fluencia
+    # La fuerza está comprimiendo la viga, pandeo de Euler con sección circular maciza
+    area_compresion = np.sqrt((fuerza_interna * (0.5 * longitudes) ** 2 / (
+        math.pi ** 2 * modulo_E)) / (math.pi / 4)) * math.pi
+    return np.where(fuerzas >= 0, area_tension, area_compresion)
+
+
+def pesos_materiales(fuerzas, longitudes, modulo_E, densidad, resistencia_fluencia):
+    """
+    Peso total de una o varias construcciones para cada material sin calcular las áreas. El peso de
+    calcular_areas se separa en un factor del material y uno de la geometría: a tensión
+    (densidad / fluencia)·F·L y a compresión (densidad / √E)·L²·√(|F| / π).
+    :param fuerzas: (... x vigas)
+    :param longitudes: (... x vigas)
+    :param modulo_E: (materiales,)
+    :param densidad: (materiales,)
+    :param resistencia_fluencia: (materiales,)
+    :return pesos: (... x materiales)
+    """
+    fuerzas = np.asarray(fuerzas, dtype=float)
+    tension = np.sum(np.maximum(fuerzas, 0) * longitudes, axis=-1)
+    compresion = np.sum(longitudes ** 2 * np.sqrt(np.maximum(-fuerzas, 0) / math.pi), axis=-1)
+    return tension[..., None] * (densidad / resistencia_fluencia) + \
+        compresion[..., None] * (densidad / np.sqrt(modulo_E))
+
+
+def derivadas_pesos(fuerzas, longitudes, modulo_E, densidad, resistencia_fluencia):
+    """
+    Derivadas del peso de cada viga (área · longitud · densidad, con el área de calcular_areas) respecto a su
+    fuerza interna y a su longitud. A compresión el área vale L·sqrt(|F| / (π·E)), así que el peso crece con
+    L² y la derivada respecto a la fuerza no está acotada en F = 0; se limita con una fuerza mínima.
+    :param fuerzas:
+    :param longitudes:
+    :param modulo_E:
+    :param densidad:
+    :param resistencia_fluencia:
+    :return derivada_fuerzas, derivada_longitudes:
+    """
+    fuerzas = np.asarray(fuerzas, dtype=float)
+    tension = fuerzas >= 0
+    compresion = np.maximum(-fuerzas, 1e-9)
+    raiz = np.sqrt(compresion / (math.pi * modulo_E))
+    derivada_fuerzas = np.where(tension,
+                                densidad * longitudes / resistencia_fluencia,
+                                -densidad * longitudes ** 2 * raiz / (2 * compresion))
+    derivada_longitudes = np.where(tension,
+                                   densidad * fuerzas / resistencia_fluencia,
+                                   2 * densidad * longitudes * raiz)
+    return derivada_fuerzas, derivada_longitudes
+
+
 class Construccion(object):
     def __init__(self, nombre: str, nodos: List, lista_vigas: List, lista_cargas: List):
         """
@@ -116,18 +263,44 @@ class Construccion(object):
         self.materiales = {}
         self.material: str = ""
         self.nombre: str = nombre
-        self.ventana = Graficas.Construccion("Structubridgex", 1280, 720)
+        self.ventana = None
+        self.observadores: List = []
         self.nodos: List = nodos
-        self.vigas: List = []
-        self.cargas_actuales = 0
         self.lista_cargas = lista_cargas
-        self.vigas = []
+        self.modelo = ModeloArmadura(nodos, lista_vigas, lista_cargas)
+        self.sistema = self.modelo.sistema
+        # Los nodos y las vigas son vistas de los arreglos del modelo, no se reconstruyen en cada evaluación
+        for x in range(0, len(self.nodos)):
+            self.nodos[x].pos = self.modelo.coordenadas[x]
+            self.nodos[x].carga = self.modelo.cargas_nodos[x]
+        self.vigas: List = [VistaViga(self.modelo, x) for x in range(0, self.modelo.numero_vigas)]
         self.ultima_iteracion = False
-        self.vigas_maximas = []
-        self.establecer_vigas()
+        # Caso de carga que gobierna cada viga en la envolvente, ver dimensionar_envolvente
+        self.vigas_maximas = np.zeros(0, dtype=int)
+        self.B_casos = []
         self.cargas_opcionales: List = []
         self.iteracion = 0
-        
+        self.indice_carga = None
+        self.cache = None
+        self.llave_cache = None
+        self.perfilador = PerfiladorNulo()
+        # Material fijo por viga (índices del catálogo) o el más ligero de cada viga, ver asignar_materiales
+        self.materiales_vigas = None
+        self.material_por_viga = False
+        # Dimensionamiento discreto con una tabla de secciones, ver asignar_secciones
+        self.secciones = None
+        self.factor_longitud = 0.5
+        self.secciones_vigas = None
+        # Presupuesto, cancelación y avance de la optimización en curso, ver optimizar
+        self.control = None
+        self.verboso = True
+        self.ultimo_resultado = None
+        # Geometrías optimizadas guardadas en disco, ver activar_arranques
+        self.arranques = None
+        # Trenes de cargas que cruzan el tablero, ver activar_cargas_moviles
+        self.cargas_moviles = None
+        # Registro en disco de cada evaluación, ver activar_historial
+        self.historial = None
 
         # Declarar datos que se usarán más tarde
         self.matriz = []
@@ -138,201 +311,938 @@ class Construccion(object):
         self.grafico_interactivo = False
         print("Construcción creada...")
 
+    @classmethod
+    def desde_dict(cls, datos: dict):
+        """
+        Crea una construcción a partir de un diccionario, por ejemplo leído de JSON:
+        {"nombre": ..., "nodos": [{"nombre", "pos", "restriccion_x", "restriccion_y", "optimizar"}, ...],
+         "vigas": [[nombre, nodo_a, nodo_b], ...], "cargas": [[[qx, qy] por viga] por caso]}
+        En una armadura espacial pos, optimizar y las cargas tienen tres componentes y los nodos "restriccion_z"
+        y opcionalmente "cargas_moviles": {"nodos_tablero": [...], "trenes": [TrenCargas.desde_dict, ...],
+        "paso", "direccion", "ambos_sentidos"} con los argumentos de activar_cargas_moviles
+        :param datos:
+        :return construccion:
+        """
+        nodos = []
+        for dato in datos["nodos"]:
+            nodo = Nodo(dato["nombre"], dato["pos"], restriccion_x=dato.get("restriccion_x", 0),
+                        restriccion_y=dato.get("restriccion_y", 0), restriccion_z=dato.get("restriccion_z", 0))
+            nodo.optimizar = np.array(dato.get("optimizar", [0] * len(dato["pos"])))
+            nodos.append(nodo)
+        construccion = cls(datos.get("nombre", ""), nodos, datos["vigas"], datos["cargas"])
+        moviles = datos.get("cargas_moviles")
+        if moviles:
+            opciones = {nombre: valor for nombre, valor in moviles.items() if nombre not in ("nodos_tablero", "trenes")}
+            construccion.activar_cargas_moviles(moviles["nodos_tablero"],
+                                                [TrenCargas.desde_dict(tren) for tren in moviles["trenes"]],
+                                                **opciones)
+        return construccion
+
+    def resultado_dict(self):
+        """Resultado de la construcción actual como diccionario serializable en JSON"""
+        return {
+            "nombre": self.nombre,
+            "peso": float(self.peso),
+            "material": self.material,
+            "indice_carga": self.indice_carga,
+            "iteraciones": self.iteracion,
+            "nodos": self.modelo.coordenadas.tolist(),
+            "fuerzas": self.modelo.fuerzas.tolist(),
+            "areas": self.modelo.areas.tolist(),
+            "pesos": self.modelo.pesos.tolist(),
+            "materiales_vigas": self.materiales_por_viga(),
+            "secciones": None if self.secciones_vigas is None else
+            [self.secciones.nombres[x] if x >= 0 else None for x in self.secciones_vigas],
+        }
+
+    def materiales_por_viga(self):
+        """Nombre del material de cada viga según las propiedades que tiene el modelo"""
+        modelo = self.modelo
+        catalogo = self.catalogo
+        coincide = (modelo.modulo_E[:, None] == catalogo.modulo_E) & (modelo.densidad[:, None] == catalogo.densidad) \
+            & (modelo.resistencia_fluencia[:, None] == catalogo.resistencia_fluencia)
+        return [self.nombres_materiales[np.argmax(fila)] if np.any(fila) else None for fila in coincide]
+
+    @property
+    def cargas_actuales(self):
+        """Índice del caso de carga actual en lista_cargas"""
+        return self.modelo.caso
+
+    @cargas_actuales.setter
+    def cargas_actuales(self, caso):
+        self.modelo.caso = caso
+
     def establecer_vigas(self):
         """
-        Reconstruye todas las vigas entre los nodos con los nuevos valores
+        Recalcula la geometría de todas las vigas entre los nodos con los nuevos valores
         :return:
         """
-        self.vigas = []
-        for x in range(0, len(self.vigas_temporales)):
-            self.vigas.append(Viga(str(self.vigas_temporales[x][0]),
-                                   self.nodos,
-                                   self.lista_cargas[self.cargas_actuales][x],
-                                   self.vigas_temporales[x][1],
-                                   self.vigas_temporales[x][2]))
+        with self.perfilador.fase("geometria"):
+            self.modelo.actualizar_geometria()
+
+    def __getstate__(self):
+        """Al copiar la construcción a otro proceso no se lleva la ventana ni los observadores"""
+        estado = self.__dict__.copy()
+        estado["ventana"] = None
+        estado["observadores"] = []
+        estado["control"] = None
+        # Las evaluaciones en otros procesos no se registran, un historial solo tiene un escritor
+        estado["historial"] = None
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        # Las vistas de los nodos no sobreviven a pickle, se vuelven a enlazar con el modelo
+        for x in range(0, len(self.nodos)):
+            self.nodos[x].pos = self.modelo.coordenadas[x]
+            self.nodos[x].carga = self.modelo.cargas_nodos[x]
 
-    def optimizar(self, activo=True, grafico_interactivo=True):
+    def optimizar(self, activo=True, grafico_interactivo=True, metodo="powell", procesos=1, multiarranque=0,
+                  dispersion=0.1, semilla=None, limite_segundos=None, limite_evaluaciones=None, al_progresar=None,
+                  cada_iteraciones=1, cancelacion=None, verboso=True, continuacion=False):
         """
         Optimizar generará una construcción con un peso mínimo para la carga dada
         Opcional: activo activará la función de minimización para crear una construcción altamente optimizada
         :param activo:
         :param grafico_interactivo:
-        :return:
+        :param metodo: "powell" (sin derivadas) o un método de scipy.optimize.minimize, sin distinguir
+            mayúsculas; los que usan el gradiente, como "L-BFGS-B" o "SLSQP", reciben el analítico
+        :param procesos: número de procesos para repartir las optimizaciones de cada caso de carga y de cada
+            arranque; 1 las ejecuta en este proceso, None usa todos los núcleos
+        :param multiarranque: número de suposiciones iniciales aleatorias adicionales por caso de carga
+        :param dispersion: desviación estándar, en metros, de las suposiciones iniciales aleatorias
+        :param semilla: semilla del generador de las suposiciones iniciales aleatorias
+        :param limite_segundos: al acabarse el tiempo se termina con lo mejor encontrado hasta ahí
+        :param limite_evaluaciones: evaluaciones máximas de la función objetivo; con varios procesos se reparten
+            por igual entre las tareas
+        :param al_progresar: función que recibe un Progreso cada cada_iteraciones evaluaciones (con varios
+            procesos, uno al terminar cada tarea); si devuelve False se cancela la optimización
+        :param cada_iteraciones:
+        :param cancelacion: threading.Event para cancelar desde otro hilo, ver también cancelar
+        :param verboso: si es falso no imprime nada
+        :param continuacion: cada caso de carga arranca desde la geometría con menor peso envolvente de los
+            casos ya optimizados en vez de la suposición inicial; solo con procesos=1
+        :return resultado: ResultadoOptimizacion
         """
+        if continuacion and activo and procesos != 1:
+            # En el grupo todos los casos arrancan a la vez, no hay casos anteriores de los que continuar
+            raise ValueError("continuacion solo funciona con procesos=1")
         self.grafico_interactivo = grafico_interactivo
-        suposicion_inicial = []
-        for x in range(0, len(self.nodos)):
-            if not np.any(self.nodos[x].optimizar):
-                continue
-            for val in range(0, len(self.nodos[x].optimizar)):
-                if self.nodos[x].optimizar[val] != 0:
-                    suposicion_inicial.append(self.nodos[x].pos[val])
-
-        suposicion_inicial = np.array(suposicion_inicial)
-        print("Suposición Inicial", suposicion_inicial)
-        print("Calculando Construcción....")
-        pesos_construccion = []
-        cargas_nr_max_peso = []
-        resultados = []
-        self.vigas_maximas = []
-        for a in range(0, len(self.lista_cargas)):
-            # Iterar a través de todas las cargas
-            self.cargas_actuales = a
-            print("\n\nCalculando construcción para carga: ", self.cargas_actuales)
-            # Crear óptimo para la carga actual
-            if activo:
-                resultado = fmin_powell(self.establecer_y_calcular, suposicion_inicial, xtol=0.01, ftol=0.005)
+        self.verboso = verboso
+        control = ControlOptimizacion(limite_segundos, limite_evaluaciones, al_progresar, cada_iteraciones,
+                                      cancelacion)
+        self.control = control
+        self.modelo.leer_libres(self.nodos)
+        suposicion_inicial = self.modelo.valores_libres()
+        # Arranque principal de cada caso de carga: la suposición inicial o el óptimo guardado de ese caso
+        principales = [suposicion_inicial] * len(self.lista_cargas)
+        if self.arranques is not None:
+            entrada, distancia = self.arranques.buscar(self.modelo)
+            if entrada is not None:
+                suposicion_inicial = np.array(entrada["valores"])
+                principales = [suposicion_inicial if valores is None else np.array(valores)
+                               for valores in entrada["casos"]]
+                self.informar("Arranque guardado, distancia de cargas:", distancia)
+        self.informar("Suposición Inicial", suposicion_inicial)
+        self.informar("Calculando Construcción....")
+
+        generador = np.random.default_rng(semilla)
+        aleatorios = []
+        if activo:
+            for x in range(0, multiarranque):
+                aleatorios.append(suposicion_inicial + generador.normal(0, dispersion, len(suposicion_inicial)))
+        tareas = [(a, inicio) for a in range(0, len(self.lista_cargas))
+                  for inicio in [principales[a]] + aleatorios]
+        tareas_totales = len(tareas)
+
+        try:
+            if activo and procesos != 1:
+                resultados, tareas = self.optimizar_en_grupo(tareas, metodo, procesos, control)
             else:
-                resultado = self.establecer_y_calcular(suposicion_inicial)
-            self.graficar_construccion()
-            pesos_construccion.append(self.peso)
-            cargas_nr_max_peso.append(a)
-            resultados.append(resultado)
-            self.vigas_maximas.append(self.vigas)
-            for y in range(0, len(self.lista_cargas)):
-                # Hacer la construcción fuerte para que el óptimo actual pueda soportar todas las cargas
-                if a == y:
-                    continue
-                self.cargas_actuales = y
-                self.establecer_y_calcular(resultado)
-                for t in range(0, len(self.vigas)):
-                    if self.vigas_maximas[a][t].peso < self.vigas[t].peso:
-                        self.vigas_maximas[a][t] = self.vigas[t]
-                # Calcular el peso del óptimo actual fuerte
-                self.peso = 0
-                for t in range(0, len(self.vigas)):
-                    self.vigas[t] = self.vigas_maximas[a][t]
-                    self.peso += self.vigas[t].peso
-
-                if self.peso > pesos_construccion[a]:
-                    pesos_construccion[a] = self.peso
-                    cargas_nr_max_peso[a] = y
+                resultados = []
+                mejor_peso, mejor_resultado = np.inf, None
+                for a, inicio in tareas:
+                    # Con la optimización detenida las tareas que faltan no se empiezan
+                    if resultados and control.detenido:
+                        break
+                    # Solo se reemplaza la suposición inicial, ni los óptimos guardados ni los arranques aleatorios
+                    if continuacion and mejor_resultado is not None and inicio is suposicion_inicial:
+                        inicio = mejor_resultado
+                    resultado = self.optimizar_caso(a, inicio, metodo, activo)
+                    resultados.append(resultado)
+                    if continuacion:
+                        self.establecer_posiciones(resultado)
+                        peso = self.obtener_vigas_maximas()
+                        if peso < mejor_peso:
+                            mejor_peso, mejor_resultado = peso, resultado
+                tareas = tareas[:len(resultados)]
+        finally:
+            self.control = None
+            if self.historial is not None:
+                self.historial.guardar()
+
+        # Hacer la construcción fuerte para que cada óptimo pueda soportar todas las cargas
+        pesos_construccion = []
+        for resultado in resultados:
+            self.establecer_posiciones(resultado)
+            pesos_construccion.append(self.obtener_vigas_maximas())
 
         minimo = min(pesos_construccion)
-        indice_carga = pesos_construccion.index(minimo)
-        self.cargas_actuales = cargas_nr_max_peso[indice_carga]
-        self.establecer_y_calcular(resultados[indice_carga])
-        self.vigas = self.vigas_maximas[indice_carga]
-        self.peso = minimo
-        print("\n\nEl mejor peso para todas las cargas es:", minimo, "kg")
-
-        print("Este puente está optimizado para la carga nr: ", indice_carga)
+        indice_resultado = pesos_construccion.index(minimo)
+        indice_carga = tareas[indice_resultado][0]
+        self.indice_carga = indice_carga
+        self.establecer_posiciones(resultados[indice_resultado])
+        self.obtener_vigas_maximas()
+        if self.arranques is not None and activo:
+            casos = [None] * len(self.lista_cargas)
+            for (a, inicio), resultado in zip(tareas, resultados):
+                if inicio is principales[a]:
+                    casos[a] = resultado
+            self.arranques.guardar(self.modelo, resultados[indice_resultado], minimo, casos, self.material)
+        self.informar("\n\nEl mejor peso para todas las cargas es:", minimo, "kg")
+
+        self.informar("Este puente está optimizado para la carga nr: ", indice_carga)
+        if control.detenido:
+            self.informar("Optimización detenida:", control.motivo)
+        self.registrar_estadisticas()
         self.graficar_construccion(terminado=True)
-        while True:
-            self.ventana.mantener()
+        self.ultimo_resultado = ResultadoOptimizacion(self, control.motivo or ResultadoOptimizacion.CONVERGENCIA,
+                                                      control.segundos(), len(tareas), tareas_totales)
+        return self.ultimo_resultado
+
+    def optimizar_en_grupo(self, tareas: List, metodo: str, procesos, control: ControlOptimizacion):
+        """
+        Reparte las tareas (caso, suposición inicial) en un grupo de procesos. Cada proceso recibe una copia de la
+        construcción una sola vez y optimiza sin gráficos. Los límites viajan con cada tarea; al cancelar solo se
+        descartan las tareas que no han empezado.
+        :return resultados, tareas: de las tareas que llegaron a ejecutarse
+        """
+        fin = None if control.limite_segundos is None else time.time() + control.limite_segundos
+        por_tarea = None if control.limite_evaluaciones is None else -(-control.limite_evaluaciones // len(tareas))
+        with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso, initargs=(self,)) as grupo:
+            futuros = [grupo.submit(_optimizar_en_proceso, a, inicio, metodo, fin, por_tarea) for a, inicio in tareas]
+            resultados = []
+            ejecutadas = []
+            for tarea, futuro in zip(tareas, futuros):
+                if control.cancelacion.is_set():
+                    for pendiente in futuros:
+                        pendiente.cancel()
+                    if control.motivo is None:
+                        control.motivo = ResultadoOptimizacion.CANCELADA
+                if futuro.cancelled():
+                    continue
+                resultado, iteraciones, perfil, progreso, motivo = futuro.result()
+                resultados.append(resultado)
+                ejecutadas.append(tarea)
+                self.iteracion += iteraciones
+                self.perfilador.combinar(perfil)
+                control.evaluaciones += iteraciones
+                if control.motivo is None:
+                    control.motivo = motivo
+                progreso.iteracion = self.iteracion
+                progreso.segundos = control.segundos()
+                control.notificar(progreso)
+        return resultados, ejecutadas
+
+    def optimizar_en_pasos(self, cada_iteraciones=1, **opciones):
+        """
+        Optimiza como un generador: produce un Progreso cada cada_iteraciones evaluaciones y al terminar devuelve
+        el ResultadoOptimizacion (el valor de StopIteration, o construccion.ultimo_resultado). La optimización
+        corre en un hilo de trabajo que espera si el consumidor se atrasa; si se deja de iterar, o se cierra el
+        generador, la optimización se cancela.
+            for progreso in puente.optimizar_en_pasos(limite_segundos=10):
+                print(progreso.iteracion, progreso.peso)
+        :param cada_iteraciones:
+        :param opciones: argumentos de optimizar; por defecto sin gráficos ni mensajes
+        :return resultado:
+        """
+        opciones.setdefault("grafico_interactivo", False)
+        opciones.setdefault("verboso", False)
+        cancelacion = opciones.pop("cancelacion", None) or threading.Event()
+        # Acotada para que el optimizador no se adelante demasiado a quien consume los registros
+        cola = queue.Queue(maxsize=64)
+        salida = {}
+
+        def trabajo():
+            try:
+                salida["resultado"] = self.optimizar(al_progresar=cola.put, cada_iteraciones=cada_iteraciones,
+                                                     cancelacion=cancelacion, **opciones)
+            except BaseException as error:
+                salida["error"] = error
+            finally:
+                cola.put(None)
+
+        hilo = threading.Thread(target=trabajo, daemon=True)
+        hilo.start()
+        terminado = False
+        try:
+            while True:
+                progreso = cola.get()
+                if progreso is None:
+                    terminado = True
+                    break
+                yield progreso
+        finally:
+            if not terminado:
+                cancelacion.set()
+                # Vaciar la cola para que el hilo no quede bloqueado en put
+                while hilo.is_alive():
+                    try:
+                        cola.get(timeout=0.05)
+                    except queue.Empty:
+                        pass
+            hilo.join()
+        if "error" in salida:
+            raise salida["error"]
+        return salida["resultado"]
+
+    def cancelar(self):
+        """Pide detener la optimización en curso en la siguiente evaluación; se puede llamar desde otro hilo"""
+        control = self.control
+        if control is not None:
+            control.cancelar()
+
+    def informar(self, *textos):
+        if self.verboso:
+            print(*textos)
+
+    def optimizar_caso(self, caso: int, suposicion_inicial, metodo="powell", activo=True):
+        """
+        Busca la geometría de peso mínimo para un solo caso de carga. Si la optimización se detiene a la mitad,
+        el resultado es la mejor evaluación hasta ese momento.
+        :param caso: índice en lista_cargas
+        :param suposicion_inicial:
+        :param metodo:
+        :param activo: si es falso solo evalúa la suposición inicial
+        :return resultado: posiciones variables óptimas
+        """
+        from scipy.optimize import fmin_powell, minimize
+        self.cargas_actuales = caso
+        control = self.control
+        if control is not None:
+            control.nueva_tarea(suposicion_inicial)
+        self.informar("\n\nCalculando construcción para carga: ", self.cargas_actuales)
+        # Crear óptimo para la carga actual
+        with self.perfilador.fase("optimizar_caso"):
+            try:
+                if activo and metodo.lower() == "powell":
+                    resultado = fmin_powell(self.establecer_y_calcular, suposicion_inicial, xtol=0.01, ftol=0.005,
+                                            disp=self.verboso)
+                elif activo and (self.cargas_moviles is not None or metodo.lower() in METODOS_SIN_GRADIENTE):
+                    # Sin jac: los métodos sin gradiente no lo usan, y con la envolvente de las cargas móviles el
+                    # gradiente analítico, que es el de un solo caso, no sirve y scipy lo aproxima por diferencias
+                    resultado = minimize(self.establecer_y_calcular, suposicion_inicial, method=metodo).x
+                elif activo:
+                    resultado = minimize(self.establecer_y_calcular_gradiente, suposicion_inicial,
+                                         method=metodo, jac=True).x
+                else:
+                    resultado = suposicion_inicial
+                    self.establecer_y_calcular(resultado)
+            except OptimizacionDetenida:
+                resultado = control.mejor_valores
+        self.graficar_construccion()
+        return resultado
+
+    def establecer_posiciones(self, nuevos_valores):
+        """
+        Establece las posiciones variables de los nodos y reconstruye todas las vigas
+        :param nuevos_valores:
+        :return:
+        """
+        self.modelo.establecer_libres(nuevos_valores)
+        self.establecer_vigas()
 
     def establecer_y_calcular(self, nuevos_valores):
         """
         Establece las posiciones variables, reconstruye todas las vigas y calcula el peso de la construcción
         :return:
         """
+        control = self.control
+        if control is not None:
+            control.revisar()
         self.iteracion += 1
-        t = 0
-        for x in range(0, len(self.nodos)):
-            if not np.any(self.nodos[x].optimizar):
-                continue
-            for val in range(0, len(self.nodos[x].optimizar)):
-                if self.nodos[x].optimizar[val] != 0:
-                    self.nodos[x].pos[val] = nuevos_valores[t]
-                    t += 1
-        self.establecer_vigas()
-        self.obtener_peso()
+        with self.perfilador.fase("evaluacion"):
+            self.establecer_posiciones(nuevos_valores)
+            self.obtener_peso()
+        self.perfilador.registrar_evaluacion(self.iteracion, self.cargas_actuales, self.peso)
+        if self.historial is not None:
+            self.historial.registrar(self)
         if self.grafico_interactivo:
             try:
                 self.graficar_construccion()
             except:
                 print("\nAdvertencia: la gráfica falló \n")
+        if control is not None:
+            control.registrar(self, nuevos_valores)
         return self.peso
 
-    def obtener_peso(self):
-        peso_mas_ligero = np.inf
-        mejor_material = {}
-        for material in self.materiales:
-            self.establecer_material(self.materiales[material])
-            self.calcular_peso()
-            if self.peso < peso_mas_ligero:
-                mejor_material = material
-                peso_mas_ligero = self.peso
+    def evaluar_lote(self, valores, caso=None):
+        """
+        Evalúa el peso de una población de geometrías a la vez, para optimizadores basados en poblaciones o
+        barridos en rejilla. No modifica los nodos ni el estado de la construcción.
+        :param valores: (candidatos x posiciones variables)
+        :param caso: índice del caso de carga, None para el actual
+        :return pesos, materiales: peso con el material más ligero y el índice de ese material en
+            nombres_materiales para cada candidato; -1 si hay un material por viga
+        """
+        valores = np.atleast_2d(np.asarray(valores, dtype=float))
+        candidatos = self.catalogo.no_dominados
+        modulo_E, densidad, resistencia_fluencia = self.catalogo.propiedades(candidatos)
+        # Bloques de unos 64 MB de matrices apiladas; con el sistema disperso solo se apilan sus valores COO
+        filas = self.sistema.numero_filas
+        entradas = len(self.sistema.valores) if self.sistema.disperso else filas * filas
+        bloque = max(1, 2 ** 23 // entradas)
+        pesos = np.empty(len(valores))
+        materiales = np.empty(len(valores), dtype=int)
+        self.perfilador.contar("evaluaciones_lote", len(valores))
+        for inicio in range(0, len(valores), bloque):
+            with self.perfilador.fase("solucion_lote"):
+                fuerzas, longitudes = self.modelo.fuerzas_lote(valores[inicio:inicio + bloque], caso)
+            with self.perfilador.fase("materiales_lote"):
+                if self.materiales_vigas is not None or self.material_por_viga:
+                    indices = self.materiales_vigas if self.materiales_vigas is not None else \
+                        self.catalogo.material_por_viga(fuerzas)
+                    E, rho, fy = self.catalogo.propiedades(indices)
+                    areas = calcular_areas(fuerzas, longitudes, E, fy)
+                    pesos[inicio:inicio + bloque] = np.sum(areas * longitudes * rho, axis=1)
+                    materiales[inicio:inicio + bloque] = -1
+                    continue
+                pesos_bloque = pesos_materiales(fuerzas, longitudes, modulo_E, densidad, resistencia_fluencia)
+                materiales[inicio:inicio + bloque] = candidatos[np.argmin(pesos_bloque, axis=1)]
+                pesos[inicio:inicio + bloque] = np.min(pesos_bloque, axis=1)
+        return pesos, materiales
 
+    def establecer_y_calcular_gradiente(self, nuevos_valores):
+        """
+        Igual que establecer_y_calcular pero también devuelve el gradiente del peso respecto a las posiciones
+        variables, para los optimizadores basados en gradiente
+        :param nuevos_valores:
+        :return peso, gradiente:
+        """
+        peso = self.establecer_y_calcular(nuevos_valores)
+        with self.perfilador.fase("gradiente"):
+            gradiente = self.calcular_gradiente()
+        return peso, gradiente
+
+    def calcular_gradiente(self):
+        """
+        Gradiente analítico (adjunto) del peso de la construcción respecto a las posiciones variables, para el
+        caso de carga actual y el material elegido en la última evaluación. Cubre tanto las vigas a tensión como
+        las vigas a compresión que se dimensionan por pandeo.
+        :return gradiente:
+        """
+        modelo = self.modelo
+        if not np.all(np.abs(self.X) < 1e20):
+            # El sistema es singular y no hay una dirección de descenso útil
+            return np.zeros(np.count_nonzero(modelo.libres))
+        if modelo.factorizacion is None:
+            # La solución vino de la caché o de otro proceso
+            self.perfilador.contar("refactorizaciones_gradiente")
+            modelo.factorizacion = modelo.sistema.factorizar()
+        derivada_fuerzas, derivada_longitudes = derivadas_pesos(modelo.fuerzas, modelo.longitudes, modelo.modulo_E,
+                                                                modelo.densidad, modelo.resistencia_fluencia)
+        gradiente = modelo.gradiente(self.X, derivada_fuerzas, derivada_longitudes)
+        return gradiente[modelo.libres]
+
+    def obtener_peso(self):
+        """
+        Resuelve la construcción una sola vez y dimensiona todas las vigas para todos los materiales a la vez,
+        las fuerzas internas no dependen del material. Se queda con el material más ligero. Con cargas móviles
+        dimensiona para la envolvente del caso actual con el tren en todas sus posiciones.
+        :return mejor_material:
+        """
+        if self.cargas_moviles is not None:
+            X, B, casos = self.calcular_fuerzas_moviles([self.cargas_actuales])
+            with self.perfilador.fase("envolvente"):
+                self.dimensionar_envolvente(X, B, casos)
+            return self.material
+        self.calcular_fuerzas()
+        fuerzas = self.X[:self.modelo.numero_vigas]
+        with self.perfilador.fase("materiales"):
+            return self.elegir_material(fuerzas, self.modelo.longitudes)
+
+    def elegir_material(self, fuerzas, longitudes):
+        """
+        Dimensiona las vigas con cada material no dominado del catálogo y deja el más ligero en el modelo
+        :return mejor_material:
+        """
+        if self.secciones is not None:
+            self.modelo.fuerzas[:] = fuerzas
+            self.modelo.fuerza_interna[:] = np.abs(fuerzas)
+            self.peso = np.sum(self.dimensionar_secciones(np.maximum(fuerzas, 0), np.maximum(-fuerzas, 0),
+                                                          longitudes))
+            return self.material
+        if self.materiales_vigas is not None or self.material_por_viga:
+            return self.dimensionar_por_viga(fuerzas, longitudes)
+        # Una fila por material candidato, una columna por viga
+        candidatos = self.catalogo.no_dominados
+        modulo_E, densidad, resistencia_fluencia = self.catalogo.propiedades(candidatos[:, None])
+        guardada = self.cache.entradas.get(self.llave_cache) if self.llave_cache is not None else None
+        if guardada is not None and "pesos_materiales" in guardada:
+            # Los pesos por material ya se calcularon para esta geometría, solo falta el material elegido
+            pesos_totales = guardada["pesos_materiales"]
+            mejor = int(np.argmin(pesos_totales))
+            areas = calcular_areas(fuerzas, longitudes, modulo_E[mejor], resistencia_fluencia[mejor])
+            pesos = areas * longitudes * densidad[mejor]
+        else:
+            areas = calcular_areas(fuerzas, longitudes, modulo_E, resistencia_fluencia)
+            pesos = areas * longitudes * densidad
+            pesos_totales = np.sum(pesos, axis=1)
+            mejor = int(np.argmin(pesos_totales))
+            areas = areas[mejor]
+            pesos = pesos[mejor]
+            if self.llave_cache is not None:
+                self.cache.actualizar(self.llave_cache, "pesos_materiales", pesos_totales)
+
+        mejor_material = self.nombres_materiales[candidatos[mejor]]
         self.establecer_material(self.materiales[mejor_material])
         self.material = str(mejor_material)
-        self.calcular_peso()
+        self.modelo.fuerzas[:] = fuerzas
+        self.modelo.fuerza_interna[:] = np.abs(fuerzas)
+        self.modelo.areas[:] = areas
+        self.modelo.pesos[:] = pesos
+        self.peso = pesos_totales[mejor]
+        return mejor_material
+
+    def dimensionar_secciones(self, tension, compresion, longitudes):
+        """
+        Toma para cada viga la sección más ligera de la tabla que resiste su tensión y su compresión máximas y
+        deja en el modelo su material y su área
+        :param tension: tensión máxima de cada viga
+        :param compresion: compresión máxima de cada viga, en valor absoluto
+        :param longitudes:
+        :return pesos: peso de cada viga, infinito si ninguna sección de la tabla alcanza
+        """
+        secciones = self.secciones
+        indices = secciones.seleccionar(tension, compresion, longitudes, self.factor_longitud)
+        self.secciones_vigas = indices
+        validas = indices >= 0
+        self.establecer_materiales_vigas(np.where(validas, secciones.materiales[indices], secciones.materiales[0]))
+        modelo = self.modelo
+        # Las vigas sin sección se dibujan con la mayor de la tabla pero su peso no es finito
+        modelo.areas[:] = np.where(validas, secciones.areas[indices], np.max(secciones.areas))
+        modelo.pesos[:] = np.where(validas, modelo.areas * longitudes * modelo.densidad, np.inf)
+        return modelo.pesos
+
+    def asignar_secciones(self, secciones=None, factor_longitud=0.5):
+        """
+        Dimensiona con una tabla de secciones comerciales en vez de áreas continuas: cada viga toma la sección
+        (material y perfil) más ligera que resiste la fluencia y el pandeo. None vuelve al área continua.
+        :param secciones: secciones.CatalogoSecciones
+        :param factor_longitud: K de la longitud efectiva de pandeo; 0.5 equivale a la fórmula de calcular_areas
+        :return:
+        """
+        self.secciones = secciones
+        self.factor_longitud = factor_longitud
+        self.secciones_vigas = None
+        if self.cache is not None:
+            self.cache.limpiar()
+
+    def dimensionar_por_viga(self, fuerzas, longitudes):
+        """
+        Dimensiona cada viga con su propio material: el asignado con asignar_materiales o, si no hay uno,
+        el de mejor figura de mérito para su signo de fuerza
+        :return material: descripción de los materiales usados
+        """
+        indices = self.materiales_vigas if self.materiales_vigas is not None else \
+            self.catalogo.material_por_viga(fuerzas)
+        self.establecer_materiales_vigas(indices)
+        modelo = self.modelo
+        modelo.fuerzas[:] = fuerzas
+        modelo.fuerza_interna[:] = np.abs(fuerzas)
+        modelo.areas[:] = calcular_areas(fuerzas, longitudes, modelo.modulo_E, modelo.resistencia_fluencia)
+        modelo.pesos[:] = modelo.areas * longitudes * modelo.densidad
+        self.peso = np.sum(modelo.pesos)
+        return self.material
 
     def obtener_vigas_maximas(self):
-        pass
+        """
+        Dimensiona la construcción actual para la envolvente de todas las cargas: cada viga recibe el área
+        del caso de carga más desfavorable y se elige el material más ligero para el conjunto. Con cargas
+        móviles cada caso se combina con el tren en todas sus posiciones. El caso actual pasa a ser el que da
+        el mayor peso al conjunto.
+        :return peso:
+        """
+        if self.cargas_moviles is not None:
+            X, B, casos = self.calcular_fuerzas_moviles(np.arange(len(self.modelo.cargas)))
+            with self.perfilador.fase("envolvente"):
+                peso, gobierna = self.dimensionar_envolvente(X, B, casos)
+        else:
+            X = self.calcular_fuerzas_casos()
+            with self.perfilador.fase("envolvente"):
+                peso, gobierna = self.dimensionar_envolvente(X)
+        self.cargas_actuales = gobierna
+        return peso
 
-    def calcular_peso(self):
+    def dimensionar_envolvente(self, X, B=None, casos=None):
+        """
+        Dimensiona con las fuerzas de varias columnas de carga, ver obtener_vigas_maximas
+        :param X: (incógnitas x columnas)
+        :param B: lado derecho de cada columna, por defecto el de cada caso de carga (B_casos)
+        :param casos: caso de carga de cada columna, por defecto la columna es el caso
+        :return peso, gobierna: el caso de carga que da el mayor peso al conjunto; no cambia el caso actual
         """
-        Calcula el peso de cada viga y el peso total de la construcción usando álgebra lineal
+        B = self.B_casos if B is None else B
+        fuerzas = X[:self.modelo.numero_vigas]
+        longitudes = self.modelo.longitudes
+
+        # El área crece con la fuerza dentro de cada rama, así que basta la tensión y la compresión máximas
+        tension_maxima = np.max(np.maximum(fuerzas, 0), axis=1)
+        compresion_maxima = np.max(np.maximum(-fuerzas, 0), axis=1)
+        candidatos = self.catalogo.no_dominados
+        modulo_E, densidad, resistencia_fluencia = self.catalogo.propiedades(candidatos[:, None])
+        areas = np.maximum(calcular_areas(tension_maxima, longitudes, modulo_E, resistencia_fluencia),
+                           calcular_areas(-compresion_maxima, longitudes, modulo_E, resistencia_fluencia))
+        pesos = areas * longitudes * densidad
+
+        if self.secciones is not None:
+            pesos = self.dimensionar_secciones(tension_maxima, compresion_maxima, longitudes)
+            areas = self.modelo.areas.copy()
+            peso = np.sum(pesos)
+        elif self.materiales_vigas is not None or self.material_por_viga:
+            if self.materiales_vigas is not None:
+                indices = self.materiales_vigas
+            else:
+                # Cada viga toma el candidato más ligero para su propia envolvente
+                indices = candidatos[np.argmin(pesos, axis=0)]
+            self.establecer_materiales_vigas(indices)
+            areas = np.maximum(
+                calcular_areas(tension_maxima, longitudes, self.modelo.modulo_E, self.modelo.resistencia_fluencia),
+                calcular_areas(-compresion_maxima, longitudes, self.modelo.modulo_E, self.modelo.resistencia_fluencia))
+            pesos = areas * longitudes * self.modelo.densidad
+            peso = np.sum(pesos)
+        else:
+            pesos_totales = np.sum(pesos, axis=1)
+            mejor = int(np.argmin(pesos_totales))
+            mejor_material = self.nombres_materiales[candidatos[mejor]]
+            self.establecer_material(self.materiales[mejor_material])
+            self.material = str(mejor_material)
+            areas = areas[mejor]
+            pesos = pesos[mejor]
+            peso = pesos_totales[mejor]
+
+        # Caso de carga que gobierna cada viga y caso que da el mayor peso al conjunto
+        areas_casos = calcular_areas(fuerzas, longitudes[:, None], self.modelo.modulo_E[:, None],
+                                     self.modelo.resistencia_fluencia[:, None])
+        columnas = np.argmax(areas_casos, axis=1)
+        gobierna = int(np.argmax(np.sum(areas_casos * longitudes[:, None], axis=0)))
+        self.vigas_maximas = columnas if casos is None else np.asarray(casos)[columnas]
+        self.X = X[:, gobierna]
+        self.B = B[:, gobierna]
+        self.modelo.cargas_nodos[:] = self.B.reshape(np.shape(self.modelo.cargas_nodos))
+        indices = np.arange(self.modelo.numero_vigas)
+        self.modelo.fuerzas[:] = fuerzas[indices, columnas]
+        self.modelo.fuerza_interna[:] = np.abs(self.modelo.fuerzas)
+        self.modelo.areas[:] = areas
+        self.modelo.pesos[:] = pesos
+        self.peso = peso
+        return self.peso, gobierna if casos is None else int(casos[gobierna])
+
+    def establecer_sistema(self, disperso=None):
+        """
+        Prepara el sistema de equilibrio disperso para la topología y restricciones actuales
+        :param disperso: None elige la ruta densa o dispersa según el tamaño
         :return:
         """
-        self.matriz = []
-        for x in range(0, len(self.vigas)):
-            self.matriz.append(self.vigas[x].conexiones)
+        self.modelo.establecer_sistema(disperso)
+        self.sistema = self.modelo.sistema
+        if self.cache is not None:
+            self.cache.limpiar()
+        self.establecer_vigas()
 
-        self.matriz = np.array(self.matriz)
-        self.matriz = self.matriz.transpose()
+    def calcular_fuerzas(self):
+        """
+        Calcula las fuerzas internas de las vigas y las reacciones usando álgebra lineal
+        :return X:
+        """
+        with self.perfilador.fase("cargas"):
+            self.B = self.modelo.vector_cargas()
+            self.modelo.cargas_nodos[:] = self.B.reshape(np.shape(self.modelo.cargas_nodos))
+        guardada = self.buscar_en_cache(self.cargas_actuales)
+        if guardada is not None:
+            self.X = guardada["X"]
+            return self.X
+        with self.perfilador.fase("ensamblaje"):
+            self.matriz = self.sistema.matriz
+        try:
+            with self.perfilador.fase("solucion"):
+                self.X = self.modelo.resolver(self.B)
+        except np.linalg.LinAlgError:
+            self.perfilador.contar("sistemas_singulares")
+            print("\nAdvertencia: Error de álgebra lineal\n")
+            self.X = np.full(len(self.B), 1e20)
+        if self.llave_cache is not None:
+            self.cache.guardar(self.llave_cache, {"X": self.X})
+        return self.X
 
-        tamaño = np.shape(self.matriz)
-        faltante = tamaño[0] - tamaño[1]
-        for x in range(0, faltante):
-            ceros = np.array([np.zeros(tamaño[0])])
-            self.matriz = np.concatenate((self.matriz, ceros.T), axis=1)
+    def calcular_fuerzas_casos(self):
+        """
+        Calcula las fuerzas internas y reacciones de todos los casos de carga con una sola factorización
+        :return X: (incógnitas x casos)
+        """
+        with self.perfilador.fase("cargas"):
+            self.B_casos = self.modelo.vector_cargas(slice(None))
+        # El caso -1 representa la solución de todos los casos juntos
+        guardada = self.buscar_en_cache(-1)
+        if guardada is not None:
+            return guardada["X"]
+        with self.perfilador.fase("ensamblaje"):
+            self.matriz = self.sistema.matriz
+        try:
+            with self.perfilador.fase("solucion_casos"):
+                X = self.modelo.resolver(self.B_casos, slice(None))
+        except np.linalg.LinAlgError:
+            self.perfilador.contar("sistemas_singulares")
+            print("\nAdvertencia: Error de álgebra lineal\n")
+            X = np.full(np.shape(self.B_casos), 1e20)
+        if self.llave_cache is not None:
+            self.cache.guardar(self.llave_cache, {"X": X})
+        return X
 
-        t = tamaño[1]
-        for x in range(0, len(self.nodos)):
-            if self.nodos[x].restriccion_x != 0:
-                self.matriz[2 * x][t] = self.nodos[x].restriccion_x
-                t += 1
-            if self.nodos[x].restriccion_y != 0:
-                self.matriz[2 * x + 1][t] = self.nodos[x].restriccion_y
-                t += 1
-
-        self.B = np.zeros(np.shape(self.matriz)[0])
-        for x in range(0, len(self.nodos)):
-            self.nodos[x].carga = np.array([0, 0])
+    def calcular_fuerzas_moviles(self, casos):
+        """
+        Fuerzas de los casos dados con los trenes de cargas en cada posición, por superposición de las líneas de
+        influencia: los casos y las cargas unitarias del tablero se resuelven con una sola factorización
+        :param casos: índices en lista_cargas
+        :return X, B, casos_columnas: (incógnitas x columnas) con una columna por caso y posición, empezando por
+            el caso sin tren, el lado derecho de cada columna y el caso de cada columna
+        """
+        moviles = self.cargas_moviles
+        modelo = self.modelo
+        casos = np.asarray(casos, dtype=int)
+        # Todos los casos juntos comparten la llave -1 de calcular_fuerzas_casos
+        guardada = self.buscar_en_cache(int(casos[0]) if len(casos) == 1 else -1)
+        if guardada is not None:
+            B_casos, X_casos, X_unitarias = guardada["B"], guardada["X"], guardada["X_unitarias"]
+        else:
+            with self.perfilador.fase("ensamblaje"):
+                self.matriz = self.sistema.matriz
+            try:
+                with self.perfilador.fase("solucion_moviles"):
+                    B_casos, X_casos, X_unitarias = modelo.resolver_unitarias(casos)
+            except np.linalg.LinAlgError:
+                self.perfilador.contar("sistemas_singulares")
+                print("\nAdvertencia: Error de álgebra lineal\n")
+                B_casos = modelo.vector_cargas(casos)
+                X_casos = np.full(np.shape(B_casos), 1e20)
+                X_unitarias = np.full(np.shape(moviles.cargas_unitarias), 1e20)
+            if self.llave_cache is not None:
+                self.cache.guardar(self.llave_cache, {"B": B_casos, "X": X_casos, "X_unitarias": X_unitarias})
+        with self.perfilador.fase("superposicion"):
+            Q = moviles.matriz_posiciones(modelo.coordenadas)[0]
+            X = moviles.superponer(X_casos, X_unitarias, Q)
+            B = moviles.superponer(B_casos, moviles.cargas_unitarias, Q)
+        return X, B, np.repeat(casos, Q.shape[1])
+
+    def activar_cache(self, tolerancia=1e-9, max_entradas=4096, max_bytes=None):
+        """
+        Guarda las soluciones (fuerzas y pesos por material) de cada geometría y caso de carga en una caché LRU,
+        así las evaluaciones repetidas del optimizador no vuelven a resolver el sistema
+        :param tolerancia: las posiciones variables se redondean a esta tolerancia para formar la llave
+        :param max_entradas:
+        :param max_bytes:
+        :return cache:
+        """
+        self.cache = CacheSoluciones(tolerancia, max_entradas, max_bytes)
+        return self.cache
 
-        for x in range(0, len(self.vigas)):
-            self.nodos[self.vigas[x].nodo_a].carga = \
-                self.nodos[self.vigas[x].nodo_a].carga + self.vigas[x].carga_nodos
-            self.nodos[self.vigas[x].nodo_b].carga = \
-                self.nodos[self.vigas[x].nodo_b].carga + self.vigas[x].carga_nodos
+    def activar_incremental(self, periodo=50, max_vigas=32, max_nodos=256, tolerancia=1e-8):
+        """
+        Resuelve cada evaluación con actualizaciones de Sherman–Morrison–Woodbury de las vigas que cambiaron
+        desde la última factorización completa, ver resolvedor.ActualizacionIncremental. Conviene en armaduras
+        grandes con Powell, que mueve una coordenada por paso.
+        :param periodo: evaluaciones entre factorizaciones completas
+        :param max_vigas: vigas cambiadas a partir de las cuales se refactoriza
+        :param max_nodos: nodos con columnas de la inversa guardadas a partir de los cuales se refactoriza
+        :param tolerancia: residuo relativo máximo aceptado
+        :return incremental:
+        """
+        return self.modelo.activar_incremental(periodo, max_vigas, max_nodos, tolerancia)
 
-        for x in range(0, len(self.nodos)):
-            self.B[2 * x] = self.nodos[x].carga[0]
-            self.B[2 * x + 1] = self.nodos[x].carga[1]
+    def activar_arranques(self, ruta: str, max_entradas=64, distancia_maxima=None):
+        """
+        Usa un almacén en disco de geometrías optimizadas: optimizar arranca desde la solución guardada con
+        la misma topología y las cargas más parecidas, y al terminar guarda la suya
+        :param ruta: directorio del almacén
+        :param max_entradas: soluciones guardadas por topología
+        :param distancia_maxima: diferencia relativa de cargas máxima para usar una solución guardada
+        :return almacen:
+        """
+        self.arranques = AlmacenArranques(ruta, max_entradas, distancia_maxima)
+        return self.arranques
 
-        self.peso = 0
-        try:
-            self.X = np.dot(np.linalg.inv(self.matriz), self.B)
-        except np.linalg.LinAlgError:
-            print("\nAdvertencia: Error de álgebra lineal\n")
-            self.X = np.full(tamaño[0], 1e20)
+    def activar_historial(self, ruta: str, registros_bloque=65536, tipo_resultados="float32"):
+        """
+        Registra en disco cada evaluación de la función objetivo en este proceso (posiciones variables, caso de
+        carga, peso, material, fuerzas y áreas) para reproducir la optimización después, ver historial.py. Si ya
+        hay un historial de la misma armadura en ruta se sigue agregando a él.
+        :param ruta: directorio del historial
+        :param registros_bloque: registros por archivo
+        :param tipo_resultados: tipo de numpy de las fuerzas y las áreas
+        :return historial:
+        """
+        self.historial = HistorialOptimizacion(ruta, self.modelo, registros_bloque, tipo_resultados)
+        return self.historial
 
-        for x in range(0, len(self.vigas)):
-            self.vigas[x].calcular_peso_viga(self.X[x])
-            self.peso += self.vigas[x].peso
+    def desactivar_historial(self):
+        if self.historial is not None:
+            self.historial.cerrar()
+        self.historial = None
+
+    def activar_cargas_moviles(self, nodos_tablero: List, trenes: List, paso=None, direccion=None,
+                               ambos_sentidos=True):
+        """
+        Agrega a cada caso de carga trenes de cargas que cruzan el tablero. Cada evaluación dimensiona para la
+        envolvente del caso con los trenes en todas sus posiciones, a partir de las líneas de influencia de los
+        nodos del tablero, que se resuelven con la misma factorización que el caso.
+        :param nodos_tablero: nombres o índices de los nodos del tablero en orden a lo largo del recorrido
+        :param trenes: lista de TrenCargas
+        :param paso: distancia entre posiciones del tren, None para las posiciones exactas, ver LineasInfluencia
+        :param direccion: dirección de las cargas de los ejes, por defecto hacia abajo en el último eje
+        :param ambos_sentidos:
+        :return lineas: LineasInfluencia
+        """
+        modelo = self.modelo
+        indices = [modelo.nombres_nodos.index(nodo) if isinstance(nodo, str) else int(nodo) for nodo in nodos_tablero]
+        self.cargas_moviles = LineasInfluencia(indices, trenes, modelo.numero_nodos, modelo.dimension, paso,
+                                               direccion, ambos_sentidos)
+        modelo.cargas_unitarias = self.cargas_moviles.cargas_unitarias
+        # La referencia de la actualización incremental y la caché no tienen las columnas de las cargas unitarias
+        self.establecer_sistema(self.sistema.disperso)
+        return self.cargas_moviles
+
+    def desactivar_cargas_moviles(self):
+        self.cargas_moviles = None
+        self.modelo.cargas_unitarias = None
+        self.establecer_sistema(self.sistema.disperso)
+
+    def lineas_influencia(self):
+        """
+        Líneas de influencia de la geometría actual: fuerza de cada viga por una carga unitaria, en la dirección
+        de los ejes, en cada nodo del tablero
+        :return abscisas, influencia: distancia de cada nodo del tablero al primero, (vigas x nodos del tablero)
+        """
+        moviles = self.cargas_moviles
+        X_unitarias = self.modelo.resolver_unitarias(np.array([self.cargas_actuales]))[2]
+        return moviles.abscisas(self.modelo.coordenadas), X_unitarias[:self.modelo.numero_vigas]
 
+    def activar_perfilador(self, max_eventos=200000):
+        """
+        Empieza a registrar tiempos por fase, evaluaciones por caso y la convergencia; los datos quedan en
+        self.perfilador (resumen, a_json, a_chrome)
+        :param max_eventos: intervalos guardados como máximo para la traza de Chrome
+        :return perfilador:
+        """
+        self.perfilador = Perfilador(max_eventos)
+        return self.perfilador
+
+    def registrar_estadisticas(self):
+        """Copia al perfilador las estadísticas de la caché y el tamaño del sistema que se resolvió"""
+        if self.cache is not None:
+            self.perfilador.agregar_estadisticas("cache", self.cache.estadisticas())
+        if self.modelo.incremental is not None:
+            self.perfilador.agregar_estadisticas("incremental", self.modelo.incremental.estadisticas())
+        self.perfilador.agregar_estadisticas("resolvedor", {
+            "disperso": bool(self.sistema.disperso),
+            "incognitas": self.sistema.numero_filas,
+            "vigas": self.modelo.numero_vigas,
+            "nodos": self.modelo.numero_nodos,
+            "casos": len(self.modelo.cargas),
+            "iteraciones": self.iteracion,
+        })
+
+    def buscar_en_cache(self, caso: int):
+        """
+        Busca la solución de la geometría actual para el caso dado. Si no está, deja preparada la llave para
+        guardarla después de resolver.
+        :param caso:
+        :return entrada: diccionario con "X" o None
+        """
+        if self.cache is None:
+            self.llave_cache = None
+            return None
+        self.llave_cache = self.cache.llave(self.modelo.valores_libres(), caso)
+        guardada = self.cache.obtener(self.llave_cache)
+        if guardada is not None:
+            # La factorización guardada en el modelo es de otra geometría
+            self.modelo.factorizacion = None
+        return guardada
+
+    def calcular_peso(self):
+        """
+        Calcula el peso de cada viga y el peso total de la construcción con el material actual
+        :return:
+        """
+        self.calcular_fuerzas()
+        modelo = self.modelo
+        modelo.fuerzas[:] = self.X[:modelo.numero_vigas]
+        modelo.fuerza_interna[:] = np.abs(modelo.fuerzas)
+        modelo.areas[:] = calcular_areas(modelo.fuerzas, modelo.longitudes, modelo.modulo_E,
+                                         modelo.resistencia_fluencia)
+        modelo.pesos[:] = modelo.areas * modelo.longitudes * modelo.densidad
+        self.peso = np.sum(modelo.pesos)
         return self.peso
 
     def establecer_material(self, material_actual: dict):
         """Establece el material seleccionado actualmente"""
-        for viga in self.vigas:
-            viga.resistencia_fluencia = material_actual["resistencia_fluencia"]
-            viga.modulo_E = material_actual["modulo_E"]
-            viga.densidad = material_actual["densidad"]
-
-    def obtener_materiales(self):
-        """Obtiene todos los materiales disponibles del diccionario materials.json"""
-        with open("materials.json", "r") as archivo_lectura:
-            self.materiales = json.load(archivo_lectura)
-        archivo_lectura.close()
-        self.establecer_material(self.materiales[list(self.materiales.keys())[0]])
+        self.modelo.resistencia_fluencia[:] = material_actual["resistencia_fluencia"]
+        self.modelo.modulo_E[:] = material_actual["modulo_E"]
+        self.modelo.densidad[:] = material_actual["densidad"]
+
+    def establecer_materiales_vigas(self, indices):
+        """
+        Establece un material por viga
+        :param indices: índice en el catálogo del material de cada viga
+        :return:
+        """
+        indices = np.asarray(indices, dtype=int)
+        modelo = self.modelo
+        modelo.modulo_E[:], modelo.densidad[:], modelo.resistencia_fluencia[:] = self.catalogo.propiedades(indices)
+        usados = np.unique(indices)
+        if len(usados) == 1:
+            self.material = self.nombres_materiales[usados[0]]
+        else:
+            self.material = "Mixto: " + ", ".join(self.nombres_materiales[x] for x in usados)
+
+    def asignar_materiales(self, materiales=None, por_viga=False):
+        """
+        Cambia cómo se elige el material. Por defecto toda la construcción usa el material más ligero.
+        :param materiales: nombre del material de cada viga, fijo durante la optimización
+        :param por_viga: si no se dan materiales, cada viga toma su material más ligero por separado
+        :return:
+        """
+        if materiales is not None:
+            self.materiales_vigas = np.array([self.catalogo.indice(nombre) for nombre in materiales], dtype=int)
+        else:
+            self.materiales_vigas = None
+        self.material_por_viga = por_viga
+        if self.cache is not None:
+            self.cache.limpiar()
+
+    def obtener_materiales(self, ruta=None):
+        """
+        Obtiene todos los materiales disponibles del catálogo; materials.json se lee una sola vez por proceso
+        :param ruta: otro archivo de materiales, por defecto el materials.json junto a este módulo
+        :return:
+        """
+        self.catalogo = CatalogoMateriales.desde_archivo(ruta)
+        self.materiales = self.catalogo.materiales
+        self.nombres_materiales = self.catalogo.nombres
+        self.tabla_materiales = self.catalogo.tabla()
+        if self.cache is not None:
+            self.cache.limpiar()
+        self.establecer_material(self.materiales[self.nombres_materiales[0]])
 
     def __str__(self):
         """Método sobrescrito para imprimir sus datos en un cierto formato al usar print() o str()"""
         texto: str = "\n  "
-        texto += "\nA =\n" + str(self.matriz)
+        matriz = self.sistema.matriz
+        if hasattr(matriz, "toarray"):
+            # Una armadura grande no cabe como matriz densa, ni tiene sentido imprimirla
+            texto += "\nA = matriz dispersa {0}x{1} con {2} entradas".format(matriz.shape[0], matriz.shape[1],
+                                                                             matriz.nnz)
+        else:
+            texto += "\nA =\n" + str(matriz)
         texto += "\n\nB = \n" + str(self.B)
         texto += "\n\nX = \n" + str(self.X)
         texto += "\n\n\t  "
@@ -347,100 +1257,67 @@ class Construccion(object):
 
     
 
-    def graficar_construccion(self, terminado=False):
-        desplazamiento: Vector = (500, 300)
-
-        def inv(pos: Vector):
-            pos: Vector = pos * np.array([1, -1])  # invierte el eje y para gráficos
-            pos: Vector = pos * 170 + desplazamiento
-            return pos
-        
-        # Dibujar el fondo en la ventana
-        self.ventana.pantalla.blit(fondo, (0, 0))
-
-       
-
-
-        # Define los parámetros de la barra lateral y su color
-        ANCHO_BARRA_LATERAL = 330
-        COLOR_BARRA_LATERAL = (30, 30, 30)  # Un gris oscuro
-
-        # Dibujar la barra lateral
-        pygame.draw.rect(self.ventana.pantalla, COLOR_BARRA_LATERAL, (0, 0, ANCHO_BARRA_LATERAL, self.ventana.alto))
-
-        for viga in self.vigas:
-            self.ventana.dibujar_viga(viga.nombre,
-                                      inv(viga.pos1),
-                                      inv(viga.pos2),
-                                      viga.fuerza_interna,
-                                      tamaño=int((viga.area * 1e6) ** 0.7))
-
-        for nodo in self.nodos:
-            self.ventana.dibujar_nodo(nodo.nombre, inv(nodo.pos))
-            self.ventana.dibujar_fuerza(nodo.nombre, inv(nodo.pos), nodo.carga)
-            if nodo.restriccion_x != 0:
-                self.ventana.dibujar_restriccion_x(nodo.nombre + "x", inv(nodo.pos))
-            if nodo.restriccion_y != 0:
-                self.ventana.dibujar_restriccion_y(nodo.nombre + "y", inv(nodo.pos))
-            if np.any(nodo.optimizar):
-                self.ventana.dibujar_editable(inv(nodo.pos))
-
-
-        # Cargar el logo
-        logo = pygame.image.load('BSLOGO.png')
-        logo = pygame.transform.scale(logo, (150, 150))  # Ajusta el tamaño según tus necesidades
-
-        # Coordenadas para colocar el logo
-        x_logo = 80
-        y_logo = 50
-
-        # Dibujar el logo
-        self.ventana.pantalla.blit(logo, (x_logo, y_logo))
-
-        # Ajustar y_pos para que el texto comience después del logo
-        #y_pos = y_logo + logo.get_height() + 100
-
-         # Agregar información a la barra lateral
-        fuente = pygame.font.Font(None, 30)
-        informacion = [
-            "       STRUCTUBRIDGEX",
-            "---------------------------------------",
-            "Peso: {0:.3f} kg".format(round(self.peso, 3)),
-            "Material: ",
-             self.material,
-            "Iteración: " + str(self.iteracion),
-        ]
+    def adjuntar_ventana(self, ancho=1280, alto=720, fps_maximo=20, cada_iteraciones=None):
+        """
+        Crea la ventana de pygame y la registra como observador de la construcción.
+        Pygame solo se importa aquí, el cálculo no depende de él.
+        :param ancho:
+        :param alto:
+        :param fps_maximo: cuadros por segundo como máximo mientras se optimiza
+        :param cada_iteraciones: dibuja una vez cada tantas evaluaciones en vez de limitar por tiempo
+        :return visor:
+        """
+        import Graficas
+        visor = Graficas.VisorConstruccion("Structubridgex", ancho, alto, fps_maximo, cada_iteraciones)
+        self.ventana = visor.ventana
+        self.agregar_observador(visor)
+        return visor
+
+    def agregar_observador(self, observador):
+        """Registra un observador con un método actualizar(construccion, terminado)"""
+        self.observadores.append(observador)
 
-        y_pos = 220
-        for linea in informacion:
-            texto = fuente.render(linea, True, (255, 255, 255))  # Texto en color blanco
-            self.ventana.pantalla.blit(texto, (20, y_pos))
-            y_pos += 40  # Incrementa la posición para la siguiente línea       
-
-        titulo = "Software Simulador de Optimización para PuenteS"
-        descripcion = "Simulación y optimización estructural para minimizar el peso soportando diversas cargas."
-
-
-        self.ventana.agregar_texto((600, 10), titulo, clr=(0, 255, 0), tamaño=30)  # Título
-        self.ventana.agregar_texto((350, 30), descripcion, clr=(0, 255, 0), tamaño=30)  # Título
-         
-
-        # self.ventana.agregar_texto((50, 70), "Peso: {0:.3f} kg".format(round(self.peso, 3)))
-        # self.ventana.agregar_texto((50, 90), "Material: " + self.material)
-        # self.ventana.agregar_texto((50, 120), "Iteración: " + str(self.iteracion))
-        if terminado:
-            self.ventana.agregar_texto((350, 50), "SE ENCONTRÓ LA SOLUCIÓN ÓPTIMA: ")
-            self.ventana.agregar_texto((50, 520), "NODOS: ")
-            for x in range(0, len(self.nodos)):
-                b = 50 + (x // 5) * 150
-                h = (x % 5) * 30 + 550
-                self.ventana.agregar_texto((b, h), str(self.nodos[x]))
-                self.ventana.agregar_texto((400, 520), "VIGAS: ")
-            for x in range(0, len(self.vigas)):
-                b = 400 + (x // 5) * 300
-                h = (x % 5) * 30 + 550
-                self.ventana.agregar_texto((b, h), self.vigas[x].una_linea())
-        self.ventana.mostrar()
+    def graficar_construccion(self, terminado=False):
+        """Notifica el estado actual a todos los observadores; sin observadores no hace nada"""
+        if not self.observadores:
+            return
+        with self.perfilador.fase("graficos"):
+            for observador in self.observadores:
+                observador.actualizar(self, terminado)
+
+
+# Construcción de cada proceso del grupo, se copia una sola vez al iniciarlo
+_construccion_proceso = None
+
+
+def _iniciar_proceso(construccion: Construccion):
+    global _construccion_proceso
+    _construccion_proceso = construccion
+
+
+def _optimizar_en_proceso(caso: int, suposicion_inicial, metodo: str, fin=None, limite_evaluaciones=None):
+    """
+    Optimiza un caso de carga desde una suposición inicial en un proceso del grupo
+    :param fin: hora (time.time) a la que se acaba el tiempo de la optimización
+    :param limite_evaluaciones: evaluaciones máximas de esta tarea
+    :return resultado, iteraciones, perfilador, progreso, motivo:
+    """
+    construccion = _construccion_proceso
+    construccion.grafico_interactivo = False
+    if construccion.perfilador.activo:
+        # Un perfilador nuevo por tarea para que el proceso principal sume cada una una sola vez
+        construccion.activar_perfilador(construccion.perfilador.max_eventos)
+    control = ControlOptimizacion(None if fin is None else max(0.0, fin - time.time()), limite_evaluaciones)
+    construccion.control = control
+    iteracion_inicial = construccion.iteracion
+    try:
+        resultado = construccion.optimizar_caso(caso, suposicion_inicial, metodo)
+    finally:
+        construccion.control = None
+    construccion.establecer_posiciones(resultado)
+    progreso = control.progreso(construccion, resultado, control.mejor_peso)
+    return (resultado, construccion.iteracion - iteracion_inicial, construccion.perfilador, progreso,
+            control.motivo)
 
 
 if __name__ == "__main__":
@@ -538,7 +1415,11 @@ if __name__ == "__main__":
 
     # Crea una construcción con los nodos y vigas dados
     puente_1 = Construccion("Puente 1", o_nodos, o_vigas, o_cargas)
-
-    # El puente se calcula para obtener la relación peso/carga más óptima
-    puente_1.optimizar(activo=True, grafico_interactivo=True)
-    print(puente_1)
\ No newline at end of file
+    visor = puente_1.adjuntar_ventana()
+
+    # El puente se calcula para obtener la relación peso/carga más óptima; el cálculo corre en un hilo de
+    # trabajo y la ventana se dibuja desde este
+    visor.ejecutar(puente_1.optimizar, activo=True, grafico_interactivo=True)
+    print(puente_1)
+    while True:
+        visor.mantener()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos están en la raíz del repositorio, no en un paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import contextlib
+import io
+
+import numpy as np
+
+from structubridgex import Construccion, Nodo
+
+
+def puente_ejemplo(carga=1000.0):
+    """El puente de ejemplo de structubridgex en el formato de Construccion.desde_dict, con sus tres casos"""
+    posiciones = [(0.00001, 0.00001), (1.00001, 0.00001), (1.99999, 0.00001), (3.00001, 0.00001),
+                  (4.00001, 0.00001), (3.00002, 1.00002), (2.00001, 1.000001), (1.00003, 1.00003)]
+    optimizar = [[0, 0], [1, 0], [1, 0], [1, 0], [0, 0], [1, 1], [1, 1], [1, 1]]
+    nodos = [{"nombre": nombre, "pos": list(pos), "optimizar": opt}
+             for nombre, pos, opt in zip("ABCDEFGH", posiciones, optimizar)]
+    nodos[0].update(restriccion_x=-1, restriccion_y=-1)
+    nodos[4]["restriccion_y"] = -1
+    vigas = [["AB", 0, 1], ["AH", 0, 7], ["BC", 1, 2], ["BH", 1, 7], ["BG", 1, 6], ["CD", 2, 3], ["CG", 2, 6],
+             ["DE", 3, 4], ["DF", 3, 5], ["DG", 3, 6], ["EF", 4, 5], ["FG", 5, 6], ["GH", 6, 7]]
+    cargas = []
+    # Carga vertical en las vigas del tablero AB, BC, CD y DE
+    for factores in [(1, 1, 1, 1), (2, 1, 0.5, 1), (3, 1, 4, 1)]:
+        caso = [[0, 0] for viga in vigas]
+        for indice, factor in zip([0, 2, 5, 7], factores):
+            caso[indice][1] = -factor * carga
+        cargas.append(caso)
+    return {"nombre": "Puente 1", "nodos": nodos, "vigas": vigas, "cargas": cargas}
+
+
+def construir(diseno=None):
+    """Construccion de un diseño plano en el formato de puente_ejemplo, sin lo que imprime al crearse"""
+    diseno = diseno or puente_ejemplo()
+    nodos = []
+    for dato in diseno["nodos"]:
+        nodo = Nodo(dato["nombre"], dato["pos"], restriccion_x=dato.get("restriccion_x", 0),
+                    restriccion_y=dato.get("restriccion_y", 0))
+        nodo.optimizar = np.array(dato["optimizar"])
+        nodos.append(nodo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Construccion(diseno["nombre"], nodos, diseno["vigas"], diseno["cargas"])
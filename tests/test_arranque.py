@@ -0,0 +1,54 @@
+import contextlib
+import io
+
+import pytest
+
+from arranque import AlmacenArranques
+from disenos import construir
+
+
+def optimizar(construccion, **opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return construccion.optimizar(grafico_interactivo=False, verboso=False, **opciones)
+
+
+@pytest.fixture(scope="module")
+def optimo_base():
+    resultado = optimizar(construir())
+    return resultado.peso, resultado.iteraciones
+
+
+def test_arranque_guardado_llega_al_mismo_optimo(tmp_path, optimo_base):
+    peso_base, iteraciones_base = optimo_base
+    construccion = construir()
+    construccion.activar_arranques(str(tmp_path))
+    assert optimizar(construccion).peso == pytest.approx(peso_base, rel=1e-12)
+    construccion = construir()
+    construccion.activar_arranques(str(tmp_path))
+    resultado = optimizar(construccion)
+    assert resultado.peso == pytest.approx(peso_base, rel=5e-4)
+    assert resultado.iteraciones < iteraciones_base / 2
+
+
+def test_continuacion_llega_al_mismo_optimo(optimo_base):
+    resultado = optimizar(construir(), continuacion=True)
+    assert resultado.peso == pytest.approx(optimo_base[0], rel=1e-3)
+
+
+def test_continuacion_necesita_un_proceso():
+    with pytest.raises(ValueError):
+        optimizar(construir(), continuacion=True, procesos=2)
+
+
+def test_almacen_conserva_la_entrada_mas_ligera(tmp_path):
+    almacen = AlmacenArranques(str(tmp_path), max_entradas=1)
+    modelo = construir().modelo
+    valores = modelo.valores_libres()
+    assert almacen.guardar(modelo, valores, 2.0, casos=[valores, None, None])
+    assert not almacen.guardar(modelo, valores + 0.1, 3.0, casos=[None, valores + 0.1, None])
+    entrada, distancia = almacen.buscar(modelo)
+    assert distancia == 0.0
+    assert entrada["peso"] == 2.0
+    assert entrada["valores"] == valores.tolist()
+    # Los óptimos por caso que faltaban se toman de la solución descartada
+    assert entrada["casos"] == [valores.tolist(), (valores + 0.1).tolist(), None]
@@ -0,0 +1,33 @@
+import json
+import os
+
+import barrido
+
+
+def optimizar_o_morir(diseno, opciones):
+    """Sustituye a optimizar_diseno: el diseño "malo" mata a su proceso como lo haría el OOM killer"""
+    if diseno["id"] == "malo":
+        os._exit(1)
+    return {"id": diseno["id"], "peso": 1.0}
+
+
+def leer(ruta):
+    with open(ruta) as archivo:
+        return [json.loads(linea) for linea in archivo]
+
+
+def test_un_proceso_muerto_no_detiene_el_barrido(tmp_path, monkeypatch):
+    monkeypatch.setattr(barrido, "optimizar_diseno", optimizar_o_morir)
+    entrada = tmp_path / "disenos.jsonl"
+    ids = ["a", "b", "malo", "c", "d", "e", "f"]
+    entrada.write_text("".join(json.dumps({"id": id_diseno}) + "\n" for id_diseno in ids))
+    salida = str(tmp_path / "resultados.jsonl")
+
+    assert barrido.ejecutar_barrido(str(entrada), salida, procesos=2) == len(ids)
+    registros = {registro["id"]: registro for registro in leer(salida)}
+    assert sorted(registros) == sorted(ids)
+    assert "BrokenProcessPool" in registros["malo"]["error"]
+    assert all("error" not in registros[id_diseno] for id_diseno in ids if id_diseno != "malo")
+
+    # Solo el diseño que rompió el grupo queda para --reintentar-errores
+    assert barrido.ids_terminados(salida, reintentar_errores=True) == set(ids) - {"malo"}
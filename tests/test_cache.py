@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from cache import CacheSoluciones
+from disenos import construir
+
+
+def test_llave_cuantiza_las_posiciones():
+    cache = CacheSoluciones(tolerancia=1e-6)
+    assert cache.llave([1.0, 2.0], 0) == cache.llave([1.0 + 1e-8, 2.0 - 1e-8], 0)
+    assert cache.llave([1.0, 2.0], 0) != cache.llave([1.0, 2.0], 1)
+    assert cache.llave([1.0, 2.0], 0) != cache.llave([1.0 + 1e-5, 2.0], 0)
+
+
+def test_desaloja_la_usada_hace_mas_tiempo():
+    cache = CacheSoluciones(max_entradas=2)
+    for x in range(3):
+        cache.guardar(x, {"X": np.zeros(4)})
+    assert cache.obtener(0) is None
+    cache.obtener(1)
+    cache.guardar(3, {"X": np.zeros(4)})
+    # 1 se usó después de guardar 2, así que sale 2
+    assert list(cache.entradas) == [1, 3]
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["desalojos"]) == (1, 1, 2)
+
+
+def test_limite_de_bytes():
+    cache = CacheSoluciones(max_bytes=3 * 80)
+    for x in range(5):
+        cache.guardar(x, {"X": np.zeros(10)})
+    assert list(cache.entradas) == [2, 3, 4]
+    assert cache.bytes == 3 * 80
+
+
+def test_evaluaciones_repetidas_salen_de_la_cache():
+    sin_cache = construir()
+    construccion = construir()
+    cache = construccion.activar_cache()
+    base = construccion.modelo.valores_libres().copy()
+    generador = np.random.default_rng(5)
+    valores = base + generador.uniform(-0.2, 0.2, (10, len(base)))
+    for repeticion in range(2):
+        for caso in range(3):
+            construccion.cargas_actuales = caso
+            sin_cache.cargas_actuales = caso
+            for fila in valores:
+                assert construccion.establecer_y_calcular(fila) == pytest.approx(
+                    sin_cache.establecer_y_calcular(fila), rel=1e-12)
+                assert construccion.material == sin_cache.material
+    estadisticas = cache.estadisticas()
+    assert estadisticas["fallos"] == 30
+    assert estadisticas["aciertos"] == 30
@@ -0,0 +1,42 @@
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from confiabilidad import AnalisisConfiabilidad, MEMORIA_TANDA
+from disenos import construir
+
+
+def test_mismo_resultado_con_cualquier_bloque_y_procesos():
+    construccion = construir()
+    construccion.obtener_vigas_maximas()
+    analisis = AnalisisConfiabilidad.desde_construccion(construccion, por_viga=True, cov_cargas=0.3)
+    # Varias tandas, para que los bloques y los procesos las repartan de formas distintas
+    muestras = 5 * analisis.muestras_tanda() + 123
+    referencia = analisis.ejecutar(muestras, semilla=7)
+    assert 0 < referencia.fallas_sistema < muestras
+    for procesos in (1, 2):
+        for memoria_bloque in (1, 2 * MEMORIA_TANDA, 100 * MEMORIA_TANDA):
+            resultado = analisis.ejecutar(muestras, semilla=7, procesos=procesos, memoria_bloque=memoria_bloque)
+            assert resultado.fallas_sistema == referencia.fallas_sistema
+            np.testing.assert_array_equal(resultado.fallas_tension, referencia.fallas_tension)
+            np.testing.assert_array_equal(resultado.fallas_compresion, referencia.fallas_compresion)
+    assert analisis.ejecutar(muestras, semilla=8).fallas_sistema != referencia.fallas_sistema
+
+
+def test_beta_de_una_viga_lognormal():
+    # Una viga a tensión con carga y fluencia lognormales: ln(capacidad / fuerza) es normal y β es exacto
+    cov_carga, cov_fluencia, reserva = 0.2, 0.1, 1.5
+    fuerza, fy, area = 1e5, 250e6, 1.5 * 1e5 / 250e6
+    analisis = AnalisisConfiabilidad([[fuerza]], [0], [area], [1.0], 200e9, fy, distribucion_cargas="lognormal",
+                                     cov_cargas=cov_carga, distribucion_material="lognormal",
+                                     cov_fluencia=cov_fluencia, cov_modulo=0.0)
+    varianza_carga, varianza_fluencia = math.log1p(cov_carga ** 2), math.log1p(cov_fluencia ** 2)
+    beta = (math.log(reserva) + 0.5 * varianza_carga - 0.5 * varianza_fluencia) / \
+        math.sqrt(varianza_carga + varianza_fluencia)
+    exacta = statistics.NormalDist().cdf(-beta)
+    resultado = analisis.ejecutar(400000, semilla=3)
+    assert resultado.fallas_compresion[0] == 0
+    assert resultado.probabilidad_sistema == pytest.approx(exacta, abs=4 * resultado.error_estandar(exacta))
+    assert resultado.indice_confiabilidad(resultado.probabilidad_sistema) == pytest.approx(beta, abs=0.03)
@@ -0,0 +1,47 @@
+import contextlib
+import copy
+import io
+import json
+
+import numpy as np
+import pytest
+
+import armaduras
+from structubridgex import Construccion
+from test_gradiente import diferencias_centrales
+
+
+def construir(diseno):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Construccion.desde_dict(json.loads(json.dumps(diseno)))
+
+
+def test_gradiente_adjunto_3d_igual_a_diferencias_centrales():
+    # Solo la carga en todo el claro: con medio claro cargado hay vigas sin fuerza, donde el área por pandeo
+    # no es derivable
+    construccion = construir(armaduras.tricordal(6, 3, 1.0, casos=1))
+    assert construccion.modelo.dimension == 3
+    valores = construccion.modelo.valores_libres()
+    valores = valores + 0.05 * np.sin(np.arange(len(valores)))
+    peso, gradiente = construccion.establecer_y_calcular_gradiente(valores)
+    numerico = diferencias_centrales(construccion, valores)
+    assert np.isfinite(peso)
+    np.testing.assert_allclose(gradiente, numerico, rtol=1e-6, atol=1e-7 * np.max(np.abs(numerico)))
+
+
+def test_desde_dict_3d_ida_y_vuelta():
+    diseno = armaduras.tricordal(6, 3, 1.0, casos=2)
+    construccion = construir(diseno)
+    np.testing.assert_array_equal(construccion.modelo.coordenadas, [nodo["pos"] for nodo in diseno["nodos"]])
+    np.testing.assert_array_equal(construccion.modelo.restricciones[:, 2],
+                                  [nodo.get("restriccion_z", 0) for nodo in diseno["nodos"]])
+    assert np.all(np.isfinite(construccion.calcular_fuerzas_casos()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = construccion.optimizar(grafico_interactivo=False, verboso=False, limite_evaluaciones=100)
+
+    # El resultado vuelve a ser un diseño que se evalúa al mismo peso
+    optimizado = copy.deepcopy(diseno)
+    for nodo, pos in zip(optimizado["nodos"], construccion.resultado_dict()["nodos"]):
+        nodo["pos"] = pos
+    otra = construir(optimizado)
+    assert otra.obtener_vigas_maximas() == pytest.approx(resultado.peso, rel=1e-12)
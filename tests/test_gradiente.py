@@ -0,0 +1,24 @@
+import numpy as np
+
+from disenos import construir
+
+
+def diferencias_centrales(construccion, valores, paso=1e-6):
+    gradiente = np.zeros(len(valores))
+    for x in range(0, len(valores)):
+        delta = np.zeros(len(valores))
+        delta[x] = paso
+        gradiente[x] = (construccion.establecer_y_calcular(valores + delta) -
+                        construccion.establecer_y_calcular(valores - delta)) / (2 * paso)
+    return gradiente
+
+
+def test_gradiente_adjunto_igual_a_diferencias_centrales():
+    construccion = construir()
+    valores = construccion.modelo.valores_libres() + 0.05 * np.sin(np.arange(9))
+    for caso in range(3):
+        construccion.cargas_actuales = caso
+        peso, gradiente = construccion.establecer_y_calcular_gradiente(valores)
+        numerico = diferencias_centrales(construccion, valores)
+        assert np.isfinite(peso)
+        np.testing.assert_allclose(gradiente, numerico, rtol=1e-6, atol=1e-7 * np.max(np.abs(numerico)))
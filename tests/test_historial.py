@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from disenos import construir
+from historial import HistorialOptimizacion, LectorHistorial
+
+
+def evaluar(construccion, generador, numero):
+    """Evalúa numero geometrías aleatorias cerca de la actual y devuelve sus pesos y posiciones"""
+    base = construccion.modelo.coordenadas[construccion.modelo.libres].copy()
+    pesos, valores = [], []
+    for x in range(0, numero):
+        construccion.establecer_y_calcular(base + generador.uniform(-0.05, 0.05, len(base)))
+        pesos.append(construccion.peso)
+        valores.append(construccion.modelo.coordenadas[construccion.modelo.libres].copy())
+    return np.array(pesos), np.array(valores)
+
+
+def test_campo_y_registros_entre_bloques(tmp_path):
+    construccion = construir()
+    construccion.activar_historial(str(tmp_path), registros_bloque=7)
+    pesos, valores = evaluar(construccion, np.random.default_rng(5), 30)
+    construccion.desactivar_historial()
+    lector = LectorHistorial(str(tmp_path))
+    assert len(lector) == 30
+    np.testing.assert_array_equal(lector.campo("peso"), pesos)
+    for inicio, fin, paso in [(3, 25, 4), (6, 8, 1), (7, 7, 1), (0, None, 7), (-10, None, 3), (5, 29, 11)]:
+        np.testing.assert_array_equal(lector.campo("peso", inicio, fin, paso), pesos[inicio:fin:paso])
+    np.testing.assert_array_equal(lector.campo("valores", 2, 20, 5), valores[2:20:5])
+    np.testing.assert_array_equal(lector[13]["valores"], valores[13])
+    assert lector[-1]["peso"] == pesos[-1]
+    assert lector.mejor() == int(np.argmin(pesos))
+    with pytest.raises(IndexError):
+        lector[30]
+
+
+def test_recupera_registros_sin_guardar_y_sigue_agregando(tmp_path):
+    construccion = construir()
+    generador = np.random.default_rng(6)
+    construccion.activar_historial(str(tmp_path), registros_bloque=7)
+    pesos, valores = evaluar(construccion, generador, 10)
+    # Como si el proceso terminara aquí: la cabecera solo cuenta el primer bloque lleno
+    construccion.historial.bloque.flush()
+    construccion.historial = None
+    assert LectorHistorial(str(tmp_path)).cabecera["registros"] == 7
+    lector = LectorHistorial(str(tmp_path))
+    assert len(lector) == 10
+    np.testing.assert_array_equal(lector.campo("peso"), pesos)
+
+    # Al reabrirlo se agrega después de los registros recuperados, sin pisarlos
+    historial = construccion.activar_historial(str(tmp_path), registros_bloque=7)
+    assert historial.registros == 10
+    mas_pesos, mas_valores = evaluar(construccion, generador, 9)
+    construccion.desactivar_historial()
+    assert lector.actualizar() == 19
+    np.testing.assert_array_equal(lector.campo("peso"), np.concatenate((pesos, mas_pesos)))
+    np.testing.assert_array_equal(lector.campo("valores", 8, 12), np.concatenate((valores, mas_valores))[8:12])
+    assert np.all(np.diff(lector.campo("segundos")) >= 0)
+
+
+def test_no_agrega_a_un_historial_de_otras_cargas(tmp_path):
+    construccion = construir()
+    construccion.activar_historial(str(tmp_path))
+    construccion.desactivar_historial()
+    construccion.modelo.cargas[0] *= 2
+    with pytest.raises(ValueError):
+        HistorialOptimizacion(str(tmp_path), construccion.modelo)
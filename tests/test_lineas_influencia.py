@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from disenos import construir
+from lineas_influencia import TrenCargas
+from structubridgex import calcular_areas
+
+
+def fuerzas_directas(construccion, caso, cargas_ejes, posiciones_ejes):
+    """Fuerzas del caso con cada eje puesto directamente en los dos nodos del tablero de su tramo"""
+    modelo = construccion.modelo
+    tablero = construccion.cargas_moviles.nodos_tablero
+    abscisas = construccion.cargas_moviles.abscisas(modelo.coordenadas)
+    B = modelo.vector_cargas(np.array([caso]))[:, 0].copy()
+    for carga, posicion in zip(cargas_ejes, posiciones_ejes):
+        if posicion < 0 or posicion > abscisas[-1]:
+            continue
+        tramo = min(np.searchsorted(abscisas, posicion, side="right") - 1, len(abscisas) - 2)
+        fraccion = (posicion - abscisas[tramo]) / (abscisas[tramo + 1] - abscisas[tramo])
+        B[2 * tablero[tramo] + 1] -= carga * (1 - fraccion)
+        B[2 * tablero[tramo + 1] + 1] -= carga * fraccion
+    return np.linalg.solve(construccion.sistema.matriz_densa(), B)
+
+
+@pytest.mark.parametrize("paso", [None, 0.3])
+def test_superposicion_igual_a_poner_el_tren(paso):
+    construccion = construir()
+    tren = TrenCargas([3000.0, 1000.0], [1.5])
+    construccion.activar_cargas_moviles(["A", "B", "C", "D", "E"], [tren], paso=paso, ambos_sentidos=False)
+    modelo = construccion.modelo
+    Q, trenes, frentes = construccion.cargas_moviles.matriz_posiciones(modelo.coordenadas)
+    for caso in range(3):
+        X, B, casos = construccion.calcular_fuerzas_moviles([caso])
+        assert X.shape[1] == len(frentes)
+        np.testing.assert_array_equal(casos, caso)
+        directas = [fuerzas_directas(construccion, caso, [], [])] + \
+            [fuerzas_directas(construccion, caso, tren.cargas, frente - tren.distancias) for frente in frentes[1:]]
+        np.testing.assert_allclose(X, np.column_stack(directas), rtol=1e-9, atol=1e-9 * np.abs(X).max())
+
+
+def test_envolvente_con_el_tren_en_cada_posicion():
+    construccion = construir()
+    tren = TrenCargas([2000.0, 2000.0, 1000.0], [0.7, 1.2])
+    construccion.activar_cargas_moviles(["A", "B", "C", "D", "E"], [tren])
+    modelo = construccion.modelo
+    abscisas = construccion.cargas_moviles.abscisas(modelo.coordenadas)
+    for caso in range(3):
+        construccion.cargas_actuales = caso
+        construccion.obtener_peso()
+        # El tren cruza en los dos sentidos; en sentido contrario los ejes van delante del primero. Una
+        # rejilla fina de posiciones más las de cada eje sobre cada nodo del tablero
+        fuerzas = []
+        for distancias in [tren.distancias, -tren.distancias]:
+            inicio, fin = min(0.0, distancias.min()), abscisas[-1] + max(0.0, distancias.max())
+            frentes = np.concatenate((np.arange(inicio, fin, 0.01), (abscisas[:, None] + distancias).ravel()))
+            for frente in frentes:
+                fuerzas.append(fuerzas_directas(construccion, caso, tren.cargas, frente - distancias))
+        fuerzas = np.column_stack(fuerzas)[:modelo.numero_vigas]
+        tension = np.max(np.maximum(fuerzas, 0), axis=1)
+        compresion = np.max(np.maximum(-fuerzas, 0), axis=1)
+        pesos = []
+        for material in construccion.materiales.values():
+            areas = np.maximum(
+                calcular_areas(tension, modelo.longitudes, material["modulo_E"], material["resistencia_fluencia"]),
+                calcular_areas(-compresion, modelo.longitudes, material["modulo_E"],
+                               material["resistencia_fluencia"]))
+            pesos.append(math.fsum(areas * modelo.longitudes * material["densidad"]))
+        # Las posiciones entre nodos no agregan nada a la envolvente de las posiciones sobre los nodos
+        assert construccion.peso == pytest.approx(min(pesos), rel=1e-9)
+        assert construccion.cargas_actuales == caso
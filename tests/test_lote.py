@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from disenos import construir
+
+
+@pytest.mark.parametrize("disperso", [False, True])
+def test_evaluar_lote_igual_a_evaluar_una_por_una(disperso):
+    construccion = construir()
+    construccion.establecer_sistema(disperso)
+    base = construccion.modelo.valores_libres().copy()
+    generador = np.random.default_rng(3)
+    valores = base + generador.uniform(-0.2, 0.2, (20, len(base)))
+    for caso in range(3):
+        pesos, materiales = construccion.evaluar_lote(valores, caso)
+        # La población no mueve los nodos de la construcción
+        np.testing.assert_array_equal(construccion.modelo.valores_libres(), base)
+        construccion.cargas_actuales = caso
+        for k in range(0, len(valores)):
+            assert pesos[k] == pytest.approx(construccion.establecer_y_calcular(valores[k]), rel=1e-9)
+            assert construccion.nombres_materiales[materiales[k]] == construccion.material
+        construccion.establecer_posiciones(base)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from materiales import CatalogoMateriales
+from structubridgex import pesos_materiales
+
+
+def no_dominados_fuerza_bruta(merito_tension, merito_pandeo):
+    """Un material queda si ningún otro es igual o mejor en ambos méritos, salvo que sea idéntico y posterior"""
+    quedan = []
+    for x in range(0, len(merito_tension)):
+        dominado = False
+        for y in range(0, len(merito_tension)):
+            iguales_o_mejores = merito_tension[y] <= merito_tension[x] and merito_pandeo[y] <= merito_pandeo[x]
+            identicos = merito_tension[y] == merito_tension[x] and merito_pandeo[y] == merito_pandeo[x]
+            if y != x and iguales_o_mejores and (not identicos or y < x):
+                dominado = True
+        if not dominado:
+            quedan.append(x)
+    return quedan
+
+
+def catalogo_aleatorio(generador, numero):
+    # Pocos valores distintos para que haya empates en un mérito o en los dos
+    return CatalogoMateriales({
+        "m" + str(x): {"modulo_E": float(generador.choice([70e9, 110e9, 200e9])),
+                       "densidad": float(generador.choice([2700, 4500, 7800])),
+                       "resistencia_fluencia": float(generador.choice([55e6, 250e6, 400e6]))}
+        for x in range(0, numero)})
+
+
+def test_no_dominados_igual_a_fuerza_bruta():
+    generador = np.random.default_rng(11)
+    for prueba in range(0, 200):
+        catalogo = catalogo_aleatorio(generador, int(generador.integers(1, 12)))
+        assert catalogo.no_dominados.tolist() == no_dominados_fuerza_bruta(catalogo.merito_tension,
+                                                                           catalogo.merito_pandeo)
+
+
+def test_el_mas_ligero_siempre_es_no_dominado():
+    generador = np.random.default_rng(13)
+    catalogo = catalogo_aleatorio(generador, 30)
+    fuerzas = generador.normal(0, 1e4, (500, 13))
+    longitudes = generador.uniform(0.5, 2, (500, 13))
+    todos = pesos_materiales(fuerzas, longitudes, catalogo.modulo_E, catalogo.densidad,
+                             catalogo.resistencia_fluencia)
+    indices = catalogo.no_dominados
+    podados = pesos_materiales(fuerzas, longitudes, *catalogo.propiedades(indices))
+    # Mismo peso y, en los empates, el mismo material que np.argmin sobre todo el catálogo
+    np.testing.assert_array_equal(np.min(podados, axis=1), np.min(todos, axis=1))
+    np.testing.assert_array_equal(indices[np.argmin(podados, axis=1)], np.argmin(todos, axis=1))
@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from disenos import construir
+from perfilado import Perfilador
+
+
+def test_fases_y_contadores_de_las_evaluaciones():
+    construccion = construir()
+    perfilador = construccion.activar_perfilador()
+    base = construccion.modelo.valores_libres().copy()
+    for caso, evaluaciones in [(0, 3), (2, 5)]:
+        construccion.cargas_actuales = caso
+        for x in range(evaluaciones):
+            construccion.establecer_y_calcular(base + 0.01 * x)
+    construccion.evaluar_lote(np.tile(base, (4, 1)))
+    construccion.obtener_vigas_maximas()
+
+    resumen = json.loads(perfilador.a_json())
+    fases = resumen["fases"]
+    assert fases["evaluacion"]["llamadas"] == 8
+    for nombre in ["geometria", "ensamblaje", "solucion", "materiales"]:
+        assert fases[nombre]["llamadas"] >= 8
+    # Cada fase dentro de la evaluación cuesta menos que la evaluación completa
+    assert fases["solucion"]["segundos"] <= fases["evaluacion"]["segundos"]
+    assert fases["envolvente"]["llamadas"] == 1
+    assert resumen["contadores"]["evaluaciones_lote"] == 4
+    assert resumen["evaluaciones_caso"] == {"0": 3, "2": 5}
+    assert [punto[:2] for punto in resumen["convergencia"]] == [[x, 0] for x in range(1, 4)] + \
+        [[x, 2] for x in range(4, 9)]
+    intervalos = [evento for evento in perfilador.a_chrome()["traceEvents"] if evento["ph"] == "X"]
+    assert len(intervalos) == sum(fase["llamadas"] for fase in fases.values())
+
+
+def test_combinar_suma_otro_proceso():
+    perfilador, otro = Perfilador(max_eventos=3), Perfilador(max_eventos=3)
+    for x in range(2):
+        perfilador.registrar_fase("solucion", 0.0, 1.0)
+        otro.registrar_fase("solucion", 0.0, 3.0)
+    otro.contar("sistemas_singulares")
+    otro.registrar_evaluacion(1, 0, 10.0)
+    perfilador.combinar(otro)
+    assert perfilador.fases["solucion"] == [4, 8.0, 1.0, 3.0]
+    assert perfilador.contadores == {"sistemas_singulares": 1}
+    assert perfilador.evaluaciones_caso == {0: 1}
+    # Solo caben tres intervalos, el cuarto se cuenta como descartado
+    assert len(perfilador.eventos) == 3
+    assert perfilador.eventos_descartados == 1
@@ -0,0 +1,26 @@
+import pytest
+
+import rendimiento
+
+
+def linea_base(metodo, segundos):
+    medida = {"segundos_por_llamada": segundos}
+    return {"resultados": [{"id": "pratt-vigas=13-casos=1", "metodo": metodo,
+                            "medidas": {"obtener_peso": medida, "optimizar": medida}}]}
+
+
+def test_medir_armadura_usa_el_metodo_de_optimizar():
+    resultado = rendimiento.medir_armadura("pratt", 10, 1, min_segundos=0.001, rondas=1)
+    assert resultado["metodo"] == "powell"
+    assert "optimizar" in resultado["medidas"]
+
+
+def test_comparar_marca_regresiones():
+    filas, regresiones = rendimiento.comparar(linea_base("powell", 1.0), linea_base("powell", 1.5))
+    assert len(filas) == 2
+    assert len(regresiones) == 2
+
+
+def test_comparar_no_mezcla_metodos():
+    with pytest.raises(ValueError):
+        rendimiento.comparar(linea_base("L-BFGS-B", 1.0), linea_base("powell", 1.0))
@@ -0,0 +1,52 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import armaduras
+from resolvedor import SistemaEquilibrio
+from structubridgex import Construccion
+
+
+def solucion_completa(modelo):
+    """Fuerzas del caso actual armando y resolviendo el sistema desde cero con las coordenadas del modelo"""
+    restricciones = [(nodo, eje, modelo.restricciones[nodo, eje]) for nodo, eje in
+                     zip(*np.nonzero(modelo.restricciones))]
+    sistema = SistemaEquilibrio(modelo.numero_nodos, modelo.nodo_a, modelo.nodo_b, restricciones,
+                                dimension=modelo.dimension, disperso=False)
+    deltas = modelo.coordenadas[modelo.nodo_a] - modelo.coordenadas[modelo.nodo_b]
+    longitudes = np.linalg.norm(deltas, axis=1)
+    sistema.actualizar(deltas / longitudes[:, None])
+    B = sistema.cargas(0.5 * modelo.cargas[modelo.caso] * longitudes[:, None])
+    return np.linalg.solve(sistema.matriz_densa(), B)[:modelo.numero_vigas]
+
+
+@pytest.mark.parametrize("disperso", [False, True])
+def test_movimientos_aleatorios_igual_a_resolver_completo(disperso):
+    with contextlib.redirect_stdout(io.StringIO()):
+        construccion = Construccion.desde_dict(armaduras.pratt(20, 10, 2.0, casos=3))
+    construccion.establecer_sistema(disperso)
+    incremental = construccion.activar_incremental(periodo=15, max_vigas=20)
+    modelo = construccion.modelo
+    generador = np.random.default_rng(7)
+    valores = modelo.valores_libres().copy()
+    for paso in range(0, 80):
+        todos = paso % 20 == 19
+        if todos:
+            # Mover todos los nodos gira las 27 vigas fuera del cordón inferior, más que max_vigas, y obliga a
+            # refactorizar
+            valores = valores + generador.uniform(-0.02, 0.02, len(valores))
+        else:
+            valores[generador.integers(len(valores))] += generador.uniform(-0.05, 0.05)
+        construccion.cargas_actuales = int(generador.integers(3))
+        refactorizaciones = incremental.refactorizaciones
+        construccion.establecer_y_calcular(valores)
+        if todos:
+            assert incremental.refactorizaciones == refactorizaciones + 1
+        completa = solucion_completa(modelo)
+        np.testing.assert_allclose(modelo.fuerzas, completa, rtol=1e-9, atol=1e-9 * np.max(np.abs(completa)))
+    estadisticas = incremental.estadisticas()
+    assert estadisticas["soluciones_incrementales"] >= 60
+    # Cada evaluación es una actualización o una refactorización
+    assert estadisticas["refactorizaciones"] + estadisticas["soluciones_incrementales"] == 80
@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+
+from secciones import CatalogoSecciones, TablaMaterial
+
+
+def test_primera_igual_a_fuerza_bruta():
+    generador = np.random.default_rng(17)
+    for prueba in range(0, 50):
+        numero = int(generador.integers(1, 40))
+        # Áreas repetidas para probar los empates
+        areas = generador.integers(1, 10, numero).astype(float)
+        inercias = generador.uniform(0, 1, numero)
+        tabla = TablaMaterial(np.arange(numero), areas, inercias)
+        areas_requeridas = generador.uniform(0, 11, 100)
+        inercias_requeridas = generador.uniform(0, 1.1, 100)
+        posiciones = tabla.primera(areas_requeridas, inercias_requeridas)
+        for area, inercia, posicion in zip(areas_requeridas, inercias_requeridas, posiciones):
+            cumplen = np.flatnonzero((tabla.areas >= area) & (tabla.inercias >= inercia))
+            assert posicion == (cumplen[0] if len(cumplen) else numero)
+
+
+def test_seleccionar_la_seccion_mas_ligera_que_cumple():
+    catalogo = CatalogoSecciones.tubos_circulares([0.02, 0.04, 0.06, 0.1], [0.002, 0.004, 0.008])
+    generador = np.random.default_rng(19)
+    fuerzas = generador.choice([-1, 1], 300) * 10 ** generador.uniform(3, 7, 300)
+    tension, compresion = np.maximum(fuerzas, 0), np.maximum(-fuerzas, 0)
+    longitudes = generador.uniform(0.5, 4, 300)
+    secciones = catalogo.seleccionar(tension, compresion, longitudes)
+    E, densidad, fy = catalogo.catalogo_materiales.propiedades(catalogo.materiales)
+    for x in range(0, len(fuerzas)):
+        cumplen = (catalogo.areas * fy >= max(tension[x], compresion[x])) & \
+            (E * catalogo.inercias >= compresion[x] * (0.5 * longitudes[x]) ** 2 / math.pi ** 2)
+        if not np.any(cumplen):
+            assert secciones[x] == -1
+            continue
+        assert cumplen[secciones[x]]
+        assert catalogo.pesos_metro[secciones[x]] == np.min(catalogo.pesos_metro[cumplen])
+    assert np.any(secciones == -1) and np.any(secciones >= 0)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+import armaduras
+from disenos import puente_ejemplo
+from servidor import ServidorOptimizacion
+
+
+def con_servidor(prueba, **opciones):
+    """Ejecuta la corrutina prueba(servidor, puerto) con un servidor de un proceso escuchando en un puerto libre"""
+    async def principal():
+        servidor = ServidorOptimizacion(procesos=1, **opciones)
+        escucha = await servidor.iniciar(puerto=0)
+        try:
+            return await prueba(servidor, escucha.sockets[0].getsockname()[1])
+        finally:
+            escucha.close()
+            servidor.cerrar()
+    return asyncio.run(principal())
+
+
+async def pedir(puerto, metodo, ruta, cuerpo=b"", longitud=None):
+    """Hace una petición HTTP/1.1 y devuelve el código y el JSON de la respuesta"""
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    longitud = len(cuerpo) if longitud is None else longitud
+    escritor.write("{0} {1} HTTP/1.1\r\nHost: local\r\nContent-Length: {2}\r\n\r\n".format(
+        metodo, ruta, longitud).encode() + cuerpo)
+    await escritor.drain()
+    respuesta = await asyncio.wait_for(lector.read(), 30)
+    escritor.close()
+    encabezados, _, contenido = respuesta.partition(b"\r\n\r\n")
+    return int(encabezados.split()[1]), json.loads(contenido)
+
+
+async def esperar_estado(servidor, trabajo, estados, segundos=60):
+    for x in range(0, int(segundos / 0.02)):
+        if servidor.trabajos[trabajo].estado in estados:
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("el trabajo {0} sigue en {1}".format(trabajo, servidor.trabajos[trabajo].estado))
+
+
+@pytest.mark.parametrize("cuerpo", [b"[]", b'"x"', b"5", b"null", b'{"diseno": []}', b'{"diseno": {}, "opciones": 5}',
+                                    b'{"diseno": {"tipo": "pratt", "claro": 4, "paneles": 4, "altura": 1, '
+                                    b'"opciones": []}}'])
+def test_cuerpo_que_no_es_objeto_da_400(cuerpo):
+    async def prueba(servidor, puerto):
+        codigo, datos = await pedir(puerto, "POST", "/trabajos", cuerpo)
+        assert codigo == 400
+        assert "error" in datos
+        assert servidor.trabajos == {}
+    con_servidor(prueba)
+
+
+@pytest.mark.parametrize("longitud", ["-1", "abc"])
+def test_content_length_invalido_da_400(longitud):
+    async def prueba(servidor, puerto):
+        codigo, datos = await pedir(puerto, "POST", "/trabajos", b"{}", longitud=longitud)
+        assert codigo == 400
+    con_servidor(prueba)
+
+
+def test_optimiza_un_diseno():
+    async def prueba(servidor, puerto):
+        codigo, datos = await pedir(puerto, "POST", "/trabajos", json.dumps({"diseno": puente_ejemplo()}).encode())
+        assert codigo == 202
+        trabajo = datos["trabajos"][0]
+        await esperar_estado(servidor, trabajo, ("terminado", "cancelado", "error"))
+        codigo, datos = await pedir(puerto, "GET", "/trabajos/" + trabajo)
+        assert datos["estado"] == "terminado"
+        assert datos["resultado"]["motivo"] == "convergencia"
+        # La posición de cancelación se libera al terminar
+        assert len(servidor.posiciones_libres) == len(servidor.cancelados)
+    con_servidor(prueba)
+
+
+def test_cancelar_trabajo_en_cola_y_en_curso():
+    largo = json.dumps({"diseno": armaduras.pratt(claro=30, paneles=30, altura=3, casos=3)}).encode()
+
+    async def prueba(servidor, puerto):
+        # Con un proceso el grupo pasa a su cola interna hasta dos trabajos más del que corre; el cuarto espera
+        trabajos = []
+        for x in range(0, 4):
+            codigo, datos = await pedir(puerto, "POST", "/trabajos", largo)
+            trabajos.extend(datos["trabajos"])
+        en_curso, en_cola = trabajos[0], trabajos[-1]
+        await esperar_estado(servidor, en_curso, ("ejecutando",))
+
+        codigo, datos = await pedir(puerto, "DELETE", "/trabajos/" + en_cola)
+        assert codigo == 202
+        assert datos["estado"] == "cancelado"
+
+        # Uno que ya tomó un proceso no se da por cancelado hasta que el proceso lo detiene
+        codigo, datos = await pedir(puerto, "DELETE", "/trabajos/" + en_curso)
+        assert datos["estado"] == "ejecutando"
+        await esperar_estado(servidor, en_curso, ("terminado", "cancelado", "error"))
+        codigo, datos = await pedir(puerto, "GET", "/trabajos/" + en_curso)
+        assert datos["estado"] == "cancelado"
+        assert datos["resultado"]["motivo"] == "cancelada"
+
+        for trabajo in trabajos[1:-1]:
+            await pedir(puerto, "DELETE", "/trabajos/" + trabajo)
+            await esperar_estado(servidor, trabajo, ("terminado", "cancelado", "error"))
+            assert servidor.trabajos[trabajo].estado == "cancelado"
+        assert len(servidor.posiciones_libres) == len(servidor.cancelados)
+    con_servidor(prueba)
+
+
+def test_posiciones_de_cancelacion_no_se_comparten():
+    async def prueba(servidor, puerto):
+        servidor.max_en_cola = 10
+        # Solo quedan dos posiciones libres: un tercer trabajo sin terminar no cabe aunque la cola tenga lugar
+        while len(servidor.posiciones_libres) > 2:
+            servidor.posiciones_libres.pop()
+        cuerpo = json.dumps({"diseno": puente_ejemplo()}).encode()
+        posiciones = []
+        for x in range(0, 2):
+            codigo, datos = await pedir(puerto, "POST", "/trabajos", cuerpo)
+            posiciones.append(servidor.trabajos[datos["trabajos"][0]].posicion)
+        assert posiciones[0] != posiciones[1]
+        codigo, datos = await pedir(puerto, "POST", "/trabajos", cuerpo)
+        assert codigo == 503
+        for trabajo in list(servidor.trabajos):
+            await esperar_estado(servidor, trabajo, ("terminado", "cancelado", "error"))
+        codigo, datos = await pedir(puerto, "POST", "/trabajos", cuerpo)
+        assert codigo == 202
+        assert servidor.trabajos[datos["trabajos"][0]].posicion in posiciones
+    con_servidor(prueba)
@@ -0,0 +1,118 @@
+import contextlib
+import io
+import json
+import math
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from disenos import construir, puente_ejemplo
+
+
+def optimizar(construccion, **opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return construccion.optimizar(grafico_interactivo=False, verboso=False, **opciones)
+
+
+def peso_referencia(diseno, caso):
+    """
+    Peso de un caso de carga como lo calculaba la versión original: matriz densa viga por viga, np.linalg.inv y
+    cada material de materials.json por separado, quedándose con el más ligero
+    """
+    posiciones = np.array([nodo["pos"] for nodo in diseno["nodos"]], dtype=float)
+    vigas = diseno["vigas"]
+    filas = 2 * len(posiciones)
+    matriz = np.zeros((filas, filas))
+    B = np.zeros(filas)
+    longitudes = []
+    for columna, (nombre, a, b) in enumerate(vigas):
+        delta = posiciones[a] - posiciones[b]
+        longitud = np.linalg.norm(delta)
+        longitudes.append(longitud)
+        angulo_0 = math.atan2(delta[1], delta[0])
+        angulo_1 = math.atan2(-delta[1], -delta[0])
+        matriz[2 * a:2 * a + 2, columna] = math.cos(angulo_0), math.sin(angulo_0)
+        matriz[2 * b:2 * b + 2, columna] = math.cos(angulo_1), math.sin(angulo_1)
+        carga_nodos = 0.5 * np.array(diseno["cargas"][caso][columna]) * longitud
+        B[2 * a:2 * a + 2] += carga_nodos
+        B[2 * b:2 * b + 2] += carga_nodos
+    columna = len(vigas)
+    for x, nodo in enumerate(diseno["nodos"]):
+        for eje, nombre in enumerate(["restriccion_x", "restriccion_y"]):
+            if nodo.get(nombre, 0) != 0:
+                matriz[2 * x + eje, columna] = nodo[nombre]
+                columna += 1
+    X = np.dot(np.linalg.inv(matriz), B)
+
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "materials.json")) as archivo:
+        materiales = json.load(archivo)
+    pesos = []
+    for material in materiales.values():
+        peso = 0.0
+        for fuerza, longitud in zip(X[:len(vigas)], longitudes):
+            if fuerza >= 0:
+                area = abs(fuerza) / material["resistencia_fluencia"]
+            else:
+                area = math.pow(((abs(fuerza) * (0.5 * longitud) ** 2 / (
+                    math.pi ** 2 * material["modulo_E"])) / (math.pi / 4)), 1 / 2) * math.pi
+            peso += area * longitud * material["densidad"]
+        pesos.append(peso)
+    return min(pesos)
+
+
+def test_pesos_por_caso_igual_a_referencia():
+    diseno = puente_ejemplo()
+    construccion = construir(diseno)
+    X_casos = construccion.calcular_fuerzas_casos()
+    for caso in range(len(diseno["cargas"])):
+        construccion.cargas_actuales = caso
+        construccion.establecer_vigas()
+        construccion.obtener_peso()
+        assert construccion.peso == pytest.approx(peso_referencia(diseno, caso), rel=1e-9)
+        # La solución con todos los casos juntos coincide con la de cada caso por separado
+        np.testing.assert_allclose(X_casos[:, caso], construccion.X, rtol=1e-9, atol=1e-9)
+
+
+def test_envolvente_cubre_cada_caso():
+    construccion = construir()
+    pesos_casos = []
+    for caso in range(3):
+        construccion.cargas_actuales = caso
+        construccion.establecer_vigas()
+        construccion.obtener_peso()
+        pesos_casos.append(construccion.peso)
+    assert construccion.obtener_vigas_maximas() >= max(pesos_casos) * (1 - 1e-12)
+
+
+def test_vigas_maximas_es_el_caso_que_gobierna_cada_viga():
+    construccion = construir()
+    assert construccion.vigas_maximas.dtype.kind == "i"
+    assert len(construccion.vigas_maximas) == 0
+    construccion.obtener_vigas_maximas()
+    assert construccion.vigas_maximas.dtype.kind == "i"
+    assert len(construccion.vigas_maximas) == len(construccion.vigas)
+    assert set(construccion.vigas_maximas) <= {0, 1, 2}
+    # Cada viga queda con la fuerza del caso que la gobierna
+    X_casos = construccion.calcular_fuerzas_casos()
+    for x, viga in enumerate(construccion.vigas):
+        assert viga.fuerza_interna == pytest.approx(abs(X_casos[x, construccion.vigas_maximas[x]]), rel=1e-12)
+
+
+def test_metodo_sin_distinguir_mayusculas():
+    resultados = []
+    for metodo in ["powell", "Powell"]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            resultados.append(optimizar(construir(), metodo=metodo, limite_evaluaciones=300))
+    assert resultados[0].peso == resultados[1].peso
+    assert resultados[0].iteraciones == resultados[1].iteraciones == 300
+
+
+def test_metodo_sin_gradiente_no_recibe_jac():
+    construccion = construir()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        resultado = optimizar(construccion, metodo="Nelder-Mead", limite_evaluaciones=200)
+    assert np.isfinite(resultado.peso)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from disenos import construir
+from topologia import OptimizacionTopologia, estructura_base
+
+
+def rejilla(columnas, filas, claro=4.0, altura=1.0, carga=1e4):
+    """Nodos en rejilla con apoyos en las esquinas inferiores y una carga hacia abajo en el centro del tablero"""
+    x, y = np.meshgrid(np.linspace(0, claro, columnas), np.linspace(0, altura, filas))
+    coordenadas = np.column_stack((x.ravel(), y.ravel()))
+    restricciones = np.zeros_like(coordenadas)
+    restricciones[0] = [-1, -1]
+    restricciones[columnas - 1, 1] = -1
+    cargas = np.zeros((2,) + np.shape(coordenadas))
+    cargas[0, columnas // 2, 1] = -carga
+    cargas[1, columnas // 4, 1] = -carga
+    return coordenadas, restricciones, cargas
+
+
+def test_compatibilidad_son_las_columnas_del_sistema():
+    construccion = construir()
+    modelo = construccion.modelo
+    optimizacion = OptimizacionTopologia.desde_construccion(construccion)
+    longitudes, C = optimizacion.geometria(modelo.nodo_a, modelo.nodo_b)
+    np.testing.assert_allclose(longitudes, modelo.longitudes, rtol=1e-15)
+    columnas = construccion.sistema.matriz_densa()[:, :modelo.numero_vigas]
+    np.testing.assert_array_equal(C.toarray(), columnas.T[:, optimizacion.libres])
+
+
+def test_estructura_base_pequena_quita_vigas_y_cumple():
+    coordenadas, restricciones, cargas = rejilla(5, 3)
+    nodo_a, nodo_b = estructura_base(coordenadas)
+    optimizacion = OptimizacionTopologia(coordenadas, restricciones, cargas, nodo_a, nodo_b)
+    resultado = optimizacion.optimizar(materiales=["Acero A36"])
+    assert 0 < len(resultado["vigas"]) < len(nodo_a)
+    assert resultado["utilizacion"] <= 1 + 1e-3
+    assert resultado["peso"] >= resultado["peso_distribucion"] * (1 - 1e-6)
+
+    # Las fuerzas elásticas de la armadura que queda equilibran las cargas de los dos casos
+    nombres = optimizacion.nombres_nodos
+    indices = [nombres.index(nodo["nombre"]) for nodo in resultado["nodos"]]
+    nodo_a = np.array([indices[a] for nombre, a, b in resultado["vigas"]])
+    nodo_b = np.array([indices[b] for nombre, a, b in resultado["vigas"]])
+    longitudes, C = optimizacion.geometria(nodo_a, nodo_b)
+    areas = np.array(resultado["areas"])
+    E = optimizacion.catalogo.modulo_E[optimizacion.catalogo.indice("Acero A36")]
+    fuerzas = optimizacion.analizar(C, E * areas / longitudes)
+    np.testing.assert_allclose(C.T @ fuerzas, optimizacion.P, atol=1e-6 * np.abs(cargas).max())
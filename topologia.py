@@ -0,0 +1,441 @@
+import numpy as np
+from typing import List
+
+from materiales import CatalogoMateriales
+from resolvedor import SistemaEquilibrio
+
+# Entradas (pares x nodos) como máximo por bloque al buscar vigas superpuestas, para acotar la memoria
+ENTRADAS_BLOQUE = 2000000
+
+
+def estructura_base(coordenadas, longitud_maxima=None, quitar_superpuestas=True, tolerancia=1e-9):
+    """
+    Vigas candidatas de una estructura base: todos los pares de nodos, opcionalmente hasta una longitud máxima.
+    Una viga que pasa por encima de otro nodo se quita, porque equivale a las dos vigas más cortas que ese nodo
+    separa y solo haría más densa la matriz.
+    :param coordenadas: (nodos x dimension), en el plano o en el espacio
+    :param longitud_maxima:
+    :param quitar_superpuestas:
+    :param tolerancia: distancia relativa a la longitud de la viga para considerar que un nodo está encima
+    :return nodo_a, nodo_b:
+    """
+    coordenadas = np.asarray(coordenadas, dtype=float)
+    numero_nodos = len(coordenadas)
+    nodo_a, nodo_b = np.triu_indices(numero_nodos, 1)
+    deltas = coordenadas[nodo_b] - coordenadas[nodo_a]
+    longitudes = np.sqrt(np.einsum("ij,ij->i", deltas, deltas))
+    validas = longitudes > 0
+    if longitud_maxima is not None:
+        validas &= longitudes <= longitud_maxima
+    nodo_a, nodo_b, deltas, longitudes = nodo_a[validas], nodo_b[validas], deltas[validas], longitudes[validas]
+    if not quitar_superpuestas or len(nodo_a) == 0:
+        return nodo_a, nodo_b
+
+    superpuestas = np.zeros(len(nodo_a), dtype=bool)
+    bloque = max(1, ENTRADAS_BLOQUE // numero_nodos)
+    for inicio in range(0, len(nodo_a), bloque):
+        fin = inicio + bloque
+        # Posición de cada nodo a lo largo de la viga (0 en a, 1 en b) y su distancia a la recta de la viga
+        relativas = coordenadas[None, :, :] - coordenadas[nodo_a[inicio:fin], None, :]
+        largo = longitudes[inicio:fin, None]
+        unitarios = deltas[inicio:fin] / longitudes[inicio:fin, None]
+        proyeccion = np.einsum("pnk,pk->pn", relativas, unitarios)
+        a_lo_largo = proyeccion / largo
+        # Componente perpendicular a la viga, vale igual en el plano que en el espacio
+        perpendicular = relativas - proyeccion[:, :, None] * unitarios[:, None, :]
+        transversal = np.sqrt(np.einsum("pnk,pnk->pn", perpendicular, perpendicular)) / largo
+        encima = (a_lo_largo > tolerancia) & (a_lo_largo < 1 - tolerancia) & (transversal < tolerancia)
+        superpuestas[inicio:fin] = np.any(encima, axis=1)
+    return nodo_a[~superpuestas], nodo_b[~superpuestas]
+
+
+class OptimizacionTopologia(object):
+    """
+    Optimización de la topología sobre una estructura base: se parte de muchas vigas candidatas entre los nodos
+    y se eliminan las que no hacen falta. Cada viga tiene el área de calcular_areas para la envolvente de sus
+    fuerzas: F/fy a tensión y L·√(|F|/(π·E)) a compresión.
+
+    1. Distribución: un programa lineal disperso busca, para todos los casos de carga a la vez, fuerzas en
+       equilibrio que minimicen Σ densidad·L·A con A >= F/fy y A >= w·|F| a compresión. El pandeo no es lineal;
+       w es la secante de la curva de pandeo en la compresión de la iteración anterior, así que las vigas con
+       poca compresión se vuelven caras y su área tiende a cero. Las vigas que se quedan en cero salen del
+       programa en la siguiente iteración. El programa nunca ve todas las candidatas: empieza con las vecinas
+       de cada nodo y agrega las que sus desplazamientos virtuales dicen que mejorarían el diseño (ver
+       programa_adaptativo), así decenas de miles de candidatas solo cuestan una matriz dispersa. No hace falta
+       resolver ningún sistema de rigidez, y los casi singulares de las vigas con área casi nula no aparecen.
+    2. Verificación: con las vigas que quedan, las fuerzas elásticas se calculan por rigidez,
+           K = Cᵀ·diag(E·A/L)·C,  K·u = P,  fuerzas = (E·A/L)·(C·u)
+       donde C es la transpuesta de las columnas de vigas de la matriz de equilibrio de SistemaEquilibrio, y
+       se agrandan las vigas que no alcanzan. Si la armadura resultante es isostática las fuerzas coinciden con
+       las del programa lineal y no cambia nada.
+    """
+    def __init__(self, coordenadas, restricciones, cargas, nodo_a=None, nodo_b=None, nombres_nodos=None,
+                 longitud_maxima=None, catalogo=None):
+        """
+        :param coordenadas: (nodos x dimension), 2 en el plano o 3 en el espacio
+        :param restricciones: (nodos x dimension), distinto de cero en los grados de libertad apoyados
+        :param cargas: (casos x nodos x dimension) cargas externas en los nodos
+        :param nodo_a: vigas candidatas; por defecto las de estructura_base
+        :param nodo_b:
+        :param nombres_nodos:
+        :param longitud_maxima: longitud máxima de las candidatas generadas
+        :param catalogo: CatalogoMateriales, por defecto el de materials.json
+        """
+        self.coordenadas = np.asarray(coordenadas, dtype=float)
+        self.numero_nodos, self.dimension = np.shape(self.coordenadas)
+        self.restricciones = np.asarray(restricciones, dtype=float)
+        self.cargas = np.asarray(cargas, dtype=float).reshape((-1, self.numero_nodos, self.dimension))
+        self.nombres_nodos: List = list(nombres_nodos) if nombres_nodos is not None else \
+            [str(x) for x in range(0, self.numero_nodos)]
+        if nodo_a is None:
+            nodo_a, nodo_b = estructura_base(self.coordenadas, longitud_maxima)
+        self.nodo_a = np.asarray(nodo_a, dtype=int)
+        self.nodo_b = np.asarray(nodo_b, dtype=int)
+        self.catalogo = catalogo or CatalogoMateriales.desde_archivo()
+        self.numero_candidatas = len(self.nodo_a)
+        # Los costos del programa lineal se miden en longitudes relativas a la candidata más larga
+        deltas = self.coordenadas[self.nodo_a] - self.coordenadas[self.nodo_b]
+        self.longitud_referencia = float(np.sqrt(np.einsum("ij,ij->i", deltas, deltas)).max())
+        # Grados de libertad sin apoyo y las cargas en ellos, (libres x casos)
+        self.libres = np.flatnonzero(self.restricciones.ravel() == 0)
+        self.P = self.cargas.reshape((len(self.cargas), -1)).T[self.libres]
+        # (material, fase, iteración, vigas, peso) de cada iteración
+        self.historial = []
+
+    @classmethod
+    def desde_construccion(cls, construccion, longitud_maxima=None, incluir_vigas=True):
+        """
+        Estructura base con los nodos, apoyos y casos de carga de una Construccion en su geometría actual. Las
+        cargas distribuidas de las vigas se pasan a los nodos como lo hace el sistema de equilibrio.
+        :param construccion:
+        :param longitud_maxima:
+        :param incluir_vigas: conserva como candidatas las vigas de la construcción aunque se superpongan
+        :return optimizacion:
+        """
+        modelo = construccion.modelo
+        coordenadas = modelo.coordenadas.copy()
+        cargas = np.asarray(modelo.vector_cargas(slice(None))).T.reshape((-1, modelo.numero_nodos, modelo.dimension))
+        nodo_a, nodo_b = estructura_base(coordenadas, longitud_maxima)
+        if incluir_vigas:
+            pares = set(zip(np.minimum(nodo_a, nodo_b).tolist(), np.maximum(nodo_a, nodo_b).tolist()))
+            extra = [(a, b) for a, b in zip(modelo.nodo_a.tolist(), modelo.nodo_b.tolist())
+                     if (min(a, b), max(a, b)) not in pares and a != b]
+            if extra:
+                nodo_a = np.concatenate((nodo_a, [a for a, b in extra]))
+                nodo_b = np.concatenate((nodo_b, [b for a, b in extra]))
+        return cls(coordenadas, modelo.restricciones, cargas, nodo_a, nodo_b, modelo.nombres_nodos,
+                   catalogo=construccion.catalogo)
+
+    def geometria(self, nodo_a, nodo_b):
+        """
+        Longitudes y matriz de compatibilidad C (vigas x grados de libertad libres), dispersa: la transpuesta de
+        las columnas de vigas del sistema de equilibrio. Las reacciones no entran, los apoyos se quitan como
+        grados de libertad, así que la estructura base no necesita ser cuadrada.
+        """
+        deltas = self.coordenadas[nodo_a] - self.coordenadas[nodo_b]
+        longitudes = np.sqrt(np.einsum("ij,ij->i", deltas, deltas))
+        sistema = SistemaEquilibrio(self.numero_nodos, nodo_a, nodo_b, [], dimension=self.dimension, disperso=True)
+        sistema.actualizar(deltas / longitudes[:, None])
+        return longitudes, sistema.matriz_vigas().T.tocsr()[:, self.libres]
+
+    def dimensionar(self, fuerzas, longitudes, material: int):
+        """Área de cada viga para la envolvente de sus fuerzas, como calcular_areas con un solo material"""
+        from structubridgex import calcular_areas
+        catalogo = self.catalogo
+        areas = calcular_areas(fuerzas, longitudes[:, None], catalogo.modulo_E[material],
+                               catalogo.resistencia_fluencia[material])
+        return np.max(areas, axis=1)
+
+    def conexion_inicial(self, longitudes, vecinas: int):
+        """
+        Vigas con las que arranca la distribución: las vecinas más cortas de cada nodo
+        :param longitudes: de todas las candidatas
+        :param vecinas: vigas por nodo
+        :return activas: índices de las candidatas elegidas
+        """
+        numero = len(longitudes)
+        extremos = np.concatenate((self.nodo_a, self.nodo_b))
+        vigas = np.concatenate((np.arange(numero), np.arange(numero)))
+        orden = np.lexsort((np.concatenate((longitudes, longitudes)), extremos))
+        extremos, vigas = extremos[orden], vigas[orden]
+        # Lugar de cada viga entre las del mismo nodo, de la más corta a la más larga
+        inicios = np.flatnonzero(np.r_[True, extremos[1:] != extremos[:-1]])
+        lugares = np.arange(len(extremos)) - np.repeat(inicios, np.diff(np.r_[inicios, len(extremos)]))
+        return np.unique(vigas[lugares < vecinas])
+
+    def programa_lineal(self, C, longitudes, material: int, secantes):
+        """
+        Un programa lineal de la distribución. Variables: áreas A, y por caso tensiones t y compresiones c
+        (fuerza = t - c). Se ensambla directamente en COO para no pasar por bloques densos.
+        :param C:
+        :param longitudes:
+        :param material:
+        :param secantes: área por unidad de compresión de cada viga
+        :return fuerzas, desplazamientos: fuerzas (vigas x casos) y los multiplicadores del equilibrio (libres x
+            casos), que son desplazamientos virtuales; None si no hay equilibrio posible con estas vigas
+        """
+        import scipy.sparse
+        from scipy.optimize import linprog
+        catalogo = self.catalogo
+        vigas = len(longitudes)
+        casos = self.P.shape[1]
+        libres = C.shape[1]
+        columnas_caso = 2 * vigas * np.arange(casos)
+        # Equilibrio: Cᵀ·(t_k - c_k) = P_k
+        transpuesta = C.T.tocoo()
+        filas_igualdad = (libres * np.arange(casos)[:, None] + transpuesta.row).ravel()
+        filas_igualdad = np.concatenate((filas_igualdad, filas_igualdad))
+        columnas_igualdad = np.concatenate(((vigas + columnas_caso[:, None] + transpuesta.col).ravel(),
+                                            (2 * vigas + columnas_caso[:, None] + transpuesta.col).ravel()))
+        valores_igualdad = np.concatenate((np.tile(transpuesta.data, casos), -np.tile(transpuesta.data, casos)))
+        numero_variables = vigas * (1 + 2 * casos)
+        igualdad = scipy.sparse.csr_matrix((valores_igualdad, (filas_igualdad, columnas_igualdad)),
+                                           shape=(libres * casos, numero_variables))
+        # Áreas: t_k/fy - A <= 0 y secante·c_k - A <= 0; las filas coinciden con las columnas de t y c. Las áreas
+        # (del orden de 1e-6 m²) se toman como capacidades fy·A y las fuerzas relativas a las cargas, para que
+        # los coeficientes queden cerca de 1 y las tolerancias del solucionador tengan sentido
+        fy = catalogo.resistencia_fluencia[material]
+        escala = max(np.abs(self.P).max(), 1e-300)
+        indices = np.arange(2 * vigas * casos)
+        columnas_fuerza = vigas + indices
+        por_unidad = np.tile(np.concatenate((np.ones(vigas), fy * secantes)), casos)
+        desigualdad = scipy.sparse.csr_matrix(
+            (np.concatenate((por_unidad, -np.ones(len(indices)))),
+             (np.concatenate((indices, indices)), np.concatenate((columnas_fuerza, indices % vigas)))),
+            shape=(len(indices), numero_variables))
+        costo = np.zeros(numero_variables)
+        costo[:vigas] = longitudes / self.longitud_referencia
+        resultado = linprog(costo, A_ub=desigualdad, b_ub=np.zeros(len(indices)), A_eq=igualdad,
+                            b_eq=self.P.T.ravel() / escala, bounds=(0, None), method="highs-ipm")
+        if resultado.status != 0:
+            return None
+        fuerzas = resultado.x[vigas:].reshape((casos, 2, vigas))
+        desplazamientos = resultado.eqlin.marginals.reshape((casos, libres)).T
+        return escala * (fuerzas[:, 0] - fuerzas[:, 1]).T, desplazamientos
+
+    def programa_adaptativo(self, C, longitudes, material: int, secantes, activas, tolerancia=1e-3,
+                            verboso=False):
+        """
+        Programa lineal de la distribución sobre todas las candidatas resolviendo solo con algunas. Con los
+        desplazamientos virtuales u de la solución, una viga que falta mejoraría el diseño si su deformación
+        ε_k = C·u_k en los casos cuesta más que su longitud:
+            Σ_k max(ε_k, 0) + max(-ε_k, 0) / (fy·secante) > L
+        y se agregan las que más lo violan hasta que no queda ninguna. Así el programa solo ve las vigas que
+        pueden servir, y las demás solo cuestan un producto de la matriz dispersa C.
+        :param C: compatibilidad de todas las candidatas
+        :param longitudes: de todas las candidatas
+        :param material:
+        :param secantes: de todas las candidatas
+        :param activas: índices de las candidatas con las que se empieza
+        :param tolerancia: violación relativa que se acepta
+        :param verboso:
+        :return activas, fuerzas: las vigas del programa final y sus fuerzas, None si ni con todas las
+            candidatas hay equilibrio
+        """
+        numero = len(longitudes)
+        capacidad_compresion = self.catalogo.resistencia_fluencia[material] * secantes
+        while True:
+            solucion = self.programa_lineal(C[activas], longitudes[activas], material, secantes[activas])
+            if solucion is None:
+                # Con tan pocas vigas no hay equilibrio: se agregan las más cortas que faltan
+                faltan = np.setdiff1d(np.arange(numero), activas)
+                if len(faltan) == 0:
+                    return None
+                faltan = faltan[np.argsort(longitudes[faltan], kind="stable")][:max(len(activas), 1)]
+                activas = np.union1d(activas, faltan)
+                continue
+            fuerzas, desplazamientos = solucion
+            deformaciones = C @ desplazamientos
+            demanda = np.sum(np.maximum(deformaciones, 0) +
+                             np.maximum(-deformaciones, 0) / capacidad_compresion[:, None], axis=1)
+            violacion = demanda * self.longitud_referencia / longitudes
+            violacion[activas] = 0
+            nuevas = np.flatnonzero(violacion > 1 + tolerancia)
+            if verboso:
+                print("Programa lineal con", len(activas), "vigas, se agregan", len(nuevas),
+                      "violación máxima:", violacion.max() - 1)
+            if len(nuevas) == 0:
+                return activas, fuerzas
+            # Las más violadas primero, sin más que duplicar el programa de una vez
+            nuevas = nuevas[np.argsort(-violacion[nuevas], kind="stable")][:max(len(activas), 100)]
+            activas = np.union1d(activas, nuevas)
+
+    def distribuir(self, material: int, max_iteraciones=20, tolerancia=1e-3, umbral=1e-6, vecinas=None,
+                   adaptativas=2, verboso=False):
+        """
+        Fase 1: programas lineales con la secante de pandeo actualizada
+        :param material: índice en el catálogo
+        :param max_iteraciones:
+        :param tolerancia: cambio relativo del peso para terminar
+        :param umbral: se eliminan las vigas con área menor que umbral·(área máxima); mientras se buscan vigas
+            nuevas pueden volver a entrar si hacen falta
+        :param vecinas: vigas por nodo en el primer programa; por defecto 4·dimensión
+        :param adaptativas: iteraciones que buscan vigas nuevas entre todas las candidatas con
+            programa_adaptativo; las siguientes solo ajustan las que quedan, que es mucho más barato
+        :param verboso:
+        :return nodo_a, nodo_b, areas, fuerzas, peso: del mejor diseño encontrado, solo con las vigas que quedan
+        """
+        catalogo = self.catalogo
+        E = catalogo.modulo_E[material]
+        longitudes, C = self.geometria(self.nodo_a, self.nodo_b)
+        activas = self.conexion_inicial(longitudes, vecinas or 4 * self.dimension)
+        # La primera secante es la de una compresión del orden de las cargas: casi un programa de fluencia
+        referencia = max(np.abs(self.P).sum(axis=0).max(), 1e-300)
+        compresiones = np.full(self.numero_candidatas, referencia)
+        conocidas = np.zeros(self.numero_candidatas, dtype=bool)
+        mejor = None
+        anterior = np.inf
+        for iteracion in range(1, max_iteraciones + 1):
+            secantes = longitudes / np.sqrt(np.pi * E * compresiones)
+            if iteracion <= adaptativas:
+                solucion = self.programa_adaptativo(C, longitudes, material, secantes, activas, verboso=verboso)
+                if solucion is None:
+                    break
+                activas, fuerzas = solucion
+            else:
+                solucion = self.programa_lineal(C[activas], longitudes[activas], material, secantes[activas])
+                if solucion is None:
+                    break
+                fuerzas = solucion[0]
+            areas = self.dimensionar(fuerzas, longitudes[activas], material)
+            peso = float(catalogo.densidad[material] * np.sum(areas * longitudes[activas]))
+            quedan = areas > umbral * areas.max()
+            self.historial.append((int(material), "distribucion", iteracion, int(np.count_nonzero(quedan)), peso))
+            if verboso:
+                print("Distribución", iteracion, "vigas:", np.count_nonzero(quedan), "peso:", peso)
+            if mejor is None or peso < mejor[4]:
+                mejor = (self.nodo_a[activas[quedan]], self.nodo_b[activas[quedan]], areas[quedan],
+                         fuerzas[quedan], peso)
+            if abs(anterior - peso) <= tolerancia * peso:
+                break
+            anterior = peso
+            compresiones[activas] = np.maximum(np.max(-fuerzas, axis=1), 1e-9 * referencia)
+            conocidas[activas] = True
+            # Las candidatas que nunca entraron no tienen compresión propia; con la de referencia serían demasiado
+            # baratas a compresión frente a las demás, así que toman la típica del diseño actual
+            comprimidas = compresiones[activas][compresiones[activas] > 1e-6 * referencia]
+            if len(comprimidas):
+                compresiones[~conocidas] = np.median(comprimidas)
+            activas = activas[quedan]
+        return mejor
+
+    def analizar(self, C, rigideces, regularizacion=1e-9):
+        """
+        Fuerzas internas elásticas de todos los casos con el método de rigidez
+        :param C: compatibilidad de geometria
+        :param rigideces: E·A/L de cada viga
+        :param regularizacion: fracción de la rigidez diagonal máxima que se suma a toda la diagonal, para los
+            nodos sin vigas y los mecanismos
+        :return fuerzas: (vigas x casos), positivas a tensión
+        """
+        import scipy.sparse
+        import scipy.sparse.linalg
+        K = (C.T @ scipy.sparse.diags(rigideces) @ C).tocsc()
+        K = K + scipy.sparse.diags(np.full(K.shape[0], regularizacion * max(K.diagonal().max(), 1e-300)))
+        u = scipy.sparse.linalg.splu(K.tocsc()).solve(self.P)
+        return rigideces[:, None] * (C @ u)
+
+    def verificar(self, material: int, nodo_a, nodo_b, areas, max_iteraciones=100, tolerancia=1e-3,
+                  verboso=False):
+        """
+        Fase 2: fuerzas elásticas de la armadura elegida con sus áreas. Si es hiperestática no tienen por qué
+        coincidir con las del programa lineal; las vigas que no alcanzan se agrandan, sin achicar ninguna, hasta
+        que todas cumplen. Achicar también (diseño totalmente esforzado) oscila con el pandeo.
+        :param material:
+        :param nodo_a:
+        :param nodo_b:
+        :param areas: de la distribución
+        :param max_iteraciones:
+        :param tolerancia: exceso relativo de área requerida que se acepta
+        :param verboso:
+        :return areas, fuerzas, peso, utilizacion: utilizacion es el máximo de área requerida / área, <= 1 si cumple
+        """
+        catalogo = self.catalogo
+        E = catalogo.modulo_E[material]
+        longitudes, C = self.geometria(nodo_a, nodo_b)
+        areas = np.array(areas, dtype=float)
+        for iteracion in range(1, max_iteraciones + 1):
+            fuerzas = self.analizar(C, E * areas / longitudes)
+            requeridas = self.dimensionar(fuerzas, longitudes, material)
+            utilizacion = float(np.max(requeridas / areas))
+            peso = float(catalogo.densidad[material] * np.sum(areas * longitudes))
+            self.historial.append((int(material), "verificacion", iteracion, len(nodo_a), peso))
+            if verboso:
+                print("Verificación", iteracion, "peso:", peso, "utilización:", utilizacion)
+            if utilizacion <= 1 + tolerancia or iteracion == max_iteraciones:
+                break
+            areas = np.maximum(areas, requeridas)
+        return areas, fuerzas, peso, utilizacion
+
+    def optimizar_material(self, material: int, verboso=False, **opciones):
+        """
+        Las dos fases con un material
+        :param material: índice en el catálogo
+        :param verboso:
+        :param opciones: argumentos de distribuir
+        :return resultado: diccionario, None si las candidatas no pueden equilibrar las cargas
+        """
+        distribucion = self.distribuir(material, verboso=verboso, **opciones)
+        if distribucion is None:
+            return None
+        nodo_a, nodo_b, areas, fuerzas, peso_plastico = distribucion
+        areas, fuerzas, peso, utilizacion = self.verificar(material, nodo_a, nodo_b, areas, verboso=verboso)
+        longitudes = self.geometria(nodo_a, nodo_b)[0]
+        return {"nodo_a": nodo_a, "nodo_b": nodo_b, "areas": areas, "fuerzas": fuerzas,
+                "pesos": self.catalogo.densidad[material] * areas * longitudes, "peso": peso,
+                "peso_distribucion": peso_plastico, "utilizacion": utilizacion, "material": int(material)}
+
+    def optimizar(self, materiales=None, verboso=False, **opciones):
+        """
+        Optimiza la topología con cada material y se queda con la más ligera. Con un solo material las fuerzas
+        de la distribución no dependen de E, pero la proporción entre las áreas a tensión y a pandeo sí, y con
+        ella la topología.
+        :param materiales: nombres; por defecto los que no están dominados en el catálogo
+        :param verboso:
+        :param opciones: argumentos de distribuir
+        :return resultado: diccionario con la armadura resultante, ver resultado_dict
+        """
+        catalogo = self.catalogo
+        indices = catalogo.no_dominados if materiales is None else [catalogo.indice(nombre) for nombre in materiales]
+        mejor = None
+        for material in indices:
+            resultado = self.optimizar_material(int(material), verboso=verboso, **opciones)
+            if resultado is None:
+                continue
+            if verboso:
+                print(catalogo.nombres[material], resultado["peso"], "kg,", len(resultado["areas"]), "vigas")
+            if mejor is None or resultado["peso"] < mejor["peso"]:
+                mejor = resultado
+        if mejor is None:
+            raise np.linalg.LinAlgError("Las vigas candidatas no pueden equilibrar las cargas")
+        return self.resultado_dict(mejor)
+
+    def resultado_dict(self, resultado: dict):
+        """
+        Armadura resultante como diccionario serializable en JSON, solo con los nodos que usa. nodos y vigas
+        están en el formato de Construccion.desde_dict; tension y compresion son la envolvente de cada viga.
+        """
+        usados = np.unique(np.concatenate((resultado["nodo_a"], resultado["nodo_b"],
+                                           np.flatnonzero(np.any(self.restricciones != 0, axis=1)))))
+        nuevo_indice = np.full(self.numero_nodos, -1)
+        nuevo_indice[usados] = np.arange(len(usados))
+        ejes = "xyz"[:self.dimension]
+        nodos = [dict({"nombre": self.nombres_nodos[x], "pos": self.coordenadas[x].tolist()},
+                      **{"restriccion_" + eje: float(self.restricciones[x, k]) for k, eje in enumerate(ejes)})
+                 for x in usados]
+        vigas = [[self.nombres_nodos[a] + self.nombres_nodos[b], int(nuevo_indice[a]), int(nuevo_indice[b])]
+                 for a, b in zip(resultado["nodo_a"], resultado["nodo_b"])]
+        fuerzas = resultado["fuerzas"]
+        return {
+            "peso": resultado["peso"],
+            "peso_distribucion": resultado["peso_distribucion"],
+            "utilizacion": resultado["utilizacion"],
+            "material": self.catalogo.nombres[resultado["material"]],
+            "candidatas": self.numero_candidatas,
+            "nodos": nodos,
+            "vigas": vigas,
+            "areas": resultado["areas"].tolist(),
+            "pesos": resultado["pesos"].tolist(),
+            "tension": np.max(np.maximum(fuerzas, 0), axis=1).tolist(),
+            "compresion": np.max(np.maximum(-fuerzas, 0), axis=1).tolist(),
+        }